@@ -0,0 +1,28 @@
+import os
+import hmac
+import logging
+from functools import wraps
+from flask import request, jsonify
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Admin endpoints are only served when a token is configured
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+def is_admin_token(token: str) -> bool:
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+# Route decorator: requires "Authorization: Bearer <ADMIN_TOKEN>", and hides the route without a token
+def admin_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'error': 'Not found'}), 404
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme != 'Bearer' or not is_admin_token(token):
+            logger.warning(f"Rejected admin request to {request.path} from {request.remote_addr}")
+            return jsonify({'error': 'Unauthorised'}), 401
+        return view(*args, **kwargs)
+    return wrapper
@@ -1,5 +1,6 @@
-from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, request, jsonify
+from flask_socketio import SocketIO, emit, join_room
+import os
 import uuid
 from datetime import datetime
 import time
@@ -7,14 +8,20 @@ import random
 import logging
 import atexit
 # Import database components
-from database.database import init_database, close_database, session_dao, message_dao
+from database.database import init_database, close_database, db_manager, session_dao, message_dao, write_behind_queue
 # Import JSON utilities
-from json_utils import safe_json_response, DateTimeEncoder
-# Import vector database components
-from vectordb.qdrant_vector_db import index_documents_standalone
+from json_utils import serialize_flat, serialize_rows, DateTimeEncoder
 # Import AI components
-from llm.google_ai import setup_google_ai_client
-from llm.promptflow import generate_promptflow_response
+from llm.providers import setup_llm_provider
+from llm.promptflow import generate_promptflow_response, promptflow_singleflight
+from llm.conversation_summary import setup_conversation_summarizer
+from llm.admission import admission_controller, AdmissionShed, BUSY_MESSAGE
+from vectordb.qdrant_vector_db import faq_stats
+# Import admin and profiling components
+from admin import admin_required, is_admin_token
+from profiling import profiler, profile_turn, PROFILE_HEADER
+from tracing import tracer, traced, current_span, current_trace_id
+from memory import memory_monitor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,7 +30,25 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-this'
 app.json_encoder = DateTimeEncoder
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Shared Socket.IO message queue (e.g. redis://localhost:6379/0) for running several worker processes:
+# an emit to a room reaches its clients whichever worker they are connected to. Unset for one process.
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+# Compress large polling payloads (history pages); the websocket driver sends frames uncompressed
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    http_compression=True,
+    compression_threshold=int(os.getenv('SOCKETIO_COMPRESSION_THRESHOLD', '1024')),
+    message_queue=SOCKETIO_MESSAGE_QUEUE,
+    channel=os.getenv('SOCKETIO_CHANNEL', 'rag-chatbot')
+)
+
+# Messages per history page sent on join and on each "load older" request
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '20'))
+
+# Fields kept server-side; clients only render question/answer/timestamp/duration
+SLIM_MESSAGE_EXCLUDE = ('history', 'sources', 'metadata', 'session_uuid')
+SLIM_SESSION_EXCLUDE = ('conversation_data',)
 
 # Initialize database on startup
 if not init_database():
@@ -32,9 +57,24 @@ if not init_database():
 
 # Close database connection on exit
 atexit.register(close_database)
+# Export the spans still buffered on exit, after the last queued writes are flushed
+atexit.register(tracer.shutdown)
+
+# Setup the LLM provider: Gemini, or the offline fake with LLM_PROVIDER=fake
+setup_llm_provider(app, model_name="gemini-2.0-flash")
 
-# Setup Google AI integration
-setup_google_ai_client(app, model_name="gemini-2.0-flash")
+# Rolling per-session summaries in sessions.metadata, so long sessions keep a bounded prompt size
+conversation_summarizer = None
+if os.getenv('CONVERSATION_SUMMARY', 'true').lower() in ('1', 'true', 'yes'):
+    conversation_summarizer = setup_conversation_summarizer(session_dao.merge_session_metadata)
+    atexit.register(conversation_summarizer.stop)
+
+# RSS samples with the depth of the process's queues, and allocation diffs on /admin/memory
+memory_monitor.register('write_behind_queue', lambda: write_behind_queue.get_metrics()['queue_depth'] if write_behind_queue else 0)
+memory_monitor.register('summary_queue', lambda: conversation_summarizer.get_metrics()['queue_depth'] if conversation_summarizer else 0)
+memory_monitor.register('span_queue', lambda: tracer.exporter.get_metrics()['queued'] if tracer.exporter else 0)
+memory_monitor.start()
+atexit.register(memory_monitor.stop)
 
 @app.route('/')
 def index():
@@ -48,15 +88,110 @@ def index():
     welcome_message = random.choice(welcome_message_pairs)
     return render_template('index.html', welcome_message=welcome_message)
 
+# Process-wide sampling profile: start, then stop to write it to PROFILE_DIR
+@app.route('/admin/profiling/start', methods=['POST'])
+@admin_required
+def start_profiling():
+    if not profiler.start_process():
+        return jsonify({'error': 'Profiling already running'}), 409
+    return jsonify({'status': 'started'})
+
+@app.route('/admin/profiling/stop', methods=['POST'])
+@admin_required
+def stop_profiling():
+    profile = profiler.stop_process()
+    if profile is None:
+        return jsonify({'error': 'Profiling not running'}), 409
+    return jsonify(profile)
+
+@app.route('/admin/profiling', methods=['GET'])
+@admin_required
+def profiling_status():
+    return jsonify(profiler.get_metrics())
+
+# Profile the next ?turns= turns of one session (default 1)
+@app.route('/admin/profiling/sessions/<session_id>', methods=['POST', 'DELETE'])
+@admin_required
+def profile_session(session_id):
+    if request.method == 'DELETE':
+        return jsonify({'session_id': session_id, 'removed': profiler.unflag_session(session_id)})
+    turns = request.args.get('turns', 1, type=int)
+    profiler.flag_session(session_id, turns)
+    return jsonify({'session_id': session_id, 'turns': turns})
+
+# RSS history and growth rate; ?samples=N includes the last N samples
+@app.route('/admin/memory', methods=['GET'])
+@admin_required
+def memory_status():
+    return jsonify(memory_monitor.get_metrics(recent=request.args.get('samples', 0, type=int)))
+
+# Start tracing allocations (?frames= per allocation, default 1) and take a baseline, or stop tracing
+@app.route('/admin/memory/tracing', methods=['POST', 'DELETE'])
+@admin_required
+def memory_tracing():
+    if request.method == 'DELETE':
+        return jsonify({'stopped': memory_monitor.stop_tracing()})
+    frames = request.args.get('frames', 1, type=int)
+    if frames < 1:
+        return jsonify({'error': 'frames must be at least 1'}), 400
+    memory_monitor.start_tracing(frames)
+    return jsonify({'status': 'tracing'})
+
+@app.route('/admin/memory/baseline', methods=['POST'])
+@admin_required
+def memory_baseline():
+    if not memory_monitor.reset_baseline():
+        return jsonify({'error': 'Allocations are not being traced'}), 409
+    return jsonify({'status': 'baseline reset'})
+
+# Allocation growth since the baseline: ?limit=20&group=lineno|filename|traceback
+@app.route('/admin/memory/top', methods=['GET'])
+@admin_required
+def memory_top():
+    group_by = request.args.get('group', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'error': 'group must be lineno, filename or traceback'}), 400
+    allocations = memory_monitor.top_allocations(request.args.get('limit', 20, type=int), group_by)
+    if allocations is None:
+        return jsonify({'error': 'Allocations are not being traced'}), 409
+    return jsonify({'group': group_by, 'allocations': allocations})
+
+# Counters of this worker's persistence queue, FAQ matching, coalescing, admission control and database pool;
+# a section is null when its component is disabled
+@app.route('/admin/metrics', methods=['GET'])
+@admin_required
+def admin_metrics():
+    return jsonify({
+        'write_behind': write_behind_queue.get_metrics() if write_behind_queue else None,
+        'faq': faq_stats() or None,
+        'singleflight': promptflow_singleflight.get_metrics(),
+        'admission': admission_controller.get_metrics() if admission_controller else None,
+        'pool': db_manager.get_pool_metrics()
+    })
+
 @socketio.on('connect')
 def on_connect():
     logger.info(f'Client connected: {request.sid}')
+    if is_admin_token(request.headers.get(PROFILE_HEADER)):
+        profiler.flag_connection(request.sid)
+        logger.info(f'Profiling every turn of connection {request.sid}')
 
 @socketio.on('disconnect')
 def on_disconnect():
     logger.info(f'Client disconnected: {request.sid}')
+    profiler.unflag_connection(request.sid)
+
+# Queued write-behind messages are not visible to SELECTs until flushed, so they are merged back in.
+# Read the queue before the database so a batch committed in between is seen by one or the other.
+def get_pending_messages(session_id):
+    return write_behind_queue.pending_messages(session_id) if write_behind_queue else []
+
+def merge_pending(messages, pending):
+    stored_counts = {message['message_count'] for message in messages}
+    return messages + [serialize_flat(message, exclude=SLIM_MESSAGE_EXCLUDE) for message in pending if message['message_count'] not in stored_counts]
 
 @socketio.on('join_session')
+@traced('socketio.join_session')
 def on_join_session(data):
     try:
         session_id = data.get('session_id')
@@ -77,25 +212,58 @@ def on_join_session(data):
         else:
             logger.info(f"Joined existing session: {session_id}")
         
-        # Get message history
-        messages = message_dao.get_messages_by_session(session_id)
+        # Every connection of a session joins its room, so the session can be addressed from any worker
+        join_room(session_id)
+        
+        # Get the most recent page of message history, older pages are fetched on demand
+        pending = get_pending_messages(session_id)
+        page = message_dao.get_message_page(session_id, limit=HISTORY_PAGE_SIZE)
         
         # Send session info and message history back to client
-        emit('session_initialised', {
-            'session_id': session_id,
-            'session_data': safe_json_response(session_data),
-            'messages': safe_json_response(messages)
-        })
+        with tracer.span('socketio.emit', event='session_initialised'):
+            emit('session_initialised', {
+                'session_id': session_id,
+                'session_data': serialize_flat(session_data, exclude=SLIM_SESSION_EXCLUDE),
+                'messages': merge_pending(serialize_rows(page['messages']), pending),
+                'has_more': page['has_more'],
+                'next_cursor': page['next_cursor']
+            })
         
     except Exception as e:
         logger.error(f"Error in join_session: {e}")
         emit('error', {'message': 'Failed to initialise session'})
 
+@socketio.on('load_older_messages')
+def on_load_older_messages(data):
+    try:
+        session_id = data.get('session_id')
+        before_count = data.get('before')
+        
+        if not session_id or not isinstance(before_count, int):
+            emit('error', {'message': 'Invalid session or cursor'})
+            return
+        
+        page = message_dao.get_message_page(session_id, before_count=before_count, limit=HISTORY_PAGE_SIZE)
+        
+        emit('older_messages', {
+            'session_id': session_id,
+            'messages': serialize_rows(page['messages']),
+            'has_more': page['has_more'],
+            'next_cursor': page['next_cursor']
+        })
+        
+    except Exception as e:
+        logger.error(f"Error loading older messages: {e}")
+        emit('error', {'message': 'Failed to load older messages'})
+
 @socketio.on('user_message')
+@profile_turn
+@traced('socketio.user_message')
 def handle_user_message(data):
     try:
         session_id = data.get('session_id')
         user_message = data.get('message', '').strip()
+        current_span().set_attribute('session_id', session_id)
         
         if not session_id or not user_message:
             emit('error', {'message': 'Invalid session or message'})
@@ -109,7 +277,9 @@ def handle_user_message(data):
         message_start_time = datetime.now()
         
         # Get current message count
-        existing_messages = message_dao.get_messages_by_session(session_id)
+        pending = get_pending_messages(session_id)
+        # Only question/answer: each stored message also carries a copy of the whole history before it
+        existing_messages = merge_pending(message_dao.get_conversation(session_id), pending)
         current_message_count = len(existing_messages) + 1
         
         # Build conversation history for AI
@@ -121,7 +291,20 @@ def handle_user_message(data):
             })
         
         # Generate AI response
-        ai_response, sources = generate_promptflow_response(user_message, conversation_history)
+        summary = (session_data.get('metadata') or {}).get('summary')
+        # The trace id finds this turn's spans (LLM calls, search, DB writes) after the fact
+        trace_id = current_trace_id()
+        turn_metadata = {'trace_id': trace_id} if trace_id else {}
+        # Admission control picks how much work the pipeline run may do, or sheds it when the pipeline is full
+        try:
+            ai_response, sources = generate_promptflow_response(
+                user_message, conversation_history, summary=summary, turn_metadata=turn_metadata,
+                admission_controller=admission_controller
+            )
+        except AdmissionShed as e:
+            logger.warning(f"Session {session_id}: shedding message, {admission_controller.max_in_flight} pipelines in flight")
+            emit('busy', {'message': BUSY_MESSAGE, 'retry_after': e.retry_after})
+            return
         
         # Calculate response duration
         response_end_time = datetime.now()
@@ -137,29 +320,40 @@ def handle_user_message(data):
             'message_count': current_message_count,
             'question': user_message,
             'answer': ai_response,
-            'sources': sources
+            'sources': sources,
+            'metadata': turn_metadata
         }
         
-        # Save message to database
-        saved_message = message_dao.create_message(message_data)
-        
         # Update session conversation data and end timestamp
         updated_conversation = conversation_history + [{
             'question': user_message,
             'answer': ai_response
         }]
         
-        updated_session = session_dao.update_session(
-            session_id=session_id,
-            conversation_data=updated_conversation,
-            end_timestamp=response_end_time
-        )
+        if write_behind_queue:
+            # Emit straight away; the background writer persists the message and session update
+            write_behind_queue.enqueue_message(message_data)
+            write_behind_queue.enqueue_session_update(
+                session_id=session_id,
+                conversation_data=updated_conversation,
+                end_timestamp=response_end_time
+            )
+            saved_message = message_data
+            updated_session = dict(session_data, conversation_data=updated_conversation, end_timestamp=response_end_time)
+        else:
+            # Save message and session update in one transaction
+            saved_message, updated_session = message_dao.save_turn(message_data, updated_conversation, response_end_time)
+        
+        # Fold the finished turn into the session summary in the background
+        if conversation_summarizer:
+            conversation_summarizer.submit(session_id, updated_conversation, summary)
         
         # Send response back to client
-        emit('ai_response', {
-            'message_data': safe_json_response(saved_message),
-            'session_data': safe_json_response(updated_session)
-        })
+        with tracer.span('socketio.emit', event='ai_response'):
+            emit('ai_response', {
+                'message_data': serialize_flat(saved_message, exclude=SLIM_MESSAGE_EXCLUDE),
+                'session_data': serialize_flat(updated_session, exclude=SLIM_SESSION_EXCLUDE)
+            })
         
         logger.info(f"Session {session_id}: Q: {user_message[:50]}... A: {ai_response[:50]}...")
         
@@ -173,12 +367,16 @@ def handle_end_session(data):
         session_id = data.get('session_id')
         
         if session_id:
-            # Update session end timestamp
-            session_dao.update_session(
-                session_id=session_id,
-                end_timestamp=datetime.now()
-            )
-            emit('session_ended', {'session_id': session_id})
+            # Update session end timestamp, queued behind any pending writes for this session
+            if write_behind_queue:
+                write_behind_queue.enqueue_session_update(session_id=session_id, end_timestamp=datetime.now())
+            else:
+                session_dao.update_session(
+                    session_id=session_id,
+                    end_timestamp=datetime.now()
+                )
+            # Tells every connection of the session, including ones held by other workers
+            emit('session_ended', {'session_id': session_id}, to=session_id)
             logger.info(f"Session ended: {session_id}")
             
     except Exception as e:
@@ -186,6 +384,11 @@ def handle_end_session(data):
         emit('error', {'message': 'Failed to end session'})
 
 if __name__ == '__main__':
-    result = index_documents_standalone("./documents", overwrite=True)
-    logger.info(f"Document indexing result: {result['status']}")
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Documents are indexed out of process with `python -m vectordb index` or `python -m vectordb watch`
+    # Development server only; `python workers.py` serves the app with gunicorn
+    socketio.run(
+        app,
+        debug=os.getenv('FLASK_DEBUG', 'true').lower() in ('1', 'true', 'yes'),
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', '5000'))
+    )
\ No newline at end of file
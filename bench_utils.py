@@ -0,0 +1,40 @@
+import time
+from typing import List, Dict, Callable, Iterable
+
+# Nearest-rank percentile of latency samples (seconds), in milliseconds
+def percentile_ms(samples: Iterable[float], p: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index] * 1000
+
+# Summarise latency samples (seconds) as milliseconds percentiles
+def summarise_latencies(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": percentile_ms(ordered, 50),
+        "p95_ms": percentile_ms(ordered, 95),
+        "p99_ms": percentile_ms(ordered, 99),
+        "max_ms": ordered[-1] * 1000
+    }
+
+# Time repeated calls of fn after a short warm-up, returns raw samples in seconds
+def time_calls(fn: Callable[[], object], iterations: int, warmup: int = 5) -> List[float]:
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def format_row(name: str, stats: Dict[str, float]) -> str:
+    return f"{name:<32} mean={stats['mean_ms']:8.2f}ms  p50={stats['p50_ms']:8.2f}ms  p95={stats['p95_ms']:8.2f}ms  p99={stats['p99_ms']:8.2f}ms"
@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+
+# Offline by default: the fake LLM provider with no simulated latency, so thousands of turns take
+# minutes. Set before the app (and with it the provider settings) is imported.
+for key, value in (("LLM_PROVIDER", "fake"), ("FAKE_LLM_LATENCY_MS", "0"), ("FAKE_LLM_INPUT_TOKEN_MS", "0"),
+                   ("FAKE_LLM_OUTPUT_TOKEN_MS", "0"), ("MEMORY_SAMPLE_INTERVAL", "0")):
+    os.environ.setdefault(key, value)
+
+from memory import rss_bytes, rss_growth_per_hour, memory_monitor
+
+# Memory soak test: runs thousands of chat turns through the app's Socket.IO handlers in this process
+# (Flask-SocketIO's test client, so the pipeline, search, database and write-behind all run) and
+# samples resident memory as it goes. After --warmup turns have loaded models and filled pools, RSS
+# may not grow by more than --max-growth-mb, otherwise the run fails with exit code 1. With
+# --tracemalloc the allocations that grew most since the end of the warmup are printed as well.
+# Needs the app's DB_* environment and a vector index, like the app itself.
+# python -m benchmarks.memory_soak --turns 5000 --turns-per-session 10 --max-growth-mb 50
+QUESTIONS = (
+    "How do I fix my AuraPhone battery draining overnight",
+    "My AuraBook laptop trackpad stopped responding",
+    "What is the warranty on AuraTech chargers",
+    "How do I reset my AuraPhone to factory settings",
+    "Why does my laptop fan run constantly"
+)
+
+def reply(client, event: str):
+    for message in client.get_received():
+        if message['name'] in (event, 'busy', 'error'):
+            return message['name'], message['args'][0] if message['args'] else None
+    return None, None
+
+def run_soak(args, on_sample):
+    import app as chat_app
+    client = chat_app.socketio.test_client(chat_app.app)
+    outcomes = {}
+    session_id = None
+    for turn in range(args.turns):
+        if turn % args.turns_per_session == 0:
+            if session_id:
+                client.emit('end_session', {'session_id': session_id})
+                client.get_received()
+            client.emit('join_session', {})
+            event, data = reply(client, 'session_initialised')
+            session_id = data['session_id'] if event == 'session_initialised' else None
+
+        # Distinct questions so coalescing and caches see realistic churn
+        question = f"{QUESTIONS[turn % len(QUESTIONS)]} (turn {turn})"
+        client.emit('user_message', {'session_id': session_id, 'message': question})
+        event, _ = reply(client, 'ai_response')
+        outcome = "ok" if event == 'ai_response' else (event or "no_reply")
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        if (turn + 1) % args.sample_every == 0:
+            on_sample(turn + 1)
+    client.disconnect()
+    return outcomes
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fail when resident memory keeps growing over thousands of chat turns")
+    parser.add_argument("--turns", type=int, default=5000)
+    parser.add_argument("--turns-per-session", type=int, default=10, help="Turns before a new session is started")
+    parser.add_argument("--warmup", type=int, default=200, help="Turns before the RSS baseline is taken")
+    parser.add_argument("--sample-every", type=int, default=100, help="Turns between RSS samples")
+    parser.add_argument("--max-growth-mb", type=float, default=50, help="Allowed RSS growth after the warmup")
+    parser.add_argument("--tracemalloc", action="store_true", help="Trace allocations after the warmup and report the top growth")
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites reported with --tracemalloc")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    if args.json:
+        logging.disable(logging.WARNING)
+    else:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    samples = []
+    baseline = {}
+    started_at = time.perf_counter()
+
+    def on_sample(turns: int):
+        sample = {"turns": turns, "time": time.perf_counter() - started_at, "rss_bytes": rss_bytes()}
+        samples.append(sample)
+        if not baseline and turns >= args.warmup:
+            baseline.update(sample)
+            if args.tracemalloc:
+                memory_monitor.start_tracing(frames=5)
+        if not args.json:
+            print(f"{turns:>7} turns  {sample['time']:>7.1f}s  RSS {sample['rss_bytes'] / 2**20:>8.1f} MiB", flush=True)
+
+    outcomes = run_soak(args, on_sample)
+    if not samples or samples[-1]["turns"] != args.turns:
+        on_sample(args.turns)
+    if not baseline:
+        print("Not enough turns to get past the warmup", file=sys.stderr)
+        return 2
+
+    after_warmup = [sample for sample in samples if sample["turns"] >= baseline["turns"]]
+    growth_bytes = samples[-1]["rss_bytes"] - baseline["rss_bytes"]
+    peak_growth_bytes = max(sample["rss_bytes"] for sample in after_warmup) - baseline["rss_bytes"]
+    per_hour = rss_growth_per_hour(after_warmup)
+    passed = growth_bytes <= args.max_growth_mb * 2**20
+    report = {
+        "settings": vars(args),
+        "outcomes": outcomes,
+        "elapsed_seconds": time.perf_counter() - started_at,
+        "baseline_rss_bytes": baseline["rss_bytes"],
+        "final_rss_bytes": samples[-1]["rss_bytes"],
+        "growth_bytes": growth_bytes,
+        "peak_growth_bytes": peak_growth_bytes,
+        "growth_bytes_per_1000_turns": growth_bytes / (args.turns - baseline["turns"]) * 1000 if args.turns > baseline["turns"] else 0.0,
+        "growth_bytes_per_hour": per_hour,
+        "top_allocations": memory_monitor.top_allocations(args.top) if args.tracemalloc else None,
+        "samples": samples,
+        "passed": passed
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("Outcomes: " + ", ".join(f"{key}={count}" for key, count in sorted(outcomes.items())))
+        print(f"RSS after warmup {baseline['rss_bytes'] / 2**20:.1f} MiB, final {samples[-1]['rss_bytes'] / 2**20:.1f} MiB: "
+              f"{growth_bytes / 2**20:+.1f} MiB ({report['growth_bytes_per_1000_turns'] / 2**20:+.2f} MiB per 1000 turns, "
+              f"peak {peak_growth_bytes / 2**20:+.1f} MiB)")
+        for allocation in report["top_allocations"] or []:
+            print(f"{allocation['size_diff_bytes'] / 1024:>+10.1f} KiB {allocation['count_diff']:>+8} blocks  {allocation['location']}")
+        print(("PASS" if passed else "FAIL") + f": allowed growth {args.max_growth_mb:.0f} MiB")
+    return 0 if passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import argparse
+import logging
+import subprocess
+import urllib.request
+import socketio
+from bench_utils import format_row
+from benchmarks.socketio_load import build_parser as build_load_parser, run_load
+
+# Concurrent sessions and throughput of the app at 1, 2, 4 and 8 worker processes. For each count it
+# starts `python workers.py` on --base-port, spreads the simulated users over the workers as a sticky
+# load balancer would (benchmarks.socketio_load) and stops the workers again. Each run also checks
+# that an event sent to a session's room on one worker reaches its connection on another, which only
+# works through the shared message queue.
+# Workers use the fake LLM provider unless LLM_PROVIDER is set, and the app's DB_* environment.
+# python -m benchmarks.multi_worker --workers 1,2,4,8 --message-queue redis://localhost:6379/0
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def wait_until_serving(urls, timeout: float) -> bool:
+    give_up_at = time.monotonic() + timeout
+    pending = list(urls)
+    while pending and time.monotonic() < give_up_at:
+        try:
+            with urllib.request.urlopen(f"{pending[0]}/socket.io/?EIO=4&transport=polling", timeout=2) as response:
+                if response.status == 200:
+                    pending.pop(0)
+                    continue
+        except OSError:
+            pass
+        time.sleep(0.5)
+    return not pending
+
+# Two connections to one session on different workers: ending it from the second must reach the first
+def check_room_delivery(urls, timeout: float = 10.0) -> bool:
+    received = queue.Queue()
+    first, second = socketio.Client(reconnection=False), socketio.Client(reconnection=False)
+    joined = queue.Queue()
+    first.on('session_initialised', lambda data: joined.put(data))
+    second.on('session_initialised', lambda data: joined.put(data))
+    first.on('session_ended', lambda data: received.put(data))
+    try:
+        first.connect(urls[0], wait_timeout=timeout)
+        second.connect(urls[-1], wait_timeout=timeout)
+        first.emit('join_session', {})
+        session_id = joined.get(timeout=timeout)['session_id']
+        second.emit('join_session', {'session_id': session_id})
+        joined.get(timeout=timeout)
+        second.emit('end_session', {'session_id': session_id})
+        return received.get(timeout=timeout)['session_id'] == session_id
+    except (queue.Empty, socketio.exceptions.SocketIOError):
+        return False
+    finally:
+        first.disconnect()
+        second.disconnect()
+
+def run_workers(workers: int, args, load_argv) -> dict:
+    env = dict(os.environ)
+    env.setdefault('LLM_PROVIDER', 'fake')
+    command = [sys.executable, os.path.join(ROOT, 'workers.py'), '--workers', str(workers),
+               '--host', '127.0.0.1', '--base-port', str(args.base_port)]
+    if args.message_queue:
+        command += ['--message-queue', args.message_queue]
+    launcher = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+    urls = [f"http://127.0.0.1:{args.base_port + index}" for index in range(workers)]
+    try:
+        if not wait_until_serving(urls, args.startup_timeout):
+            return {"workers": workers, "error": f"workers not serving after {args.startup_timeout:.0f}s"}
+        room_delivery = check_room_delivery(urls)
+        load_args = build_load_parser().parse_args(load_argv + ['--url', ','.join(urls), '--no-db'])
+        report = run_load(load_args)
+        return {
+            "workers": workers,
+            "room_delivery": room_delivery,
+            "turns_per_second": report["turns_per_second"],
+            "outcomes": report["outcomes"],
+            "turn_error_rates": report["turn_error_rates"],
+            "client": report["client"]
+        }
+    finally:
+        launcher.send_signal(signal.SIGTERM)
+        try:
+            launcher.wait(30)
+        except subprocess.TimeoutExpired:
+            launcher.kill()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Throughput and latency of concurrent sessions at several worker process counts")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    parser.add_argument("--base-port", type=int, default=5101)
+    parser.add_argument("--message-queue", default=os.getenv('SOCKETIO_MESSAGE_QUEUE'), help="e.g. redis://localhost:6379/0")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=5, help="Messages per user")
+    parser.add_argument("--think-ms", type=float, default=1000, help="Mean think time between a user's turns")
+    parser.add_argument("--ramp", type=float, default=5, help="Seconds over which users start")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for each reply")
+    parser.add_argument("--startup-timeout", type=float, default=120, help="Seconds to wait for workers to serve")
+    parser.add_argument("--verbose", action="store_true", help="Show the workers' logs")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    counts = [int(count) for count in args.workers.split(',')]
+    if max(counts) > 1 and not args.message_queue:
+        print("Several workers need --message-queue (or SOCKETIO_MESSAGE_QUEUE)", file=sys.stderr)
+        return 2
+
+    load_argv = ['--users', str(args.users), '--turns', str(args.turns), '--think-ms', str(args.think_ms),
+                 '--ramp', str(args.ramp), '--timeout', str(args.timeout)]
+    logging.disable(logging.ERROR)
+    results = []
+    for workers in counts:
+        result = run_workers(workers, args, load_argv)
+        results.append(result)
+        if not args.json:
+            if "error" in result:
+                print(f"{workers} worker(s): {result['error']}")
+                continue
+            errors = ", ".join(f"{outcome}={rate:.1%}" for outcome, rate in result["turn_error_rates"].items())
+            print(f"{workers} worker(s): {result['turns_per_second']:.2f} turns/s, {errors}, "
+                  f"cross-worker room delivery {'ok' if result['room_delivery'] else 'FAILED'}")
+            print(format_row("  turn", result["client"]["turn"]))
+            print(format_row("  join", result["client"]["join"]))
+
+    if args.json:
+        print(json.dumps({"settings": vars(args), "results": results}, indent=2))
+    return 0 if all("error" not in result and result["room_delivery"] for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
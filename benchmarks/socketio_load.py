@@ -0,0 +1,189 @@
+import sys
+import json
+import time
+import queue
+import random
+import argparse
+import logging
+import threading
+from collections import Counter
+import socketio
+from bench_utils import summarise_latencies, format_row
+
+# Closed-loop load test of a running app: each simulated user opens a Socket.IO connection, joins a
+# new session and sends --turns messages with exponential think time between them, waiting for the
+# answer each time. Client-side join and turn latencies come from the connections; the per-stage
+# breakdown (stage_seconds and server duration) is read back from messages.metadata in Postgres, so
+# run it with the app's DB_* environment. For runs without Gemini start the app with LLM_PROVIDER=fake.
+# --url takes a comma-separated list of workers; users are spread over them the way a sticky load
+# balancer would, each staying on one worker.
+# Needs the Socket.IO client extras: pip install "python-socketio[client]"
+# python -m benchmarks.socketio_load --url http://localhost:5000 --users 50 --turns 5
+QUESTIONS = (
+    "How do I fix my AuraPhone battery draining overnight",
+    "My AuraBook laptop trackpad stopped responding",
+    "What is the warranty on AuraTech chargers",
+    "How do I reset my AuraPhone to factory settings",
+    "Why does my laptop fan run constantly"
+)
+
+# Events that end a wait: the expected reply, or busy/error from the server
+REPLY_EVENTS = ('session_initialised', 'ai_response', 'busy', 'error')
+
+class LoadResults:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {"connect": [], "join": [], "turn": []}
+        self.outcomes = Counter()
+        self.sessions = {}
+
+    def record(self, stage: str, seconds: float = None, outcome: str = None):
+        with self.lock:
+            if seconds is not None:
+                self.latencies[stage].append(seconds)
+            if outcome:
+                self.outcomes[f"{stage}_{outcome}"] += 1
+
+def run_user(index: int, args, results: LoadResults):
+    rng = random.Random(args.seed * 100003 + index)
+    replies = queue.Queue()
+    client = socketio.Client(reconnection=False)
+    for event in REPLY_EVENTS:
+        client.on(event, lambda data=None, event=event: replies.put((event, data)))
+
+    def request(event: str, payload: dict, expected: str):
+        client.emit(event, payload)
+        start = time.perf_counter()
+        try:
+            reply, data = replies.get(timeout=args.timeout)
+        except queue.Empty:
+            return "timeout", time.perf_counter() - start, None
+        return ("ok" if reply == expected else reply), time.perf_counter() - start, data
+
+    urls = args.url.split(',')
+    start = time.perf_counter()
+    try:
+        client.connect(urls[index % len(urls)], wait_timeout=args.timeout)
+    except Exception as e:
+        logging.getLogger(__name__).debug(f"User {index} failed to connect: {e}")
+        results.record("connect", outcome="error")
+        return
+    results.record("connect", time.perf_counter() - start, "ok")
+
+    try:
+        outcome, seconds, data = request('join_session', {}, 'session_initialised')
+        results.record("join", seconds if outcome == "ok" else None, outcome)
+        if outcome != "ok":
+            return
+        session_id = data['session_id']
+
+        ok_turns = 0
+        for turn in range(args.turns):
+            if turn:
+                time.sleep(rng.expovariate(1000 / args.think_ms) if args.think_ms > 0 else 0)
+            # Distinct text per user so identical-question coalescing does not hide the load
+            question = f"{QUESTIONS[(index + turn) % len(QUESTIONS)]} (user {index})"
+            outcome, seconds, _ = request('user_message', {'session_id': session_id, 'message': question}, 'ai_response')
+            results.record("turn", seconds if outcome == "ok" else None, outcome)
+            if outcome == "ok":
+                ok_turns += 1
+            elif outcome == "timeout":
+                # A late reply would be taken for the next turn's, so this user stops here
+                break
+        with results.lock:
+            results.sessions[session_id] = ok_turns
+    finally:
+        client.disconnect()
+
+# Stage timings of the answered turns, polling while write-behind catches up
+def collect_stage_latencies(sessions: dict, wait_seconds: float):
+    from database.database import init_database, close_database, message_dao
+    if not init_database():
+        return None
+
+    stages = {}
+    try:
+        remaining = dict(sessions)
+        give_up_at = time.monotonic() + wait_seconds
+        while remaining:
+            for session_id, expected in list(remaining.items()):
+                messages = message_dao.get_messages_by_session(session_id)
+                if len(messages) < expected and time.monotonic() < give_up_at:
+                    continue
+                for message in messages:
+                    stages.setdefault("server_total", []).append(float(message['duration']))
+                    for stage, seconds in ((message.get('metadata') or {}).get('stage_seconds') or {}).items():
+                        stages.setdefault(stage, []).append(seconds)
+                del remaining[session_id]
+            if remaining:
+                time.sleep(0.5)
+    finally:
+        close_database()
+    return {stage: summarise_latencies(samples) for stage, samples in stages.items()}
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Throughput, per-stage latency and error rates of concurrent Socket.IO chat sessions")
+    parser.add_argument("--url", default="http://localhost:5000", help="App URL, or comma-separated worker URLs")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=5, help="Messages per user")
+    parser.add_argument("--think-ms", type=float, default=1000, help="Mean think time between a user's turns")
+    parser.add_argument("--ramp", type=float, default=5, help="Seconds over which users start")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for each reply")
+    parser.add_argument("--db-wait", type=float, default=10, help="Seconds to wait for queued writes before reading stage timings")
+    parser.add_argument("--no-db", action="store_true", help="Skip the per-stage breakdown from Postgres")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    return parser
+
+def run_load(args) -> dict:
+    # Also silences the client's per-connection "only polling transport" message, logged as an error
+    logging.disable(logging.ERROR)
+    results = LoadResults()
+    threads = []
+    started_at = time.perf_counter()
+    for index in range(args.users):
+        time.sleep(max(0.0, started_at + args.ramp * index / args.users - time.perf_counter()))
+        thread = threading.Thread(target=run_user, args=(index, args, results), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+
+    outcomes = results.outcomes
+    attempted = sum(count for key, count in outcomes.items() if key.startswith("turn_"))
+    return {
+        "settings": vars(args),
+        "elapsed_seconds": elapsed,
+        "turns_per_second": outcomes["turn_ok"] / elapsed,
+        "outcomes": dict(outcomes),
+        "turn_error_rates": {
+            outcome: outcomes[f"turn_{outcome}"] / attempted if attempted else 0.0 for outcome in ("busy", "error", "timeout")
+        },
+        "client": {stage: summarise_latencies(samples) for stage, samples in results.latencies.items()},
+        "server_stages": None if args.no_db else collect_stage_latencies(results.sessions, args.db_wait)
+    }
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    report = run_load(args)
+    outcomes = report["outcomes"]
+    elapsed = report["elapsed_seconds"]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"{args.users} users x {args.turns} turns in {elapsed:.1f}s: {report['turns_per_second']:.2f} answered turns/s")
+    print("Outcomes: " + ", ".join(f"{key}={count}" for key, count in sorted(outcomes.items())))
+    print("Turn error rates: " + ", ".join(f"{outcome}={rate:.1%}" for outcome, rate in report["turn_error_rates"].items()))
+    for stage, stats in report["client"].items():
+        print(format_row(f"client {stage}", stats))
+    if report["server_stages"] is None and not args.no_db:
+        print("Stage breakdown unavailable: could not connect to the database")
+    for stage, stats in (report["server_stages"] or {}).items():
+        print(format_row(f"server {stage}", stats))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
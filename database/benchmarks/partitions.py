@@ -0,0 +1,165 @@
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+from datetime import date
+from bench_utils import summarise_latencies, time_calls, format_row
+from ..database import DatabaseConfig, DatabaseManager
+from ..retention import add_months
+
+# Insert throughput and history lookups for the old flat messages layout (seven indexes) vs the
+# monthly range-partitioned layout, in throwaway schemas on local Postgres (uses the DB_* env vars).
+# Tens of millions of rows: python -m database.benchmarks.partitions --rows 20000000
+MESSAGE_COLUMNS = """
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    message_id VARCHAR(255) NOT NULL,
+    session_id VARCHAR(255) NOT NULL,
+    session_uuid UUID,
+    message_count INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    sources JSONB DEFAULT '[]'::jsonb,
+    history JSONB DEFAULT '[]'::jsonb,
+    duration DECIMAL(10, 4) DEFAULT 0,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    metadata JSONB DEFAULT '{}'::jsonb,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+"""
+
+FLAT_DDL = f"""
+    CREATE TABLE {{schema}}.messages ({MESSAGE_COLUMNS}, PRIMARY KEY (id), UNIQUE (message_id));
+    CREATE INDEX ON {{schema}}.messages(message_id);
+    CREATE INDEX ON {{schema}}.messages(session_id);
+    CREATE INDEX ON {{schema}}.messages(session_uuid);
+    CREATE INDEX ON {{schema}}.messages(timestamp);
+    CREATE INDEX ON {{schema}}.messages(message_count);
+"""
+
+PARTITIONED_DDL = f"""
+    CREATE TABLE {{schema}}.messages ({MESSAGE_COLUMNS}, PRIMARY KEY (id, timestamp), UNIQUE (message_id, timestamp)) PARTITION BY RANGE (timestamp);
+    CREATE TABLE {{schema}}.messages_default PARTITION OF {{schema}}.messages DEFAULT;
+    CREATE INDEX ON {{schema}}.messages(session_id, message_count);
+    CREATE INDEX ON {{schema}}.messages(session_uuid);
+"""
+
+HISTORY_SQL = "SELECT * FROM {schema}.messages WHERE session_id = %s ORDER BY message_count ASC"
+PAGE_SQL = "SELECT message_id, message_count, question, answer, duration, timestamp FROM {schema}.messages WHERE session_id = %s ORDER BY message_count DESC LIMIT 21"
+INSERT_SQL = """
+    INSERT INTO {schema}.messages (message_id, session_id, message_count, question, answer, sources, history, duration, timestamp)
+    VALUES (%s, %s, %s, %s, %s, '[]', '[]', 0.5, now())
+"""
+
+def create_schema(cur, schema: str, partitioned: bool, months: int):
+    cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+    cur.execute((PARTITIONED_DDL if partitioned else FLAT_DDL).replace("{schema}", schema))
+    if partitioned:
+        first = add_months(date.today().replace(day=1), -months)
+        for offset in range(months + 2):
+            start = add_months(first, offset)
+            cur.execute(f"CREATE TABLE {schema}.messages_y{start:%Y}m{start:%m} PARTITION OF {schema}.messages FOR VALUES FROM ('{start}') TO ('{add_months(start, 1)}')")
+
+# Server-side bulk load: sessions of session_length consecutive messages spread over the last `months` months
+def load_rows(conn, schema: str, rows: int, months: int, session_length: int, chunk: int) -> float:
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        for low in range(0, rows, chunk):
+            high = min(rows, low + chunk) - 1
+            cur.execute(f"""
+                INSERT INTO {schema}.messages (message_id, session_id, message_count, question, answer, history, duration, timestamp)
+                SELECT 'm' || g, 's' || (g / {session_length}), mod(g, {session_length}),
+                       'How do I reset my AuraPhone?', repeat('Troubleshooting answer. ', 20),
+                       '[]'::jsonb, 0.5,
+                       now() - make_interval(mins => ((%s - g)::float8 / %s * {months} * 43200)::int)
+                FROM generate_series(%s, %s) AS g
+            """, (rows, rows, low, high))
+            conn.commit()
+    return rows / (time.perf_counter() - start)
+
+def bench_layout(manager: DatabaseManager, schema: str, partitioned: bool, args) -> dict:
+    with manager.get_connection() as conn:
+        with conn.cursor() as cur:
+            create_schema(cur, schema, partitioned, args.months)
+        conn.commit()
+
+        bulk_rows_per_second = load_rows(conn, schema, args.rows, args.months, args.session_length, args.chunk)
+        with conn.cursor() as cur:
+            cur.execute(f"ANALYZE {schema}.messages")
+            # Leaf tables only: for the partitioned layout that is the sum of its partitions
+            cur.execute(f"""
+                SELECT COALESCE(sum(pg_indexes_size(c.oid)), 0) AS index_bytes, COALESCE(sum(pg_total_relation_size(c.oid)), 0) AS total_bytes
+                FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = %s AND c.relkind = 'r'
+            """, (schema,))
+            sizes = cur.fetchone()
+        conn.commit()
+
+        rng = random.Random(7)
+        sessions = args.rows // args.session_length
+        recent = max(1, sessions // args.months)
+
+        def lookup(sql):
+            def run():
+                # Mostly recent sessions, as in production
+                session = sessions - 1 - rng.randrange(recent) if rng.random() < 0.9 else rng.randrange(sessions)
+                with conn.cursor() as cur:
+                    cur.execute(sql.format(schema=schema), (f"s{session}",))
+                    cur.fetchall()
+                conn.rollback()
+            return run
+
+        counter = [0]
+
+        def insert():
+            counter[0] += 1
+            with conn.cursor() as cur:
+                cur.execute(INSERT_SQL.format(schema=schema), (f"bench_{counter[0]}", f"bench_session_{counter[0] // 20}", counter[0] % 20, "question", "answer"))
+            conn.commit()
+
+        result = {
+            "bulk_rows_per_second": bulk_rows_per_second,
+            "index_mb": float(sizes['index_bytes']) / 1e6,
+            "total_mb": float(sizes['total_bytes']) / 1e6,
+            "insert": summarise_latencies(time_calls(insert, args.iterations)),
+            "history": summarise_latencies(time_calls(lookup(HISTORY_SQL), args.iterations)),
+            "page": summarise_latencies(time_calls(lookup(PAGE_SQL), args.iterations))
+        }
+
+        if not args.keep:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA {schema} CASCADE")
+            conn.commit()
+    return result
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Flat vs monthly-partitioned messages table: insert throughput and lookups")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--months", type=int, default=12, help="Months the rows are spread over")
+    parser.add_argument("--session-length", type=int, default=20)
+    parser.add_argument("--chunk", type=int, default=500_000, help="Rows per bulk INSERT")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--keep", action="store_true", help="Keep the bench_* schemas afterwards")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    manager = DatabaseManager(DatabaseConfig())
+    results = {
+        "flat": bench_layout(manager, "bench_flat", False, args),
+        "partitioned": bench_layout(manager, "bench_partitioned", True, args)
+    }
+    manager.close_pool()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.rows:,} rows over {args.months} months, sessions of {args.session_length} messages")
+        for name, result in results.items():
+            print(f"{name}: bulk load {result['bulk_rows_per_second']:,.0f} rows/s, indexes {result['index_mb']:.0f}MB of {result['total_mb']:.0f}MB")
+            for operation in ("insert", "history", "page"):
+                print(format_row(f"  {operation}", result[operation]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from bench_utils import summarise_latencies, format_row
+from ..database import DatabaseConfig
+from ..pool import BlockingConnectionPool, PoolTimeout
+
+# Concurrency stress test of the connection pool against local Postgres (uses the DB_* env vars).
+# Compares psycopg2's ThreadedConnectionPool, which fails fast when exhausted, with BlockingConnectionPool.
+# Run: python -m database.benchmarks.pool_stress --threads 50 --max-size 10
+APPLICATION_NAME = "pool_stress"
+
+def connection_kwargs(config: DatabaseConfig):
+    return {
+        "host": config.host,
+        "port": config.port,
+        "database": config.database,
+        "user": config.user,
+        "password": config.password,
+        "application_name": APPLICATION_NAME
+    }
+
+# Kills the pool's server connections, simulating a Postgres restart or failover
+def terminate_backends(connect):
+    conn = connect()
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity "
+            "WHERE application_name = %s AND pid <> pg_backend_pid()",
+            (APPLICATION_NAME,)
+        )
+        killed = cur.fetchone()[0]
+    conn.close()
+    return killed
+
+def run_workers(getconn, putconn, exhausted_errors, threads: int, ops: int, hold_ms: float, on_halfway=None):
+    samples, lock = [], threading.Lock()
+    counts = {"ok": 0, "exhausted": 0, "failed": 0}
+    done = [0]
+    halfway = threads * ops // 2
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        for _ in range(ops):
+            start = time.perf_counter()
+            outcome = "ok"
+            conn = None
+            try:
+                conn = getconn()
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_sleep(%s)", (hold_ms / 1000,))
+                conn.rollback()
+            except exhausted_errors:
+                outcome = "exhausted"
+            except psycopg2.Error:
+                outcome = "failed"
+            finally:
+                if conn is not None:
+                    putconn(conn)
+
+            elapsed = time.perf_counter() - start
+            with lock:
+                counts[outcome] += 1
+                if outcome == "ok":
+                    samples.append(elapsed)
+                done[0] += 1
+                trigger = on_halfway is not None and done[0] == halfway
+            if trigger:
+                on_halfway()
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return dict(counts, latency=summarise_latencies(samples), ops_per_second=counts["ok"] / elapsed, seconds=elapsed)
+
+def putconn_threaded(pool):
+    def putconn(conn):
+        pool.putconn(conn, close=bool(conn.closed))
+    return putconn
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Connection pool concurrency stress test")
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--ops", type=int, default=20, help="Checkouts per thread")
+    parser.add_argument("--hold-ms", type=float, default=20, help="Server-side time each checkout holds the connection")
+    parser.add_argument("--max-size", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=5.0, help="BlockingConnectionPool checkout timeout")
+    parser.add_argument("--terminate", action="store_true", help="Kill all pooled server connections halfway through")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    kwargs = connection_kwargs(DatabaseConfig())
+    connect = lambda: psycopg2.connect(**kwargs)
+    results = {}
+
+    threaded = ThreadedConnectionPool(1, args.max_size, **kwargs)
+    results["threaded"] = run_workers(
+        threaded.getconn, putconn_threaded(threaded), PoolError,
+        args.threads, args.ops, args.hold_ms,
+        on_halfway=(lambda: terminate_backends(connect)) if args.terminate else None
+    )
+    threaded.closeall()
+
+    # validate_after=0 checks every idle connection on checkout, so killed connections are replaced
+    blocking = BlockingConnectionPool(connect, min_size=1, max_size=args.max_size, timeout=args.timeout, validate_after=0 if args.terminate else 30)
+    results["blocking"] = run_workers(
+        blocking.getconn, blocking.putconn, PoolTimeout,
+        args.threads, args.ops, args.hold_ms,
+        on_halfway=(lambda: terminate_backends(connect)) if args.terminate else None
+    )
+    results["blocking"]["pool"] = blocking.get_metrics()
+    blocking.closeall()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.threads} threads x {args.ops} checkouts, {args.hold_ms:.0f}ms hold, max {args.max_size} connections")
+        for name, result in results.items():
+            print(format_row(name, result["latency"]))
+            print(f"{'':<32} ok={result['ok']} exhausted={result['exhausted']} failed={result['failed']} throughput={result['ops_per_second']:.1f} ops/s")
+        pool = results["blocking"]["pool"]
+        print(f"blocking pool: waited {pool['waited_checkouts']}/{pool['checkouts']} checkouts, wait p95={pool['wait_p95_ms']:.1f}ms max={pool['wait_max_ms']:.1f}ms, "
+              f"peak waiting={pool['peak_waiting']}, created={pool['connections_created']}, validation failures={pool['validation_failures']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
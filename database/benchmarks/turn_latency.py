@@ -0,0 +1,79 @@
+import sys
+import json
+import uuid
+import argparse
+import logging
+from datetime import datetime, timezone
+from bench_utils import summarise_latencies, time_calls, format_row
+from ..database import DatabaseConfig, create_backend
+
+# Per-turn database latency of each DAO backend against local Postgres (uses the DB_* env vars).
+# A turn is what handle_user_message does: load the session and its messages, then save the new
+# message and the updated conversation. "separate" saves with create_message + update_session.
+# Run: python -m database.benchmarks.turn_latency --turns 500
+def make_turn(session_dao, message_dao, session_id: str, save: str):
+    state = {"count": 0, "conversation": []}
+
+    def turn():
+        session_dao.get_session(session_id)
+        message_dao.get_messages_by_session(session_id)
+
+        state["count"] += 1
+        question, answer = f"Benchmark question {state['count']}", "Benchmark answer " * 50
+        message_data = {
+            'id': f"{session_id}_{state['count']}",
+            'session_id': session_id,
+            'history': state["conversation"][-5:],
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'duration': 0.5,
+            'message_count': state["count"],
+            'question': question,
+            'answer': answer,
+            'sources': [{"file_name": "bench.docx", "score": 0.9}]
+        }
+        state["conversation"].append({'question': question, 'answer': answer})
+
+        if save == "separate":
+            message_dao.create_message(message_data)
+            session_dao.update_session(session_id, conversation_data=state["conversation"], end_timestamp=datetime.now(timezone.utc))
+        else:
+            message_dao.save_turn(message_data, state["conversation"], datetime.now(timezone.utc))
+
+    return turn
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Per-turn DB latency: psycopg2 vs psycopg3 (prepared statements + pipeline)")
+    parser.add_argument("--turns", type=int, default=300, help="Turns per backend")
+    parser.add_argument("--session-length", type=int, default=20, help="Turns before switching to a fresh session")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    results = {}
+    for backend, save in (("psycopg2", "separate"), ("psycopg2", "save_turn"), ("psycopg3", "save_turn")):
+        config = DatabaseConfig()
+        config.backend = backend
+        manager, session_dao, message_dao = create_backend(config)
+
+        samples = []
+        remaining = args.turns
+        while remaining > 0:
+            session_id = f"bench_turn_{uuid.uuid4().hex[:12]}"
+            session_dao.create_session(session_id)
+            turns = min(args.session_length, remaining)
+            samples += time_calls(make_turn(session_dao, message_dao, session_id, save), turns, warmup=0)
+            remaining -= turns
+
+        results[f"{backend} ({save})"] = summarise_latencies(samples)
+        manager.close_pool()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.turns} turns per backend, sessions of {args.session_length} turns")
+        for name, stats in results.items():
+            print(format_row(name, stats))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
 import os
 import logging
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from contextlib import contextmanager
-from psycopg2.extras import RealDictCursor, Json
-from psycopg2.pool import ThreadedConnectionPool
+import psycopg2
+from psycopg2.extras import RealDictCursor, Json, execute_values
+from .pool import BlockingConnectionPool
+from .write_behind import WriteBehindQueue
+from tracing import trace_methods
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +23,22 @@ class DatabaseConfig:
         self.password = os.getenv('DB_PASSWORD', 'rag_password')
         self.min_connections = int(os.getenv('DB_MIN_CONNECTIONS', '1'))
         self.max_connections = int(os.getenv('DB_MAX_CONNECTIONS', '10'))
+        # DAO implementation: 'psycopg2' (default) or 'psycopg3' (prepared statements and pipeline mode)
+        self.backend = os.getenv('DB_BACKEND', 'psycopg2').lower()
+        # psycopg3 only: executions before a statement is prepared server-side, empty disables (e.g. behind PgBouncer)
+        prepare_threshold = os.getenv('DB_PREPARE_THRESHOLD', '0')
+        self.prepare_threshold = int(prepare_threshold) if prepare_threshold else None
+        # Seconds to wait for a free connection, connection max age, and idle time before a connection is re-validated
+        self.pool_timeout = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+        self.pool_max_lifetime = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))
+        self.pool_validate_after = float(os.getenv('DB_POOL_VALIDATE_AFTER', '30'))
+        # Write-behind mode: message inserts and session updates are queued and flushed in batches
+        self.write_behind = os.getenv('DB_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+        self.write_behind_queue_size = int(os.getenv('DB_WRITE_BEHIND_QUEUE_SIZE', '1000'))
+        self.write_behind_batch_size = int(os.getenv('DB_WRITE_BEHIND_BATCH_SIZE', '100'))
+        self.write_behind_flush_interval = float(os.getenv('DB_WRITE_BEHIND_FLUSH_INTERVAL', '0.2'))
+        self.write_behind_max_retries = int(os.getenv('DB_WRITE_BEHIND_MAX_RETRIES', '5'))
+        self.write_behind_spill_path = os.getenv('DB_WRITE_BEHIND_SPILL_PATH', './write_behind_spill.jsonl')
 
 # Database connection and operations manager
 class DatabaseManager:
@@ -30,21 +49,29 @@ class DatabaseManager:
     
     def _initialize_pool(self):
         try:
-            self.pool = ThreadedConnectionPool(
-                self.config.min_connections,
-                self.config.max_connections,
-                host=self.config.host,
-                port=self.config.port,
-                database=self.config.database,
-                user=self.config.user,
-                password=self.config.password,
-                cursor_factory=RealDictCursor
+            self.pool = BlockingConnectionPool(
+                self._connect,
+                min_size=self.config.min_connections,
+                max_size=self.config.max_connections,
+                timeout=self.config.pool_timeout,
+                max_lifetime=self.config.pool_max_lifetime,
+                validate_after=self.config.pool_validate_after
             )
             logger.info("Database connection pool initialised successfully")
         except Exception as e:
             logger.error(f"Failed to initialise database pool: {e}")
             raise
     
+    def _connect(self):
+        return psycopg2.connect(
+            host=self.config.host,
+            port=self.config.port,
+            database=self.config.database,
+            user=self.config.user,
+            password=self.config.password,
+            cursor_factory=RealDictCursor
+        )
+    
     @contextmanager
     def get_connection(self):
         conn = None
@@ -52,20 +79,23 @@ class DatabaseManager:
             conn = self.pool.getconn()
             yield conn
         except Exception as e:
-            if conn:
-                conn.rollback()
+            # The pool rolls back (or discards a broken connection) on return
             logger.error(f"Database operation failed: {e}")
             raise
         finally:
             if conn:
                 self.pool.putconn(conn)
     
+    def get_pool_metrics(self) -> Dict:
+        return self.pool.get_metrics()
+    
     def close_pool(self):
         if self.pool:
             self.pool.closeall()
             logger.info("Database connection pool closed")
 
 # Data Access Object for sessions
+@trace_methods('db.session')
 class SessionDAO:
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
@@ -93,86 +123,188 @@ class SessionDAO:
                 result = cur.fetchone()
                 return dict(result) if result else None
     
+    # One static statement for every combination of fields; NULL keeps the stored value
+    UPDATE_SESSION_SQL = """
+        UPDATE sessions
+        SET conversation_data = COALESCE(%s::jsonb, conversation_data),
+            end_timestamp = COALESCE(%s::timestamptz, end_timestamp),
+            metadata = COALESCE(%s::jsonb, metadata)
+        WHERE session_id = %s
+        RETURNING *
+    """
+    
     def update_session(self, session_id: str, conversation_data: List = None, end_timestamp: datetime = None, metadata: Dict = None) -> Optional[Dict]:
+        if conversation_data is None and end_timestamp is None and metadata is None:
+            return self.get_session(session_id)
+        
         with self.db.get_connection() as conn:
             with conn.cursor() as cur:
-                # Build dynamic update query
-                set_clauses = []
-                params = []
-                
-                if conversation_data is not None:
-                    set_clauses.append("conversation_data = %s")
-                    params.append(Json(conversation_data))
-                
-                if end_timestamp is not None:
-                    set_clauses.append("end_timestamp = %s")
-                    params.append(end_timestamp)
-                
-                if metadata is not None:
-                    set_clauses.append("metadata = %s")
-                    params.append(Json(metadata))
-                
-                if not set_clauses:
-                    return self.get_session(session_id)
-                
-                params.append(session_id)
-                
-                cur.execute(f"""
-                    UPDATE sessions 
-                    SET {', '.join(set_clauses)}
-                    WHERE session_id = %s
-                    RETURNING *
-                """, params)
+                cur.execute(self.UPDATE_SESSION_SQL, (
+                    Json(conversation_data) if conversation_data is not None else None,
+                    end_timestamp,
+                    Json(metadata) if metadata is not None else None,
+                    session_id
+                ))
                 
                 result = cur.fetchone()
                 conn.commit()
                 return dict(result) if result else None
+    
+    # Top-level keys are merged into the stored metadata, so concurrent writers of different keys do not clobber each other
+    MERGE_SESSION_METADATA_SQL = """
+        UPDATE sessions
+        SET metadata = COALESCE(metadata, '{}'::jsonb) || %s::jsonb
+        WHERE session_id = %s
+    """
+    
+    def merge_session_metadata(self, session_id: str, metadata: Dict) -> bool:
+        """Merge keys into a session's metadata, returns False when the session does not exist"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(self.MERGE_SESSION_METADATA_SQL, (Json(metadata), session_id))
+                updated = cur.rowcount > 0
+                conn.commit()
+                return updated
 
 # Data Access Object for messages  
+@trace_methods('db.message')
 class MessageDAO:
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
     
+    # Resolves session_uuid in the same statement; no row comes back when the session does not exist or the
+    # message is already stored. Partitioning by timestamp means only (message_id, timestamp) can be UNIQUE, so
+    # message_id uniqueness is checked here, through the (session_id, message_count) index. It is not enforced
+    # against a concurrent insert (or a second copy in the same batch); retries of one message carry its original
+    # timestamp and are still caught by the constraint.
+    INSERT_MESSAGE_SQL = """
+        INSERT INTO messages (
+            message_id, session_id, session_uuid, message_count,
+            question, answer, sources, history, duration, 
+            timestamp, metadata
+        )
+        SELECT %s, s.session_id, s.id, %s, %s, %s, %s, %s, %s, %s, %s
+        FROM sessions s
+        WHERE s.session_id = %s
+          AND NOT EXISTS (SELECT 1 FROM messages m WHERE m.session_id = s.session_id AND m.message_count = %s AND m.message_id = %s)
+        RETURNING *
+    """
+    
+    @staticmethod
+    def _message_params(message_data: Dict) -> tuple:
+        return (
+            message_data['id'],
+            message_data['message_count'],
+            message_data['question'],
+            message_data['answer'],
+            Json(message_data.get('sources', [])),
+            Json(message_data.get('history', [])),
+            message_data.get('duration', 0),
+            datetime.fromisoformat(message_data['timestamp'].replace('Z', '+00:00')) if isinstance(message_data['timestamp'], str) else message_data['timestamp'],
+            Json(message_data.get('metadata', {})),
+            message_data['session_id'],
+            message_data['message_count'],
+            message_data['id']
+        )
+    
     def create_message(self, message_data: Dict) -> Dict:
         with self.db.get_connection() as conn:
             with conn.cursor() as cur:
-                # Get session UUID for foreign key
-                cur.execute("""
-                    SELECT id FROM sessions WHERE session_id = %s
-                """, (message_data['session_id'],))
-                
-                session_result = cur.fetchone()
-                if not session_result:
-                    raise ValueError(f"Session {message_data['session_id']} not found")
-                
-                session_uuid = session_result['id']
-                
-                cur.execute("""
-                    INSERT INTO messages (
-                        message_id, session_id, session_uuid, message_count,
-                        question, answer, sources, history, duration, 
-                        timestamp, metadata
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING *
-                """, (
-                    message_data['id'],
-                    message_data['session_id'],
-                    session_uuid,
-                    message_data['message_count'],
-                    message_data['question'],
-                    message_data['answer'],
-                    Json(message_data.get('sources', [])),
-                    Json(message_data.get('history', [])),
-                    message_data.get('duration', 0),
-                    datetime.fromisoformat(message_data['timestamp'].replace('Z', '+00:00')) if isinstance(message_data['timestamp'], str) else message_data['timestamp'],
-                    Json(message_data.get('metadata', {}))
-                ))
+                cur.execute(self.INSERT_MESSAGE_SQL, self._message_params(message_data))
                 
                 result = cur.fetchone()
+                if not result:
+                    raise ValueError(f"Session {message_data['session_id']} not found or message {message_data['id']} already stored")
+                
                 conn.commit()
                 return dict(result)
     
+    def save_turn(self, message_data: Dict, conversation_data: List, end_timestamp: datetime) -> Tuple[Dict, Optional[Dict]]:
+        """Insert a message and update its session's conversation in one transaction"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(self.INSERT_MESSAGE_SQL, self._message_params(message_data))
+                message = cur.fetchone()
+                if not message:
+                    conn.rollback()
+                    raise ValueError(f"Session {message_data['session_id']} not found or message {message_data['id']} already stored")
+                
+                cur.execute(SessionDAO.UPDATE_SESSION_SQL, (Json(conversation_data), end_timestamp, None, message_data['session_id']))
+                session = cur.fetchone()
+                conn.commit()
+                return dict(message), dict(session) if session else None
+    
+    # Batched write-behind flush: multi-row INSERT resolving session_uuid in the same statement, ON CONFLICT keeps retried batches idempotent
+    BATCH_INSERT_MESSAGES_SQL = """
+        INSERT INTO messages (
+            message_id, session_id, session_uuid, message_count,
+            question, answer, sources, history, duration,
+            timestamp, metadata
+        )
+        SELECT v.message_id, v.session_id, s.id, v.message_count,
+               v.question, v.answer, v.sources, v.history, v.duration,
+               v.timestamp, v.metadata
+        FROM (VALUES %s) AS v(message_id, session_id, message_count, question, answer, sources, history, duration, timestamp, metadata)
+        JOIN sessions s ON s.session_id = v.session_id
+        WHERE NOT EXISTS (SELECT 1 FROM messages m WHERE m.session_id = v.session_id AND m.message_count = v.message_count AND m.message_id = v.message_id)
+        ON CONFLICT (message_id, timestamp) DO NOTHING
+    """
+    BATCH_INSERT_MESSAGES_TEMPLATE = "(%s, %s, %s::integer, %s, %s, %s::jsonb, %s::jsonb, %s::numeric, %s::timestamptz, %s::jsonb)"
+    
+    BATCH_UPDATE_SESSIONS_SQL = """
+        UPDATE sessions AS s
+        SET conversation_data = COALESCE(v.conversation_data, s.conversation_data),
+            end_timestamp = COALESCE(v.end_timestamp, s.end_timestamp),
+            metadata = COALESCE(v.metadata, s.metadata)
+        FROM (VALUES %s) AS v(session_id, conversation_data, end_timestamp, metadata)
+        WHERE s.session_id = v.session_id
+    """
+    BATCH_UPDATE_SESSIONS_TEMPLATE = "(%s, %s::jsonb, %s::timestamptz, %s::jsonb)"
+    
+    def write_batch(self, messages: List[Dict], session_updates: List[Dict]) -> int:
+        """Insert messages and apply coalesced session updates in one transaction, returns the number of messages inserted"""
+        inserted = 0
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                if messages:
+                    execute_values(cur, self.BATCH_INSERT_MESSAGES_SQL, [
+                        (
+                            message['id'],
+                            message['session_id'],
+                            message['message_count'],
+                            message['question'],
+                            message['answer'],
+                            Json(message.get('sources', [])),
+                            Json(message.get('history', [])),
+                            message.get('duration', 0),
+                            message['timestamp'],
+                            Json(message.get('metadata', {}))
+                        )
+                        for message in messages
+                    ], template=self.BATCH_INSERT_MESSAGES_TEMPLATE, page_size=len(messages))
+                    inserted = cur.rowcount
+                
+                if session_updates:
+                    execute_values(cur, self.BATCH_UPDATE_SESSIONS_SQL, [
+                        (
+                            update['session_id'],
+                            Json(update['conversation_data']) if update.get('conversation_data') is not None else None,
+                            update.get('end_timestamp'),
+                            Json(update['metadata']) if update.get('metadata') is not None else None
+                        )
+                        for update in session_updates
+                    ], template=self.BATCH_UPDATE_SESSIONS_TEMPLATE, page_size=len(session_updates))
+            conn.commit()
+        return inserted
+    
+    def ping(self) -> bool:
+        """Round trip to the database, raises when it is unreachable"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+        return True
+    
     def get_messages_by_session(self, session_id: str) -> List[Dict]:
         """Get all messages for a session"""
         with self.db.get_connection() as conn:
@@ -184,12 +316,75 @@ class MessageDAO:
                 """, (session_id,))
                 
                 return [dict(row) for row in cur.fetchall()]
+
+    def get_conversation(self, session_id: str) -> List[Dict]:
+        """Get the question/answer turns of a session, without the per-message history copies"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT message_count, question, answer FROM messages
+                    WHERE session_id = %s
+                    ORDER BY message_count ASC
+                """, (session_id,))
+
+                return [dict(row) for row in cur.fetchall()]
+
+    # Columns sent to clients; history and sources stay server-side
+    MESSAGE_PAGE_COLUMNS = "message_id, message_count, question, answer, duration, timestamp"
+    
+    def get_message_page(self, session_id: str, before_count: int = None, limit: int = 20) -> Dict:
+        """Get one page of messages older than before_count, oldest first, with the cursor for the next page"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                # Fetch one extra row to know whether an older page exists
+                if before_count is None:
+                    cur.execute(f"""
+                        SELECT {self.MESSAGE_PAGE_COLUMNS} FROM messages
+                        WHERE session_id = %s
+                        ORDER BY message_count DESC
+                        LIMIT %s
+                    """, (session_id, limit + 1))
+                else:
+                    cur.execute(f"""
+                        SELECT {self.MESSAGE_PAGE_COLUMNS} FROM messages
+                        WHERE session_id = %s AND message_count < %s
+                        ORDER BY message_count DESC
+                        LIMIT %s
+                    """, (session_id, before_count, limit + 1))
+                
+                rows = [dict(row) for row in cur.fetchall()]
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+                rows.reverse()
+                
+                return {
+                    'messages': rows,
+                    'has_more': has_more,
+                    'next_cursor': rows[0]['message_count'] if has_more else None
+                }
        
 # Global database manager instance
+def create_backend(config: DatabaseConfig):
+    if config.backend == 'psycopg3':
+        # psycopg 3 is optional, only imported when selected
+        from .database_pg3 import Psycopg3DatabaseManager, Psycopg3SessionDAO, Psycopg3MessageDAO
+        manager = Psycopg3DatabaseManager(config)
+        return manager, Psycopg3SessionDAO(manager), Psycopg3MessageDAO(manager)
+    if config.backend != 'psycopg2':
+        raise ValueError(f"Unknown DB_BACKEND: {config.backend}")
+    manager = DatabaseManager(config)
+    return manager, SessionDAO(manager), MessageDAO(manager)
+
 db_config = DatabaseConfig()
-db_manager = DatabaseManager(db_config)
-session_dao = SessionDAO(db_manager)
-message_dao = MessageDAO(db_manager)
+db_manager, session_dao, message_dao = create_backend(db_config)
+write_behind_queue = WriteBehindQueue(
+    message_dao,
+    max_queue_size=db_config.write_behind_queue_size,
+    batch_size=db_config.write_behind_batch_size,
+    flush_interval=db_config.write_behind_flush_interval,
+    max_retries=db_config.write_behind_max_retries,
+    spill_path=db_config.write_behind_spill_path
+) if db_config.write_behind else None
 
 # Initialise database connection
 def init_database():
@@ -198,6 +393,8 @@ def init_database():
             with conn.cursor() as cur:
                 cur.execute("SELECT 1")
                 logger.info("Database connection test successful")
+        if write_behind_queue:
+            write_behind_queue.start()
         return True
     except Exception as e:
         logger.error(f"Database initialisation failed: {e}")
@@ -205,4 +402,7 @@ def init_database():
 
 # Close database connection
 def close_database():
+    # Flush (or spill) queued writes while the pool is still open
+    if write_behind_queue:
+        write_behind_queue.stop()
     db_manager.close_pool()
\ No newline at end of file
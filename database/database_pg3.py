@@ -0,0 +1,162 @@
+import logging
+import psycopg
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from .database import DatabaseManager, SessionDAO, MessageDAO
+from tracing import trace_methods
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# psycopg 3 backend (DB_BACKEND=psycopg3). Statements are server-side prepared on each pooled
+# connection (prepare_threshold), JSONB parameters are sent in binary (%b with Jsonb), and
+# multi-statement operations are sent in a single round trip with pipeline mode.
+# Connections are autocommit: psycopg 3 drops every prepared statement on ROLLBACK, which the
+# pool would otherwise issue after each read. Multi-statement writes use explicit transactions.
+class Psycopg3DatabaseManager(DatabaseManager):
+    def _connect(self):
+        return psycopg.connect(
+            host=self.config.host,
+            port=self.config.port,
+            dbname=self.config.database,
+            user=self.config.user,
+            password=self.config.password,
+            row_factory=dict_row,
+            autocommit=True,
+            prepare_threshold=self.config.prepare_threshold
+        )
+
+@trace_methods('db.session')
+class Psycopg3SessionDAO(SessionDAO):
+    CREATE_SESSION_SQL = """
+        INSERT INTO sessions (session_id, metadata)
+        VALUES (%s, %b)
+        RETURNING *
+    """
+
+    UPDATE_SESSION_SQL = """
+        UPDATE sessions
+        SET conversation_data = COALESCE(%b::jsonb, conversation_data),
+            end_timestamp = COALESCE(%b::timestamptz, end_timestamp),
+            metadata = COALESCE(%b::jsonb, metadata)
+        WHERE session_id = %s
+        RETURNING *
+    """
+
+    # Same update without RETURNING, for the batched write-behind flush
+    BATCH_UPDATE_SESSION_SQL = """
+        UPDATE sessions
+        SET conversation_data = COALESCE(%b::jsonb, conversation_data),
+            end_timestamp = COALESCE(%b::timestamptz, end_timestamp),
+            metadata = COALESCE(%b::jsonb, metadata)
+        WHERE session_id = %s
+    """
+
+    MERGE_SESSION_METADATA_SQL = """
+        UPDATE sessions
+        SET metadata = COALESCE(metadata, '{}'::jsonb) || %b::jsonb
+        WHERE session_id = %s
+    """
+
+    @staticmethod
+    def _update_params(session_id: str, conversation_data: List = None, end_timestamp: datetime = None, metadata: Dict = None) -> tuple:
+        return (
+            Jsonb(conversation_data) if conversation_data is not None else None,
+            end_timestamp,
+            Jsonb(metadata) if metadata is not None else None,
+            session_id
+        )
+
+    def create_session(self, session_id: str, metadata: Dict = None) -> Dict:
+        with self.db.get_connection() as conn:
+            return conn.execute(self.CREATE_SESSION_SQL, (session_id, Jsonb(metadata or {}))).fetchone()
+
+    def update_session(self, session_id: str, conversation_data: List = None, end_timestamp: datetime = None, metadata: Dict = None) -> Optional[Dict]:
+        if conversation_data is None and end_timestamp is None and metadata is None:
+            return self.get_session(session_id)
+
+        with self.db.get_connection() as conn:
+            return conn.execute(self.UPDATE_SESSION_SQL, self._update_params(session_id, conversation_data, end_timestamp, metadata)).fetchone()
+
+    def merge_session_metadata(self, session_id: str, metadata: Dict) -> bool:
+        with self.db.get_connection() as conn:
+            return conn.execute(self.MERGE_SESSION_METADATA_SQL, (Jsonb(metadata), session_id)).rowcount > 0
+
+@trace_methods('db.message')
+class Psycopg3MessageDAO(MessageDAO):
+    INSERT_MESSAGE_SQL = """
+        INSERT INTO messages (
+            message_id, session_id, session_uuid, message_count,
+            question, answer, sources, history, duration,
+            timestamp, metadata
+        )
+        SELECT %s, s.session_id, s.id, %s, %s, %s, %b, %b, %s, %s, %b
+        FROM sessions s
+        WHERE s.session_id = %s
+          AND NOT EXISTS (SELECT 1 FROM messages m WHERE m.session_id = s.session_id AND m.message_count = %s AND m.message_id = %s)
+        RETURNING *
+    """
+
+    # Row-at-a-time form of the write-behind insert; executemany pipelines the rows
+    BATCH_INSERT_MESSAGE_SQL = """
+        INSERT INTO messages (
+            message_id, session_id, session_uuid, message_count,
+            question, answer, sources, history, duration,
+            timestamp, metadata
+        )
+        SELECT %s, s.session_id, s.id, %s, %s, %s, %b, %b, %s, %s, %b
+        FROM sessions s
+        WHERE s.session_id = %s
+          AND NOT EXISTS (SELECT 1 FROM messages m WHERE m.session_id = s.session_id AND m.message_count = %s AND m.message_id = %s)
+        ON CONFLICT (message_id, timestamp) DO NOTHING
+    """
+
+    @staticmethod
+    def _message_params(message_data: Dict) -> tuple:
+        return (
+            message_data['id'],
+            message_data['message_count'],
+            message_data['question'],
+            message_data['answer'],
+            Jsonb(message_data.get('sources', [])),
+            Jsonb(message_data.get('history', [])),
+            message_data.get('duration', 0),
+            datetime.fromisoformat(message_data['timestamp'].replace('Z', '+00:00')) if isinstance(message_data['timestamp'], str) else message_data['timestamp'],
+            Jsonb(message_data.get('metadata', {})),
+            message_data['session_id'],
+            message_data['message_count'],
+            message_data['id']
+        )
+
+    def save_turn(self, message_data: Dict, conversation_data: List, end_timestamp: datetime) -> Tuple[Dict, Optional[Dict]]:
+        """Insert a message and update its session's conversation in one transaction and one round trip"""
+        with self.db.get_connection() as conn:
+            with conn.pipeline(), conn.transaction():
+                message_cur = conn.execute(self.INSERT_MESSAGE_SQL, self._message_params(message_data))
+                session_cur = conn.execute(Psycopg3SessionDAO.UPDATE_SESSION_SQL, Psycopg3SessionDAO._update_params(message_data['session_id'], conversation_data, end_timestamp))
+                # Checked inside the transaction so raising rolls the session update back
+                message = message_cur.fetchone()
+                if not message:
+                    raise ValueError(f"Session {message_data['session_id']} not found or message {message_data['id']} already stored")
+                session = session_cur.fetchone()
+            return message, session
+
+    def write_batch(self, messages: List[Dict], session_updates: List[Dict]) -> int:
+        """Insert messages and apply coalesced session updates in one transaction, returns the number of messages inserted"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as message_cur, conn.cursor() as session_cur:
+                with conn.pipeline(), conn.transaction():
+                    if messages:
+                        message_cur.executemany(self.BATCH_INSERT_MESSAGE_SQL, [self._message_params(message) for message in messages])
+
+                    if session_updates:
+                        session_cur.executemany(Psycopg3SessionDAO.BATCH_UPDATE_SESSION_SQL, [
+                            Psycopg3SessionDAO._update_params(update['session_id'], update.get('conversation_data'), update.get('end_timestamp'), update.get('metadata'))
+                            for update in session_updates
+                        ])
+
+                # Row counts are only known once the pipeline has synced
+                return max(message_cur.rowcount, 0) if messages else 0
@@ -0,0 +1,92 @@
+-- Convert an existing unpartitioned messages table to the monthly range-partitioned layout in init.sql.
+-- Run once against a database created from the previous init.sql:
+--   psql -h localhost -U rag_user -d rag_chatbot -f database/migrations/001_partition_messages.sql
+-- The copy runs in one transaction and holds an exclusive lock on messages, so stop the app first.
+-- For very large tables, run the per-month INSERT at the end in smaller time ranges instead.
+
+BEGIN;
+
+LOCK TABLE messages IN ACCESS EXCLUSIVE MODE;
+
+-- Keep the old table (and free its constraint and index names) until the copy is verified
+ALTER TABLE messages RENAME TO messages_unpartitioned;
+ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_pkey TO messages_unpartitioned_pkey;
+ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_message_id_key TO messages_unpartitioned_message_id_key;
+ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_session_uuid_fkey TO messages_unpartitioned_session_uuid_fkey;
+
+-- Redundant or unused indexes from the old layout
+DROP INDEX IF EXISTS idx_messages_message_id;
+DROP INDEX IF EXISTS idx_messages_session_id;
+DROP INDEX IF EXISTS idx_messages_session_uuid;
+DROP INDEX IF EXISTS idx_messages_timestamp;
+DROP INDEX IF EXISTS idx_messages_message_count;
+
+CREATE TABLE messages (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    message_id VARCHAR(255) NOT NULL,
+    session_id VARCHAR(255) NOT NULL,
+    session_uuid UUID REFERENCES sessions(id) ON DELETE CASCADE,
+    message_count INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    sources JSONB DEFAULT '[]'::jsonb,
+    history JSONB DEFAULT '[]'::jsonb,
+    duration DECIMAL(10, 4) DEFAULT 0,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    metadata JSONB DEFAULT '{}'::jsonb,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp),
+    UNIQUE (message_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE messages_default PARTITION OF messages DEFAULT;
+
+CREATE OR REPLACE FUNCTION create_messages_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    range_start DATE := date_trunc('month', month_start)::date;
+    range_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::date;
+    partition_name TEXT := format('messages_y%sm%s', to_char(range_start, 'YYYY'), to_char(range_start, 'MM'));
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE messages INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM messages_default WHERE timestamp >= %L AND timestamp < %L RETURNING *) INSERT INTO %I SELECT * FROM moved',
+        range_start, range_end, partition_name
+    );
+    EXECUTE format('ALTER TABLE messages ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', partition_name, range_start, range_end);
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE INDEX idx_messages_session_id_message_count ON messages(session_id, message_count);
+CREATE INDEX idx_messages_session_uuid ON messages(session_uuid);
+
+-- One partition per month that has data, through two months ahead
+SELECT create_messages_partition(month::date)
+FROM generate_series(
+    date_trunc('month', LEAST(COALESCE((SELECT min(COALESCE(timestamp, created_at)) FROM messages_unpartitioned), CURRENT_DATE), CURRENT_DATE)),
+    date_trunc('month', CURRENT_DATE + INTERVAL '2 months'),
+    INTERVAL '1 month'
+) AS month;
+
+INSERT INTO messages (
+    id, message_id, session_id, session_uuid, message_count,
+    question, answer, sources, history, duration,
+    timestamp, metadata, created_at
+)
+SELECT id, message_id, session_id, session_uuid, message_count,
+       question, answer, sources, history, duration,
+       COALESCE(timestamp, created_at, CURRENT_TIMESTAMP), metadata, created_at
+FROM messages_unpartitioned;
+
+GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO rag_user;
+
+COMMIT;
+
+-- After checking the row counts match:
+--   SELECT (SELECT count(*) FROM messages), (SELECT count(*) FROM messages_unpartitioned);
+--   DROP TABLE messages_unpartitioned;
@@ -0,0 +1,223 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Any
+from bench_utils import percentile_ms
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Raised when no connection became available within the checkout timeout
+class PoolTimeout(Exception):
+    pass
+
+# Raised when checking out from a pool that has been closed
+class PoolClosed(Exception):
+    pass
+
+# Bounded pool that makes callers wait (up to a timeout) instead of failing when exhausted.
+# Connections come from a plain connect() callable, are validated after sitting idle and
+# are recycled once they reach max_lifetime.
+class BlockingConnectionPool:
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 10, timeout: float = 5.0, max_lifetime: float = 1800.0, validate_after: float = 30.0, sample_size: int = 1000):
+        if min_size > max_size:
+            raise ValueError("min_size must not exceed max_size")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+
+        self._lock = threading.Lock()
+        # One condition per waiting caller, oldest first
+        self._waiters = deque()
+        # Idle connections as (conn, created_at, returned_at), most recently returned last
+        self._idle = deque()
+        # id(conn) -> (created_at, checked_out_at) for connections currently handed out
+        self._in_use: Dict[int, tuple] = {}
+        self._size = 0
+        self._closed = False
+
+        self._wait_samples = deque(maxlen=sample_size)
+        self._checkout_samples = deque(maxlen=sample_size)
+        self._metrics = {
+            "checkouts": 0,
+            "waited_checkouts": 0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "recycled": 0,
+            "validation_failures": 0,
+            "peak_in_use": 0,
+            "peak_waiting": 0
+        }
+
+        for _ in range(min_size):
+            conn = self._open()
+            self._idle.append((conn, time.monotonic(), time.monotonic()))
+            self._size += 1
+
+    def _open(self):
+        conn = self._connect()
+        with self._lock:
+            self._metrics["connections_created"] += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+        with self._lock:
+            self._metrics["connections_closed"] += 1
+
+    @staticmethod
+    def _is_usable(conn) -> bool:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # Caller must hold the lock
+    def _notify_next(self):
+        if self._waiters:
+            self._waiters[0].notify()
+
+    def getconn(self, timeout: float = None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        entry = None
+        waited = False
+
+        with self._lock:
+            # Waiters are served in arrival order so a burst cannot starve the oldest caller
+            ticket = threading.Condition(self._lock)
+            self._waiters.append(ticket)
+            self._metrics["peak_waiting"] = max(self._metrics["peak_waiting"], len(self._waiters))
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolClosed("Connection pool is closed")
+                    if self._waiters[0] is ticket:
+                        if self._idle:
+                            entry = self._idle.pop()
+                            break
+                        if self._size < self.max_size:
+                            # Reserve the slot now, connect outside the lock
+                            self._size += 1
+                            break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics["timeouts"] += 1
+                        raise PoolTimeout(f"No database connection available within {timeout:.1f}s ({self.max_size} in use)")
+                    waited = True
+                    ticket.wait(remaining)
+            finally:
+                self._waiters.remove(ticket)
+                self._notify_next()
+
+        try:
+            if entry is None:
+                conn, created_at = self._open(), time.monotonic()
+            else:
+                conn, created_at, returned_at = entry
+                now = time.monotonic()
+                if now - created_at >= self.max_lifetime:
+                    self._close(conn)
+                    with self._lock:
+                        self._metrics["recycled"] += 1
+                    conn, created_at = self._open(), time.monotonic()
+                elif conn.closed or (now - returned_at >= self.validate_after and not self._is_usable(conn)):
+                    logger.warning("Discarding stale database connection")
+                    self._close(conn)
+                    with self._lock:
+                        self._metrics["validation_failures"] += 1
+                    conn, created_at = self._open(), time.monotonic()
+        except Exception:
+            # Give the reserved slot back so waiters are not starved by a failed connect
+            with self._lock:
+                self._size -= 1
+                self._notify_next()
+            raise
+
+        checked_out_at = time.monotonic()
+        with self._lock:
+            self._in_use[id(conn)] = (created_at, checked_out_at)
+            self._wait_samples.append(checked_out_at - start)
+            self._metrics["checkouts"] += 1
+            if waited:
+                self._metrics["waited_checkouts"] += 1
+            self._metrics["peak_in_use"] = max(self._metrics["peak_in_use"], len(self._in_use))
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        with self._lock:
+            created_at, checked_out_at = self._in_use.pop(id(conn), (time.monotonic(), time.monotonic()))
+            self._checkout_samples.append(time.monotonic() - checked_out_at)
+
+        keep = not discard and not self._closed and not conn.closed and time.monotonic() - created_at < self.max_lifetime
+        if keep:
+            try:
+                # Never hand out a connection with an open or aborted transaction
+                conn.rollback()
+            except Exception:
+                keep = False
+
+        if not keep:
+            self._close(conn)
+
+        with self._lock:
+            if keep:
+                self._idle.append((conn, created_at, time.monotonic()))
+            else:
+                self._size -= 1
+            self._notify_next()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            for ticket in self._waiters:
+                ticket.notify()
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            in_use = len(self._in_use)
+            metrics.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "waiting": len(self._waiters),
+                "max_size": self.max_size,
+                "saturation": in_use / self.max_size if self.max_size else 0.0,
+                "wait_p50_ms": percentile_ms(self._wait_samples, 50),
+                "wait_p95_ms": percentile_ms(self._wait_samples, 95),
+                "wait_max_ms": max(self._wait_samples, default=0.0) * 1000,
+                "checkout_p50_ms": percentile_ms(self._checkout_samples, 50),
+                "checkout_p95_ms": percentile_ms(self._checkout_samples, 95),
+                "checkout_max_ms": max(self._checkout_samples, default=0.0) * 1000
+            })
+        return metrics
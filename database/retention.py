@@ -0,0 +1,137 @@
+import os
+import re
+import sys
+import gzip
+import json
+import argparse
+import logging
+from datetime import date
+from .database import DatabaseConfig, DatabaseManager
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Monthly partitions are named messages_yYYYYmMM by create_messages_partition() in init.sql
+PARTITION_NAME = re.compile(r'^messages_y(?P<year>\d{4})m(?P<month>\d{2})$')
+
+def add_months(day: date, months: int) -> date:
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+# Attached partitions, and monthly tables left detached by an archive run that did not finish
+def list_partitions(conn) -> list:
+    with conn.cursor() as cur:
+        # The LIKE only narrows the scan; PARTITION_NAME decides
+        cur.execute("""
+            SELECT child.relname AS name,
+                   EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = child.oid AND inhparent = 'messages'::regclass) AS attached
+            FROM pg_class child
+            JOIN pg_namespace ns ON ns.oid = child.relnamespace
+            WHERE ns.nspname = current_schema() AND child.relkind = 'r' AND child.relname LIKE 'messages_y%'
+            ORDER BY child.relname
+        """)
+        rows = cur.fetchall()
+
+    partitions = []
+    for row in rows:
+        match = PARTITION_NAME.match(row['name'])
+        if match:
+            partitions.append({"name": row['name'], "month": date(int(match.group('year')), int(match.group('month')), 1), "attached": row['attached']})
+    return partitions
+
+def ensure_partitions(conn, months_ahead: int) -> list:
+    created = []
+    with conn.cursor() as cur:
+        for offset in range(months_ahead + 1):
+            cur.execute("SELECT create_messages_partition(%s) AS name", (add_months(date.today().replace(day=1), offset),))
+            created.append(cur.fetchone()['name'])
+    conn.commit()
+    return created
+
+# Detach a partition, stream it to a gzipped CSV next to a JSON manifest, then drop it. The detach is
+# committed first so no new rows can land in the table while it is copied; a run that stops before the
+# drop leaves a detached table, which list_partitions finds and the next run archives.
+def archive_partition(conn, partition: dict, archive_dir: str) -> dict:
+    name = partition["name"]
+    os.makedirs(archive_dir, exist_ok=True)
+    data_path = os.path.join(archive_dir, f"{name}.csv.gz")
+    tmp_path = f"{data_path}.tmp"
+
+    with conn.cursor() as cur:
+        if partition.get("attached", True):
+            cur.execute(f'ALTER TABLE messages DETACH PARTITION "{name}"')
+            conn.commit()
+        else:
+            logger.warning(f"Resuming archive of {name}, detached by an earlier run")
+
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                cur.copy_expert(f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER)', f)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, data_path)
+
+        cur.execute(f'SELECT count(*) AS rows FROM "{name}"')
+        rows = cur.fetchone()['rows']
+
+        manifest = {
+            "partition": name,
+            "range_start": partition["month"].isoformat(),
+            "range_end": add_months(partition["month"], 1).isoformat(),
+            "rows": rows,
+            "file": os.path.basename(data_path),
+            "bytes": os.path.getsize(data_path)
+        }
+        with open(os.path.join(archive_dir, f"{name}.json"), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Only drop once the archive is safely on disk
+        cur.execute(f'DROP TABLE "{name}"')
+        conn.commit()
+
+    logger.info(f"Archived {name}: {rows} rows -> {data_path} ({manifest['bytes']} bytes)")
+    return manifest
+
+def run_retention(manager: DatabaseManager, keep_months: int, archive_dir: str, months_ahead: int = 2, dry_run: bool = False) -> dict:
+    cutoff = add_months(date.today().replace(day=1), -keep_months)
+    with manager.get_connection() as conn:
+        created = [] if dry_run else ensure_partitions(conn, months_ahead)
+        partitions = list_partitions(conn)
+        expired = [partition for partition in partitions if partition["month"] < cutoff]
+        for partition in partitions:
+            if not partition["attached"] and partition["month"] >= cutoff:
+                logger.warning(f"{partition['name']} is detached but not expired; reattach it or archive it by hand")
+
+        archived = []
+        for partition in expired:
+            if dry_run:
+                logger.info(f"Would archive {partition['name']}")
+                continue
+            archived.append(archive_partition(conn, partition, archive_dir))
+
+    return {"cutoff": cutoff.isoformat(), "ensured": created, "expired": [partition["name"] for partition in expired], "archived": archived}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Create upcoming message partitions and archive expired ones")
+    parser.add_argument("--keep-months", type=int, default=int(os.getenv('MESSAGE_RETENTION_MONTHS', '12')), help="Full months kept before the current one")
+    parser.add_argument("--archive-dir", default=os.getenv('MESSAGE_ARCHIVE_DIR', './archive'))
+    parser.add_argument("--months-ahead", type=int, default=2, help="Future monthly partitions to create")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the partitions that would be archived")
+    args = parser.parse_args(argv)
+
+    # Always psycopg2: archiving streams with copy_expert
+    config = DatabaseConfig()
+    config.min_connections = 1
+    config.max_connections = 1
+    manager = DatabaseManager(config)
+    try:
+        result = run_retention(manager, args.keep_months, args.archive_dir, args.months_ahead, args.dry_run)
+    finally:
+        manager.close_pool()
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional
+from tracing import traced
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bounded in-process queue of message inserts and session updates, flushed in batches by a background writer.
+# Batches are written through the message DAO's write_batch, so any DB backend works.
+# Items of one session are written in the order they were enqueued: once a session has anything in the
+# spill file, its later items are spilled behind it rather than overtaking it through the queue.
+class WriteBehindQueue:
+    def __init__(self, message_dao, max_queue_size: int = 1000, batch_size: int = 100, flush_interval: float = 0.2, max_retries: int = 5, spill_path: str = "./write_behind_spill.jsonl", dead_letter_path: str = None):
+        self.dao = message_dao
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.spill_path = spill_path
+        # Items the database rejects on their own while accepting other writes; kept for inspection, never replayed
+        root, extension = os.path.splitext(spill_path)
+        self.dead_letter_path = dead_letter_path or f"{root}.dead{extension}"
+        # Reentrant: _put spills while holding it, so checking and spilling a session is one step
+        self._spill_lock = threading.RLock()
+        # Sessions with items in the spill file, including one left by a previous run
+        self._spilled_sessions = set()
+        for path in (spill_path, f"{spill_path}.replaying"):
+            if os.path.exists(path):
+                with open(path) as f:
+                    self._spilled_sessions.update(json.loads(line)["data"]['session_id'] for line in f if line.strip())
+        self._pending_lock = threading.Lock()
+        # Messages accepted but not yet committed, so the same process can still read its own writes
+        self._pending_messages: Dict[str, Dict[str, Dict]] = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "enqueued": 0,
+            "flushed_batches": 0,
+            "flushed_messages": 0,
+            "flushed_session_updates": 0,
+            "retries": 0,
+            "failed_batches": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "dead_lettered": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0
+        }
+
+    def _count(self, key: str, amount: float = 1):
+        with self._metrics_lock:
+            self._metrics[key] += amount
+
+    def get_metrics(self) -> Dict:
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["queue_depth"] = self.queue.qsize()
+        with self._spill_lock:
+            metrics["spilled_sessions"] = len(self._spilled_sessions)
+        metrics["avg_flush_ms"] = metrics["total_flush_ms"] / metrics["flushed_batches"] if metrics["flushed_batches"] else 0.0
+        return metrics
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._replay_spill()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        logger.info("Write-behind persistence queue started")
+
+    # Drain what is queued, then spill anything left so nothing is lost on shutdown
+    def stop(self, timeout: float = 10.0):
+        if not self._thread:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+        leftover = self._drain(limit=None)
+        if leftover:
+            self._spill(leftover)
+        logger.info(f"Write-behind persistence queue stopped: {self.get_metrics()}")
+
+    def enqueue_message(self, message_data: Dict):
+        item = {"type": "message", "data": self._jsonable(message_data)}
+        with self._pending_lock:
+            self._pending_messages.setdefault(message_data['session_id'], {})[message_data['id']] = item["data"]
+        self._put(item)
+
+    def enqueue_session_update(self, session_id: str, conversation_data: List = None, end_timestamp: datetime = None, metadata: Dict = None):
+        self._put({"type": "session", "data": self._jsonable({
+            "session_id": session_id,
+            "conversation_data": conversation_data,
+            "end_timestamp": end_timestamp,
+            "metadata": metadata
+        })})
+
+    def pending_messages(self, session_id: str) -> List[Dict]:
+        with self._pending_lock:
+            messages = list(self._pending_messages.get(session_id, {}).values())
+        return sorted(messages, key=lambda message: message['message_count'])
+
+    @staticmethod
+    def _jsonable(data: Dict) -> Dict:
+        return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in data.items()}
+
+    def _put(self, item: Dict):
+        self._count("enqueued")
+        with self._spill_lock:
+            if item["data"]['session_id'] in self._spilled_sessions:
+                self._spill([item])
+                return
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                # Never block the request path: overflow goes straight to the durable spill file
+                logger.warning("Write-behind queue full, spilling to disk")
+                self._spill([item])
+
+    def _drain(self, limit: Optional[int]) -> List[Dict]:
+        items = []
+        while limit is None or len(items) < limit:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        last_spill_check = time.monotonic()
+        while not self._stop_event.is_set() or not self.queue.empty():
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Idle: pick up anything spilled earlier while the database was unavailable
+                if time.monotonic() - last_spill_check > 30:
+                    last_spill_check = time.monotonic()
+                    self._replay_spill()
+                continue
+
+            batch = self._divert_spilled_sessions([first] + self._drain(limit=self.batch_size - 1))
+            unwritten = self._flush_with_retry(batch) if batch else []
+            if unwritten:
+                self._spill(unwritten)
+
+    # Items queued before an earlier item of their session was spilled must not be written ahead of it
+    def _divert_spilled_sessions(self, batch: List[Dict]) -> List[Dict]:
+        with self._spill_lock:
+            if not self._spilled_sessions:
+                return batch
+            kept = [item for item in batch if item["data"]['session_id'] not in self._spilled_sessions]
+            diverted = [item for item in batch if item["data"]['session_id'] in self._spilled_sessions]
+            if diverted:
+                self._spill(diverted)
+        return kept
+
+    # Returns the items left unwritten because the database is unavailable, in order
+    def _flush_with_retry(self, batch: List[Dict]) -> List[Dict]:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self._flush(batch)
+                return []
+            except Exception as e:
+                if attempt == self.max_retries or self._stop_event.is_set():
+                    logger.error(f"Write-behind flush of {len(batch)} items failed after {attempt} attempt(s): {e}")
+                    self._count("failed_batches")
+                    return self._flush_items(batch)
+                self._count("retries")
+                delay = random.uniform(0, min(5.0, 0.1 * (2 ** attempt)))
+                logger.warning(f"Write-behind flush failed (attempt {attempt}/{self.max_retries}), retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+
+    # A failed batch is retried item by item, so one bad row cannot hold back the rest of its batch forever.
+    # An item that fails while the database still answers is dead-lettered; once the database itself is
+    # unreachable, the item and everything after it are returned for spilling.
+    def _flush_items(self, batch: List[Dict]) -> List[Dict]:
+        for index, item in enumerate(batch):
+            try:
+                self._flush([item])
+                continue
+            except Exception as e:
+                error = e
+            if self._stop_event.is_set() or not self._database_available():
+                logger.error(f"Database unavailable, {len(batch) - index} write-behind items left unwritten")
+                return batch[index:]
+            self._dead_letter(item, error)
+        return []
+
+    def _database_available(self) -> bool:
+        try:
+            return self.dao.ping()
+        except Exception:
+            return False
+
+    def _dead_letter(self, item: Dict, error: Exception):
+        logger.error(f"Write-behind {item['type']} for session {item['data']['session_id']} rejected, moved to {self.dead_letter_path}: {error}")
+        with self._spill_lock:
+            with open(self.dead_letter_path, 'a') as f:
+                f.write(json.dumps(dict(item, error=str(error), failed_at=datetime.now().isoformat())) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        if item["type"] == "message":
+            self._forget_pending([item["data"]])
+        self._count("dead_lettered")
+
+    def _forget_pending(self, messages: List[Dict]):
+        with self._pending_lock:
+            for message in messages:
+                session_pending = self._pending_messages.get(message['session_id'], {})
+                session_pending.pop(message['id'], None)
+                if not session_pending:
+                    self._pending_messages.pop(message['session_id'], None)
+
+    @staticmethod
+    def _merge_session_updates(updates: List[Dict]) -> List[Dict]:
+        merged = {}
+        for update in updates:
+            current = merged.setdefault(update['session_id'], {"session_id": update['session_id'], "conversation_data": None, "end_timestamp": None, "metadata": None})
+            for key in ("conversation_data", "end_timestamp", "metadata"):
+                if update.get(key) is not None:
+                    current[key] = update[key]
+        return list(merged.values())
+
+    @traced('write_behind.flush')
+    def _flush(self, batch: List[Dict]):
+        start = time.perf_counter()
+        messages = [item["data"] for item in batch if item["type"] == "message"]
+        session_updates = self._merge_session_updates([item["data"] for item in batch if item["type"] == "session"])
+
+        inserted = self.dao.write_batch(messages, session_updates)
+        if inserted < len(messages):
+            logger.warning(f"Write-behind inserted {inserted}/{len(messages)} messages (duplicates or unknown sessions skipped)")
+
+        self._forget_pending(messages)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._metrics_lock:
+            self._metrics["flushed_batches"] += 1
+            self._metrics["flushed_messages"] += len(messages)
+            self._metrics["flushed_session_updates"] += len(session_updates)
+            self._metrics["last_flush_ms"] = elapsed_ms
+            self._metrics["max_flush_ms"] = max(self._metrics["max_flush_ms"], elapsed_ms)
+            self._metrics["total_flush_ms"] += elapsed_ms
+
+    def _spill(self, items: List[Dict]):
+        with self._spill_lock:
+            with open(self.spill_path, 'a') as f:
+                for item in items:
+                    f.write(json.dumps(item) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._spilled_sessions.update(item["data"]['session_id'] for item in items)
+        self._count("spilled", len(items))
+
+    # Write spilled items back in batches from the writer thread. A spilled session's new items keep going to
+    # the spill file meanwhile, so whatever cannot be written now is put back in front of them.
+    def _replay_spill(self):
+        replaying_path = f"{self.spill_path}.replaying"
+        with self._spill_lock:
+            # A replay interrupted by a crash left its file behind; it is older than the spill file
+            if not os.path.exists(replaying_path):
+                if not os.path.exists(self.spill_path):
+                    self._spilled_sessions.clear()
+                    return
+                os.replace(self.spill_path, replaying_path)
+            with open(replaying_path) as f:
+                items = [json.loads(line) for line in f if line.strip()]
+            for item in items:
+                if item["type"] == "message":
+                    with self._pending_lock:
+                        self._pending_messages.setdefault(item["data"]['session_id'], {})[item["data"]['id']] = item["data"]
+
+        unwritten = []
+        for start in range(0, len(items), self.batch_size):
+            unwritten = self._flush_with_retry(items[start:start + self.batch_size])
+            if unwritten:
+                unwritten += items[start + self.batch_size:]
+                break
+
+        with self._spill_lock:
+            spilled_since = []
+            if os.path.exists(self.spill_path):
+                with open(self.spill_path) as f:
+                    spilled_since = [json.loads(line) for line in f if line.strip()]
+            if unwritten:
+                tmp_path = f"{self.spill_path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    for item in unwritten + spilled_since:
+                        f.write(json.dumps(item) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.spill_path)
+            os.remove(replaying_path)
+            self._spilled_sessions = {item["data"]['session_id'] for item in unwritten + spilled_since}
+
+        replayed = len(items) - len(unwritten)
+        if replayed:
+            self._count("replayed", replayed)
+            logger.info(f"Replayed {replayed} spilled write-behind items ({len(unwritten) + len(spilled_since)} still on disk)")
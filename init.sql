@@ -13,10 +13,11 @@ CREATE TABLE IF NOT EXISTS sessions (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
--- Create messages table
+-- Create messages table, range-partitioned by month on timestamp.
+-- Unique keys on a partitioned table must include the partition key.
 CREATE TABLE IF NOT EXISTS messages (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    message_id VARCHAR(255) UNIQUE NOT NULL,
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    message_id VARCHAR(255) NOT NULL,
     session_id VARCHAR(255) NOT NULL,
     session_uuid UUID REFERENCES sessions(id) ON DELETE CASCADE,
     message_count INTEGER NOT NULL,
@@ -25,21 +26,51 @@ CREATE TABLE IF NOT EXISTS messages (
     sources JSONB DEFAULT '[]'::jsonb,
     history JSONB DEFAULT '[]'::jsonb,
     duration DECIMAL(10, 4) DEFAULT 0,
-    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
     metadata JSONB DEFAULT '{}'::jsonb,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp),
+    UNIQUE (message_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Catches rows outside every monthly partition so inserts never fail
+CREATE TABLE IF NOT EXISTS messages_default PARTITION OF messages DEFAULT;
+
+-- Create the monthly partition containing month_start (messages_yYYYYmMM), moving any rows
+-- for that month out of the default partition first. Safe to call repeatedly.
+CREATE OR REPLACE FUNCTION create_messages_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    range_start DATE := date_trunc('month', month_start)::date;
+    range_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::date;
+    partition_name TEXT := format('messages_y%sm%s', to_char(range_start, 'YYYY'), to_char(range_start, 'MM'));
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE messages INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM messages_default WHERE timestamp >= %L AND timestamp < %L RETURNING *) INSERT INTO %I SELECT * FROM moved',
+        range_start, range_end, partition_name
+    );
+    EXECUTE format('ALTER TABLE messages ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', partition_name, range_start, range_end);
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Current month plus two ahead; python -m database.retention keeps creating future months
+SELECT create_messages_partition((CURRENT_DATE + make_interval(months => n))::date) FROM generate_series(0, 2) AS n;
 
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_sessions_session_id ON sessions(session_id);
 CREATE INDEX IF NOT EXISTS idx_sessions_start_timestamp ON sessions(start_timestamp);
 CREATE INDEX IF NOT EXISTS idx_sessions_end_timestamp ON sessions(end_timestamp);
 
-CREATE INDEX IF NOT EXISTS idx_messages_message_id ON messages(message_id);
-CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages(session_id);
+-- Serves history loads and pagination (WHERE session_id ORDER BY message_count)
+CREATE INDEX IF NOT EXISTS idx_messages_session_id_message_count ON messages(session_id, message_count);
+-- Needed by ON DELETE CASCADE from sessions
 CREATE INDEX IF NOT EXISTS idx_messages_session_uuid ON messages(session_uuid);
-CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp);
-CREATE INDEX IF NOT EXISTS idx_messages_message_count ON messages(message_count);
 
 -- Create function to automatically update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
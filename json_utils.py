@@ -31,4 +31,24 @@ def serialize_datetime_fields(data):
         return data
 
 def safe_json_response(data):
-    return serialize_datetime_fields(data)
\ No newline at end of file
+    return serialize_datetime_fields(data)
+
+# Converters for the non-JSON types psycopg2 returns at the top level of a row
+_FLAT_CONVERTERS = {
+    datetime: datetime.isoformat,
+    Decimal: float,
+    UUID: str
+}
+
+# Single pass over a flat row, much cheaper than the recursive walk for slim projections.
+# Nested JSONB values are passed through as-is, so only use this for rows without nested datetimes.
+def serialize_flat(row, exclude=()):
+    converters = _FLAT_CONVERTERS
+    return {
+        key: converters[type(value)](value) if type(value) in converters else value
+        for key, value in row.items()
+        if key not in exclude
+    }
+
+def serialize_rows(rows, exclude=()):
+    return [serialize_flat(row, exclude) for row in rows]
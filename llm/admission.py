@@ -0,0 +1,170 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUSY_MESSAGE = "I'm receiving a lot of questions right now. Please try again in a few seconds."
+
+# What one turn of the pipeline does at a given load level
+@dataclass(frozen=True)
+class DegradationLevel:
+    name: str
+    extract_query: bool = True
+    search_limit: int = 3
+    max_tokens: int = 3000
+
+# Cheapest last: skip the query-extraction LLM call, then retrieve less context, then cap the answer
+DEGRADATION_LEVELS = (
+    DegradationLevel("full"),
+    DegradationLevel("skip_query_extraction", extract_query=False),
+    DegradationLevel("reduced_context", extract_query=False, search_limit=1),
+    DegradationLevel("short_answer", extract_query=False, search_limit=1, max_tokens=800)
+)
+
+# Occupancy (in-flight / max_in_flight) at which each degradation level starts
+OCCUPANCY_THRESHOLDS = (0.5, 0.7, 0.85)
+# Recent p95 turn latency, as a multiple of the target, at which each degradation level starts
+LATENCY_THRESHOLDS = (1.0, 1.5, 2.0)
+# Recent p95 of a stage, as a share of the latency target, at which the level that cuts it starts:
+# a slow query extraction is skipped, a slow generation gets less context and then a shorter answer
+STAGE_THRESHOLDS = {
+    'query_extraction': ((0.25, 1),),
+    'generation': ((0.6, 2), (0.8, 3))
+}
+
+# Raised for a turn that was shed; retry_after is the suggested client back-off in seconds
+class AdmissionShed(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Shed, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+# One admitted pipeline run; leaving the block releases the slot and records the turn latency
+class Admission:
+    def __init__(self, controller: "AdmissionController", level: DegradationLevel):
+        self.controller = controller
+        self.level = level
+        self.stage_seconds: Dict[str, float] = {}
+        self._started_at = time.monotonic()
+
+    def record_stages(self, stage_seconds: Optional[Dict[str, float]]):
+        self.stage_seconds = dict(stage_seconds or {})
+
+    def __enter__(self) -> "Admission":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.controller._release(time.monotonic() - self._started_at, self.stage_seconds)
+        return False
+
+# Decides, per turn, how much work the pipeline may do. Degradation steps down as in-flight pipelines
+# fill up, recent turns get slower than the target or a stage takes more than its share of it; turns
+# are only shed once max_in_flight pipelines are running, which bounds queueing for the LLM and so
+# the latency of everything admitted.
+class AdmissionController:
+    def __init__(self, max_in_flight: int = 32, latency_target: float = 8.0, window_seconds: float = 30.0):
+        self.max_in_flight = max_in_flight
+        self.latency_target = latency_target
+        self.window_seconds = window_seconds
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        # (finished_at, seconds) of recent turns and of each pipeline stage
+        self._latencies = deque()
+        self._stage_latencies: Dict[str, deque] = {}
+        self._p95_cache = (0.0, None, {})
+        self._metrics = {"admitted": 0, "shed": 0, "levels": {level.name: 0 for level in DEGRADATION_LEVELS}}
+
+    # None means shed: the caller should tell the client to retry later
+    def admit(self) -> Optional[Admission]:
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self._metrics["shed"] += 1
+                return None
+            level = self._level()
+            self.in_flight += 1
+            self._metrics["admitted"] += 1
+            self._metrics["levels"][level.name] += 1
+        return Admission(self, level)
+
+    def _level(self) -> DegradationLevel:
+        occupancy = self.in_flight / self.max_in_flight
+        index = sum(occupancy >= threshold for threshold in OCCUPANCY_THRESHOLDS)
+
+        p95, stage_p95 = self._recent_p95()
+        if p95 is not None:
+            index = max(index, sum(p95 >= self.latency_target * factor for factor in LATENCY_THRESHOLDS))
+        for stage, thresholds in STAGE_THRESHOLDS.items():
+            if stage in stage_p95:
+                index = max([index] + [level for share, level in thresholds if stage_p95[stage] >= self.latency_target * share])
+        return DEGRADATION_LEVELS[min(index, len(DEGRADATION_LEVELS) - 1)]
+
+    def _prune(self, samples: deque, now: float):
+        while samples and now - samples[0][0] > self.window_seconds:
+            samples.popleft()
+
+    def _p95(self, samples: deque, now: float) -> Optional[float]:
+        self._prune(samples, now)
+        ordered = sorted(seconds for _, seconds in samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else None
+
+    # p95 of recent turns and of each stage seen in the window. Recomputed at most once a second;
+    # called with the lock held
+    def _recent_p95(self) -> Tuple[Optional[float], Dict[str, float]]:
+        now = time.monotonic()
+        computed_at, p95, stage_p95 = self._p95_cache
+        if now - computed_at < 1.0:
+            return p95, stage_p95
+
+        p95 = self._p95(self._latencies, now)
+        stage_p95 = {}
+        for stage, samples in self._stage_latencies.items():
+            seconds = self._p95(samples, now)
+            if seconds is not None:
+                stage_p95[stage] = seconds
+        self._p95_cache = (now, p95, stage_p95)
+        return p95, stage_p95
+
+    def _release(self, seconds: float, stage_seconds: Dict[str, float]):
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            self._latencies.append((now, seconds))
+            for stage, stage_time in stage_seconds.items():
+                samples = self._stage_latencies.setdefault(stage, deque())
+                samples.append((now, stage_time))
+                # Pruned here too, or the window only shrinks when someone reads the metrics
+                self._prune(samples, now)
+
+    # Suggested client back-off when shedding: about one typical turn
+    def retry_after(self) -> float:
+        with self._lock:
+            p95, _ = self._recent_p95()
+        return round(min(30.0, max(2.0, p95 or 0.0)), 1)
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            p95, stage_p95 = self._recent_p95()
+            metrics = {
+                "admitted": self._metrics["admitted"],
+                "shed": self._metrics["shed"],
+                "levels": dict(self._metrics["levels"]),
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "current_level": self._level().name,
+                "p95_seconds": p95,
+                "stage_p95_seconds": dict(stage_p95)
+            }
+        return metrics
+
+# Global admission controller instance, configured from the environment
+admission_controller = AdmissionController(
+    max_in_flight=int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '32')),
+    latency_target=float(os.getenv('ADMISSION_LATENCY_TARGET', '8')),
+    window_seconds=float(os.getenv('ADMISSION_WINDOW', '30'))
+) if os.getenv('ADMISSION_CONTROL', 'true').lower() in ('1', 'true', 'yes') else None
@@ -0,0 +1,124 @@
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+import threading
+from collections import Counter
+from bench_utils import summarise_latencies, format_row
+from .. import providers
+from ..providers import ERROR_MESSAGE, UNAVAILABLE_MESSAGE
+from ..google_ai import GoogleAIIntegration
+from ..admission import AdmissionController, AdmissionShed
+from ..fake_gemini_server import FakeGeminiSettings, serve
+from ..promptflow import generate_promptflow_response
+
+# Open-loop load test of admission control: Poisson arrivals of distinct first-turn questions at
+# increasing rates, through the full pipeline against an in-process fake Gemini server whose latency
+# grows with output tokens. Each rate runs without admission control (every turn gets the full
+# pipeline and queues for an LLM slot) and with it (degraded or shed under pressure).
+# Retrieval uses the configured vector store, as in the app.
+# python -m llm.benchmarks.admission_load --rates 4,8,16 --duration 20
+QUESTIONS = (
+    "How do I fix my AuraPhone battery draining overnight",
+    "My AuraBook laptop trackpad stopped responding",
+    "What is the warranty on AuraTech chargers",
+    "How do I reset my AuraPhone to factory settings",
+    "Why does my laptop fan run constantly"
+)
+
+def run_load(controller, rate: float, duration: float, seed: int):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    latencies, outcomes, levels = [], Counter(), Counter()
+    threads = []
+
+    def turn(index: int):
+        start = time.perf_counter()
+        # Distinct text per turn so identical-question coalescing does not hide the load
+        question = f"{QUESTIONS[index % len(QUESTIONS)]} (ticket {index})"
+        turn_metadata = {}
+        try:
+            response, _ = generate_promptflow_response(question, [], turn_metadata=turn_metadata, admission_controller=controller)
+        except AdmissionShed:
+            with lock:
+                outcomes["shed"] += 1
+            return
+
+        elapsed = time.perf_counter() - start
+        with lock:
+            if response in (ERROR_MESSAGE, UNAVAILABLE_MESSAGE):
+                outcomes["failed"] += 1
+            else:
+                outcomes["ok"] += 1
+                latencies.append(elapsed)
+            levels[turn_metadata.get('degradation', 'full')] += 1
+
+    started_at = time.perf_counter()
+    next_arrival = started_at
+    index = 0
+    while next_arrival - started_at < duration:
+        time.sleep(max(0.0, next_arrival - time.perf_counter()))
+        thread = threading.Thread(target=turn, args=(index,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        index += 1
+        next_arrival += rng.expovariate(rate)
+
+    for thread in threads:
+        thread.join()
+
+    return {
+        "offered": index,
+        "outcomes": dict(outcomes),
+        "levels": dict(levels),
+        "goodput_per_second": outcomes["ok"] / (time.perf_counter() - started_at),
+        "latency": summarise_latencies(latencies)
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Turn latency under rising offered load, with and without admission control")
+    parser.add_argument("--rates", default="4,8,16", help="Comma-separated arrival rates (turns per second)")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of arrivals per run")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="GOOGLE_AI_MAX_CONCURRENCY")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="ADMISSION_MAX_IN_FLIGHT")
+    parser.add_argument("--latency-target", type=float, default=8, help="ADMISSION_LATENCY_TARGET")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Fake Gemini base latency per call")
+    parser.add_argument("--token-ms", type=float, default=0.5, help="Fake Gemini latency per output token")
+    parser.add_argument("--answer-words", type=int, default=1500, help="Fake answer length before the max_tokens cap")
+    parser.add_argument("--deadline", type=float, default=60, help="GOOGLE_AI_DEADLINE")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    server = serve("127.0.0.1", 0, FakeGeminiSettings(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 2, answer_words=args.answer_words, seed=args.seed, token_ms=args.token_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    providers.llm_provider = GoogleAIIntegration(
+        api_key="fake", model_name="gemini-2.0-flash", base_url=f"http://127.0.0.1:{server.server_address[1]}",
+        max_concurrency=args.llm_concurrency, deadline=args.deadline
+    )
+
+    results = {"settings": vars(args), "runs": []}
+    try:
+        for rate in (float(rate) for rate in args.rates.split(",")):
+            for admission in (False, True):
+                controller = AdmissionController(args.max_in_flight, args.latency_target) if admission else None
+                result = run_load(controller, rate, args.duration, args.seed)
+                results["runs"].append(dict(result, rate=rate, admission=admission))
+                if not args.json:
+                    outcomes = result["outcomes"]
+                    name = f"{rate:g}/s {'admission' if admission else 'no admission'}"
+                    print(format_row(name, result["latency"]) + f"  ok={outcomes.get('ok', 0)} shed={outcomes.get('shed', 0)} failed={outcomes.get('failed', 0)}")
+                    if admission:
+                        print(f"{'':<32} levels: {result['levels']}")
+    finally:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import sys
+import json
+import argparse
+import logging
+from ..conversation_summary import build_prompt_history, needs_summary, PROMPT_HISTORY_TOKENS, SUMMARY_MAX_TOKENS
+from ..providers import MAX_HISTORY_TURNS
+
+# History input tokens per LLM call over a long session: the last turns in full (previous
+# behaviour) vs the rolling summary plus the recent turns within the token budget. Offline token
+# accounting with the same estimate the budget uses; the summary is assumed to be at its cap and,
+# as in production, to lag one turn behind when the summariser has not caught up.
+# python -m llm.benchmarks.prompt_history --turns 20 --answer-tokens 3000
+def simulate(turns: int, question_tokens: int, answer_tokens: int, summary_tokens: int, budget: int, max_turns: int, summary_lag: int):
+    conversation = []
+    summary = None
+    rows = []
+    for turn in range(1, turns + 1):
+        history, stats = build_prompt_history(conversation, summary, budget=budget, max_turns=max_turns)
+        rows.append(dict(stats, turn=turn))
+
+        conversation.append({'question': "q" * question_tokens * 4, 'answer': "a" * answer_tokens * 4})
+        # The summariser covers the conversation up to summary_lag turns ago
+        covered = len(conversation) - summary_lag
+        if covered > 0 and needs_summary(conversation[:covered], budget=budget, max_turns=max_turns):
+            summary = {'text': "s" * summary_tokens * 4, 'turns': covered}
+    return rows
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prompt history tokens per turn with and without the rolling summary")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--question-tokens", type=int, default=25)
+    parser.add_argument("--answer-tokens", type=int, default=3000, help="Chat answers are capped at 3000 output tokens")
+    parser.add_argument("--summary-tokens", type=int, default=SUMMARY_MAX_TOKENS)
+    parser.add_argument("--budget", type=int, default=PROMPT_HISTORY_TOKENS, help="PROMPT_HISTORY_TOKENS")
+    parser.add_argument("--max-turns", type=int, default=MAX_HISTORY_TURNS, help="PROMPT_HISTORY_TURNS")
+    parser.add_argument("--summary-lag", type=int, default=0, help="Turns the summariser is behind")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    rows = simulate(args.turns, args.question_tokens, args.answer_tokens, args.summary_tokens, args.budget, args.max_turns, args.summary_lag)
+    # Both the query-extraction and the answer call send the history
+    full_total = 2 * sum(row['full_history_tokens'] for row in rows)
+    budgeted_total = 2 * sum(row['history_tokens'] for row in rows)
+    results = {
+        "settings": vars(args),
+        "turns": rows,
+        "session_history_tokens": {"full": full_total, "budgeted": budgeted_total}
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'turn':>4} {'full':>8} {'budgeted':>9} {'saved':>6}  history sent")
+        for row in rows:
+            saved = 1 - row['history_tokens'] / row['full_history_tokens'] if row['full_history_tokens'] else 0.0
+            sent = f"{row['history_turns']} turns" + (f" + summary of {row['summary_turns']}" if row['summary_turns'] else "")
+            print(f"{row['turn']:>4} {row['full_history_tokens']:>8} {row['history_tokens']:>9} {saved:>6.0%}  {sent}")
+        print(f"Session total over {2 * len(rows)} LLM calls: {full_total:,} -> {budgeted_total:,} history tokens")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
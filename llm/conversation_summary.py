@@ -0,0 +1,203 @@
+import os
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple, Callable
+from .providers import generate_ai_response, MAX_HISTORY_TURNS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Input tokens each LLM call may spend on conversation history (summary included)
+PROMPT_HISTORY_TOKENS = int(os.getenv('PROMPT_HISTORY_TOKENS', '2000'))
+# Output cap of the rolling summary, and how much of each answer the summariser reads
+SUMMARY_MAX_TOKENS = int(os.getenv('CONVERSATION_SUMMARY_MAX_TOKENS', '300'))
+SUMMARY_ANSWER_CHARS = 2000
+
+# The summary is sent as an ordinary history turn under this question, so every prompt takes it unchanged
+SUMMARY_QUESTION = "Summarise our conversation so far."
+
+summary_system_prompt = f"""
+                    You maintain a running summary of a customer support conversation between a customer and the AuraTech AI Assistant.
+                    You receive the current summary (possibly empty) and the newest exchanges. Return an updated summary that:
+                    - Keeps the customer's products, models, problems, preferences and any details they gave (order numbers, settings tried)
+                    - Keeps what was already suggested or answered and whether it worked, so it is not repeated
+                    - Drops greetings, pleasantries and formatting
+                    - Is plain prose, at most {SUMMARY_MAX_TOKENS * 3 // 4} words
+                    Return only the summary.
+                    """
+
+# Gemini averages about four characters per token on English text, which is close enough for budgeting
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + 3) // 4
+
+def turn_tokens(turn: Dict) -> int:
+    return estimate_tokens(turn.get('question')) + estimate_tokens(turn.get('answer'))
+
+def _complete_turns(conversation_history: List[Dict]) -> List[Dict]:
+    return [turn for turn in conversation_history or [] if 'question' in turn and 'answer' in turn]
+
+# Newest turns that fit the budget, oldest first. The newest turn is always kept (follow-ups refer
+# to it), with its answer cut down when it alone is over budget.
+def _recent_turns(turns: List[Dict], budget: int, max_turns: int) -> List[Dict]:
+    recent = []
+    for turn in reversed(turns[-max_turns:] if max_turns > 0 else []):
+        cost = turn_tokens(turn)
+        if cost > budget:
+            if not recent:
+                answer_chars = max(0, budget - estimate_tokens(turn['question'])) * 4
+                recent.append({'question': turn['question'], 'answer': turn['answer'][:answer_chars] + " [...]"})
+            break
+        recent.append(turn)
+        budget -= cost
+    recent.reverse()
+    return recent
+
+# History actually sent with a prompt: the recent turns verbatim when the whole conversation fits,
+# otherwise the rolling summary plus as many recent turns as the remaining budget allows.
+# Stats compare against the previous behaviour of sending the last turns in full.
+def build_prompt_history(conversation_history: List[Dict], summary: Optional[Dict] = None, budget: int = PROMPT_HISTORY_TOKENS,
+                         max_turns: int = MAX_HISTORY_TURNS) -> Tuple[List[Dict], Dict]:
+    turns = _complete_turns(conversation_history)
+    history = _recent_turns(turns, budget, max_turns)
+
+    summary_text = (summary or {}).get('text')
+    summary_used = False
+    if len(history) < len(turns) and summary_text:
+        summary_turn = {'question': SUMMARY_QUESTION, 'answer': summary_text}
+        history = [summary_turn] + _recent_turns(turns, budget - turn_tokens(summary_turn), max_turns - 1)
+        summary_used = True
+
+    stats = {
+        'history_tokens': sum(turn_tokens(turn) for turn in history),
+        'full_history_tokens': sum(turn_tokens(turn) for turn in turns[-max_turns:]),
+        'history_turns': len(history) - summary_used,
+        'summary_turns': summary.get('turns', 0) if summary_used else 0
+    }
+    return history, stats
+
+# A summary is only worth maintaining once the conversation no longer fits the prompt verbatim
+def needs_summary(conversation_history: List[Dict], budget: int = PROMPT_HISTORY_TOKENS, max_turns: int = MAX_HISTORY_TURNS) -> bool:
+    turns = _complete_turns(conversation_history)
+    return len(turns) > max_turns or sum(turn_tokens(turn) for turn in turns) > budget
+
+def build_summary_prompt(summary_text: Optional[str], new_turns: List[Dict]) -> str:
+    exchanges = "\n\n".join(
+        f"Customer: {turn['question']}\nAssistant: {turn['answer'][:SUMMARY_ANSWER_CHARS]}"
+        for turn in new_turns
+    )
+    return f"Current summary:\n{summary_text or '(none yet)'}\n\nNewest exchanges:\n{exchanges}"
+
+# Folds finished turns into each session's rolling summary on a background thread, so the
+# summarisation call never adds to response latency. Requests are coalesced per session: when a
+# session gets several turns before its update runs, only the latest conversation is summarised.
+# save_summary(session_id, metadata) persists the {"summary": ...} metadata key.
+class ConversationSummarizer:
+    def __init__(self, save_summary: Callable[[str, Dict], object], max_queue_size: int = 1000):
+        self.save_summary = save_summary
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self._pending_lock = threading.Lock()
+        self._pending: Dict[str, Tuple[List[Dict], Optional[Dict]]] = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._metrics_lock = threading.Lock()
+        self._metrics = {"submitted": 0, "coalesced": 0, "dropped": 0, "updated": 0, "failed": 0}
+
+    def _count(self, key: str):
+        with self._metrics_lock:
+            self._metrics[key] += 1
+
+    def get_metrics(self) -> Dict:
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["queue_depth"] = self.queue.qsize()
+        return metrics
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="conversation-summary", daemon=True)
+        self._thread.start()
+        logger.info("Conversation summariser started")
+
+    # Pending summaries are not persisted on shutdown; the next turn of each session redoes them
+    def stop(self, timeout: float = 5.0):
+        if not self._thread:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(f"Conversation summariser stopped: {self.get_metrics()}")
+
+    # conversation includes the turn just answered; summary is the session's current summary state
+    def submit(self, session_id: str, conversation: List[Dict], summary: Optional[Dict] = None):
+        if not needs_summary(conversation):
+            return
+        if summary and summary.get('turns', 0) >= len(conversation):
+            return
+
+        self._count("submitted")
+        with self._pending_lock:
+            queued = session_id in self._pending
+            self._pending[session_id] = (conversation, summary)
+        if queued:
+            self._count("coalesced")
+            return
+
+        try:
+            self.queue.put_nowait(session_id)
+        except queue.Full:
+            # Never block the request path; the next turn of this session submits again
+            with self._pending_lock:
+                self._pending.pop(session_id, None)
+            self._count("dropped")
+            logger.warning(f"Conversation summary queue full, skipping session {session_id}")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                session_id = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            with self._pending_lock:
+                conversation, summary = self._pending.pop(session_id, (None, None))
+            if conversation is not None:
+                self._update(session_id, conversation, summary)
+
+    def _update(self, session_id: str, conversation: List[Dict], summary: Optional[Dict]):
+        turns = _complete_turns(conversation)
+        covered = min((summary or {}).get('turns', 0), len(turns))
+        prompt = build_summary_prompt((summary or {}).get('text'), turns[covered:])
+
+        try:
+            text, flag = generate_ai_response(prompt, None, max_tokens=SUMMARY_MAX_TOKENS, temperature=0.1, custom_system_prompt=summary_system_prompt)
+            if flag == 0:
+                self._count("failed")
+                logger.warning(f"Conversation summary for session {session_id} not generated")
+                return
+
+            self.save_summary(session_id, {"summary": {
+                "text": text,
+                "turns": len(turns),
+                "updated_at": datetime.now().isoformat()
+            }})
+            self._count("updated")
+            logger.info(f"Conversation summary for session {session_id} now covers {len(turns)} turns ({estimate_tokens(text)} tokens)")
+
+        except Exception as e:
+            self._count("failed")
+            logger.error(f"Conversation summary for session {session_id} failed: {e}")
+
+# Global conversation summariser instance
+conversation_summarizer = None
+
+def setup_conversation_summarizer(save_summary: Callable[[str, Dict], object]) -> ConversationSummarizer:
+    global conversation_summarizer
+
+    conversation_summarizer = ConversationSummarizer(save_summary)
+    conversation_summarizer.start()
+    return conversation_summarizer
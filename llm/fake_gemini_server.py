@@ -0,0 +1,138 @@
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from .providers import fake_answer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Local stand-in for the Gemini generateContent API that injects latency and errors.
+# Run: python -m llm.fake_gemini_server --latency-ms 300 --error-rate 0.1
+# --token-ms adds generation time per output token, capped by the request's maxOutputTokens like the real API.
+# Then start the app with GOOGLE_AI_BASE_URL=http://localhost:8089 and any GOOGLE_AI_API_KEY.
+class FakeGeminiSettings:
+    def __init__(self, latency_ms: float = 200, jitter_ms: float = 100, error_rate: float = 0.0, error_status: int = 503, hang_rate: float = 0.0, hang_seconds: float = 120, answer_words: int = 120, seed: int = None, token_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.answer_words = answer_words
+        self.token_ms = token_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "hangs": 0}
+
+    def draw(self):
+        with self.lock:
+            self.stats["requests"] += 1
+            roll = self.random.random()
+            latency = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            if roll < self.hang_rate:
+                self.stats["hangs"] += 1
+                return "hang", self.hang_seconds
+            if roll < self.hang_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return "error", latency
+            return "ok", latency
+
+# Words fit into maxOutputTokens at roughly 0.75 words per token
+def output_word_limit(body: dict, answer_words: int) -> int:
+    max_tokens = (body.get("generationConfig") or {}).get("maxOutputTokens")
+    return min(answer_words, int(max_tokens * 0.75)) if max_tokens else answer_words
+
+def build_answer(body: dict, answer_words: int) -> str:
+    system_text = " ".join(part.get("text", "") for part in (body.get("systemInstruction") or {}).get("parts", []))
+    contents = body.get("contents") or [{}]
+    question = " ".join(part.get("text", "") for part in contents[-1].get("parts", []))
+    return fake_answer(system_text, question, answer_words)
+
+def make_handler(settings: FakeGeminiSettings):
+    class FakeGeminiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _send_json(self, status: int, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send_json(200, settings.stats)
+            else:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if not self.path.split("?")[0].endswith(":generateContent"):
+                self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                return
+
+            outcome, delay = settings.draw()
+
+            if outcome == "error":
+                time.sleep(delay)
+                self._send_json(settings.error_status, {"error": {"code": settings.error_status, "message": "Injected failure", "status": "UNAVAILABLE"}})
+                return
+
+            text = build_answer(body, output_word_limit(body, settings.answer_words))
+            if outcome == "ok":
+                delay += len(text) / 4 * settings.token_ms / 1000
+            time.sleep(delay)
+            self._send_json(200, {
+                "candidates": [{
+                    "content": {"role": "model", "parts": [{"text": text}]},
+                    "finishReason": "STOP",
+                    "index": 0
+                }],
+                "usageMetadata": {"promptTokenCount": length // 4, "candidatesTokenCount": len(text) // 4}
+            })
+
+    return FakeGeminiHandler
+
+def serve(host: str = "127.0.0.1", port: int = 8089, settings: FakeGeminiSettings = None) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(settings or FakeGeminiSettings()))
+    server.daemon_threads = True
+    return server
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fake Gemini generateContent server with latency and error injection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that stall for --hang-seconds")
+    parser.add_argument("--hang-seconds", type=float, default=120)
+    parser.add_argument("--answer-words", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--token-ms", type=float, default=0.0, help="Extra latency per output token")
+    args = parser.parse_args(argv)
+
+    settings = FakeGeminiSettings(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.hang_rate, args.hang_seconds, args.answer_words, args.seed, args.token_ms)
+    server = serve(args.host, args.port, settings)
+    logger.info(f"Fake Gemini server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"Stopping fake Gemini server: {settings.stats}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,52 @@
 import os
-from typing import List, Dict
+import time
+import asyncio
+from typing import List, Dict, Tuple
 import logging
+import httpx
 import google.genai as genai
+from .resilience import RetryPolicy, CircuitBreaker, ConcurrencyLimiter, RateLimitTimeout
+from .providers import LLMProvider, ERROR_MESSAGE, UNAVAILABLE_MESSAGE, MAX_HISTORY_TURNS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Google AI integration class
-class GoogleAIIntegration:
-    def __init__(self, api_key: str = None, model_name: str = "gemini-1.5-flash", system_prompt: str = None, safety_settings: Dict = None):
+# Provider status codes worth retrying: timeouts, rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Google AI integration class, the default LLM provider (LLM_PROVIDER=gemini)
+class GoogleAIIntegration(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str = None, model_name: str = "gemini-1.5-flash", system_prompt: str = None, safety_settings: Dict = None,
+                 timeout: float = None, deadline: float = None, max_retries: int = None, max_concurrency: int = None,
+                 requests_per_minute: float = None, base_url: str = None):
         self.api_key = api_key or os.getenv('GOOGLE_AI_API_KEY')
         self.model_name = model_name
         self.system_prompt = system_prompt or self._get_default_system_prompt()
         self.safety_settings = safety_settings or self._get_default_safety_settings()
         self.client = None
         
+        # Per-attempt timeout and overall per-call deadline (retries included), in seconds
+        self.timeout = timeout or float(os.getenv('GOOGLE_AI_TIMEOUT', '30'))
+        self.deadline = deadline or float(os.getenv('GOOGLE_AI_DEADLINE', '60'))
+        self.retry_policy = RetryPolicy(
+            max_attempts=1 + (max_retries if max_retries is not None else int(os.getenv('GOOGLE_AI_MAX_RETRIES', '2'))),
+            base_delay=float(os.getenv('GOOGLE_AI_RETRY_BASE_DELAY', '0.5'))
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('GOOGLE_AI_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('GOOGLE_AI_BREAKER_RESET', '30'))
+        )
+        rpm = requests_per_minute or os.getenv('GOOGLE_AI_RPM')
+        self.limiter = ConcurrencyLimiter(
+            max_concurrent=max_concurrency or int(os.getenv('GOOGLE_AI_MAX_CONCURRENCY', '8')),
+            requests_per_minute=float(rpm) if rpm else None
+        )
+        # Point at a local fake server for testing, e.g. http://localhost:8089
+        self.base_url = base_url or os.getenv('GOOGLE_AI_BASE_URL')
+        
         if not self.api_key:
             raise ValueError("Google AI API key is required. Set GOOGLE_AI_API_KEY environment variable or pass api_key parameter.")
         
@@ -83,38 +114,151 @@ Always strive to be helpful while being truthful and accurate."""
         
     def _initialise_client(self):
         try:
-            self.client = genai.Client(api_key=self.api_key)
+            # One client per process so HTTP connections are pooled and reused across calls
+            self.client = genai.Client(
+                api_key=self.api_key,
+                http_options=genai.types.HttpOptions(base_url=self.base_url, timeout=int(self.timeout * 1000))
+            )
             logger.info(f"Successfully initialized Google AI client with model: {self.model_name}")
         except Exception as e:
             logger.error(f"Failed to initialize Google AI client: {str(e)}")
             raise
     
-    def generate_response(self, prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1, custom_system_prompt: str = None, custom_safety_settings: List[genai.types.SafetySetting] = None) -> str:
+    def _build_request(self, prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1, custom_system_prompt: str = None, custom_safety_settings: List[genai.types.SafetySetting] = None) -> Tuple[List[genai.types.Content], genai.types.GenerateContentConfig]:
+        # Build the conversation turns from history
+        messages = self._build_messages_with_history(prompt, conversation_history)
+        
+        system_instruction = custom_system_prompt or self.system_prompt
+        safety_settings = custom_safety_settings or self.safety_settings
+        
+        # Configure generation parameters
+        config = genai.types.GenerateContentConfig(
+            max_output_tokens=max_tokens,
+            temperature=temperature,
+            top_p=0.95,
+            top_k=40,
+            system_instruction=system_instruction,
+            safety_settings=safety_settings
+        )
+        return messages, config
+    
+    @staticmethod
+    def _with_attempt_timeout(config: genai.types.GenerateContentConfig, timeout: float) -> genai.types.GenerateContentConfig:
+        return config.model_copy(update={"http_options": genai.types.HttpOptions(timeout=max(1, int(timeout * 1000)))})
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, genai.errors.APIError):
+            return error.code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (httpx.TransportError, asyncio.TimeoutError, ConnectionError))
+    
+    # Decide what to do after a failed attempt, returns the backoff delay or None to give up
+    def _handle_failure(self, error: Exception, attempt: int, deadline_at: float):
+        if not self._is_retryable(error):
+            # The provider answered, so this is a request problem rather than an outage
+            self.circuit_breaker.record_success()
+            logger.error(f"Error generating response: {str(error)}")
+            return None
+        
+        self.circuit_breaker.record_failure()
+        delay = self.retry_policy.backoff(attempt)
+        if attempt >= self.retry_policy.max_attempts or time.monotonic() + delay >= deadline_at:
+            logger.error(f"Error generating response after {attempt} attempt(s): {str(error)}")
+            return None
+        
+        logger.warning(f"Google AI call failed (attempt {attempt}/{self.retry_policy.max_attempts}): {str(error)}. Retrying in {delay:.2f}s")
+        return delay
+    
+    def generate_response(self, prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1, custom_system_prompt: str = None, custom_safety_settings: List[genai.types.SafetySetting] = None, deadline: float = None) -> str:
         try:
-            # Build the conversation turns from history
-            messages = self._build_messages_with_history(prompt, conversation_history)
+            messages, config = self._build_request(prompt, conversation_history, max_tokens, temperature, custom_system_prompt, custom_safety_settings)
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            return ERROR_MESSAGE, 0
+        
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                logger.error("Google AI call deadline exceeded")
+                break
             
-
-            system_instruction = custom_system_prompt or self.system_prompt
-            safety_settings = custom_safety_settings or self.safety_settings
+            if not self.circuit_breaker.allow():
+                logger.warning("Circuit breaker open, skipping Google AI call")
+                return UNAVAILABLE_MESSAGE, 0
             
-            # Configure generation parameters
-            config = genai.types.GenerateContentConfig(
-                max_output_tokens=max_tokens,
-                temperature=temperature,
-                top_p=0.95,
-                top_k=40,
-                system_instruction=system_instruction,
-                safety_settings=safety_settings
-            )
+            try:
+                with self.limiter.slot(timeout=remaining):
+                    attempt_timeout = min(self.timeout, deadline_at - time.monotonic())
+                    response = self.client.models.generate_content(
+                        model=self.model_name,
+                        contents=messages,
+                        config=self._with_attempt_timeout(config, attempt_timeout)
+                    )
+                self.circuit_breaker.record_success()
+                return self._parse_response(response, prompt)
             
-            # Generate response
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=messages,
-                config=config
-            )
+            except RateLimitTimeout as e:
+                self.circuit_breaker.release_trial()
+                logger.warning(f"Google AI call not attempted: {str(e)}")
+                return UNAVAILABLE_MESSAGE, 0
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, deadline_at)
+                if delay is None:
+                    break
+                time.sleep(delay)
+        
+        return ERROR_MESSAGE, 0
+    
+    # Same contract as generate_response for callers running on an event loop
+    async def generate_response_async(self, prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1, custom_system_prompt: str = None, custom_safety_settings: List[genai.types.SafetySetting] = None, deadline: float = None) -> str:
+        try:
+            messages, config = self._build_request(prompt, conversation_history, max_tokens, temperature, custom_system_prompt, custom_safety_settings)
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            return ERROR_MESSAGE, 0
+        
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                logger.error("Google AI call deadline exceeded")
+                break
             
+            if not self.circuit_breaker.allow():
+                logger.warning("Circuit breaker open, skipping Google AI call")
+                return UNAVAILABLE_MESSAGE, 0
+            
+            try:
+                async with self.limiter.slot_async(timeout=remaining):
+                    attempt_timeout = min(self.timeout, deadline_at - time.monotonic())
+                    response = await asyncio.wait_for(
+                        self.client.aio.models.generate_content(
+                            model=self.model_name,
+                            contents=messages,
+                            config=self._with_attempt_timeout(config, attempt_timeout)
+                        ),
+                        timeout=attempt_timeout
+                    )
+                self.circuit_breaker.record_success()
+                return self._parse_response(response, prompt)
+            
+            except RateLimitTimeout as e:
+                self.circuit_breaker.release_trial()
+                logger.warning(f"Google AI call not attempted: {str(e)}")
+                return UNAVAILABLE_MESSAGE, 0
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, deadline_at)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        
+        return ERROR_MESSAGE, 0
+    
+    def _parse_response(self, response, prompt: str) -> str:
+        try:
             # Check if input was blocked by safety filters
             if hasattr(response, 'prompt_feedback') and response.prompt_feedback:
                 if hasattr(response.prompt_feedback, 'block_reason') and response.prompt_feedback.block_reason:
@@ -155,15 +299,15 @@ Always strive to be helpful while being truthful and accurate."""
                 return "I apologise, but I couldn't generate a response at the moment. Please try again.", 0
                 
         except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
-            return f"I encountered an error while processing your request. Please try again later.", 0
+            logger.error(f"Error parsing response: {str(e)}")
+            return ERROR_MESSAGE, 0
     
     def _build_messages_with_history(self, current_prompt: str, conversation_history: List[Dict] = None) -> List[genai.types.Content]:
         messages = []
         
-        # Add conversation history (keep only last 5 turns to manage context length)
+        # Add conversation history (keep only the last turns to manage context length)
         if conversation_history:
-            for turn in conversation_history[-5:]:
+            for turn in conversation_history[-MAX_HISTORY_TURNS:]:
                 if 'question' in turn and 'answer' in turn:
                     # Add user message
                     messages.append(genai.types.Content(
@@ -207,19 +351,3 @@ def setup_google_ai_client(app, model_name: str = "gemini-1.5-flash", system_pro
     except Exception as e:
         logger.error(f"Failed to setup Google AI client: {str(e)}")
         raise
-
-def generate_ai_response(prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1, custom_system_prompt: str = None) -> str:
-    global google_ai_instance
-    
-    if not google_ai_instance:
-        logger.error("Google AI client not initialised.")
-        return "Google AI service is not available at the moment."
-    
-    return google_ai_instance.generate_response(
-        prompt=prompt,
-        conversation_history=conversation_history,
-        max_tokens=max_tokens,
-        temperature=temperature,
-        custom_system_prompt=custom_system_prompt,
-        custom_safety_settings=google_ai_instance._get_default_safety_settings()
-    )
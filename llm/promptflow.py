@@ -1,14 +1,31 @@
+import os
 import logging
 import time
 import re
-from typing import List, Dict
-from .google_ai import generate_ai_response
-from vectordb.qdrant_vector_db import search_documents
+import hashlib
+from typing import List, Dict, Optional
+from .providers import generate_ai_response
+from .conversation_summary import build_prompt_history
+from .singleflight import SingleFlight
+from .admission import AdmissionController, AdmissionShed, DegradationLevel, DEGRADATION_LEVELS
+from vectordb.qdrant_vector_db import search_documents, search_documents_multi, match_faq, retrieval_fingerprint
+from vectordb.doc_metadata import infer_search_filters
+from tracing import traced, current_span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Most sub-queries searched for one compound question
+MAX_SUB_QUERIES = 3
+
+# Models sometimes wrap lines in markdown code or bold markers
+QUERY_LINE = re.compile(r'^[\s`*]*QUERY:[\s`*]*(?P<query>.+?)[\s`*]*$', re.MULTILINE)
+
+# Concurrent identical questions without history share one pipeline run
+COALESCE_IDENTICAL_QUESTIONS = os.getenv('PROMPTFLOW_COALESCE', 'true').lower() in ('1', 'true', 'yes')
+promptflow_singleflight = SingleFlight()
+
 quick_response = {
     # --- Greetings ---
     "hello": "Hi there! How can I help you today?",
@@ -84,6 +101,12 @@ query_llm_system_prompt = """
                     QUERY: [extracted and refined query suitable for RAG search]
                     ```
 
+                    If the input asks about several distinct problems or topics, respond with one QUERY line per topic (at most 3):
+                    ```
+                    QUERY: [first refined query]
+                    QUERY: [second refined query]
+                    ```
+
                     For invalid queries, respond with:
                     ```
                     INVALID
@@ -94,6 +117,11 @@ query_llm_system_prompt = """
                     **User Input**: "My AuraTech phone won't turn on after I dropped it yesterday"
                     **Output**: `QUERY: AuraTech phone not turning on after physical damage troubleshooting repair`
 
+                    **User Input**: "My phone battery drains fast and the charger gets really hot"
+                    **Output**:
+                    `QUERY: AuraPhone battery draining quickly troubleshooting`
+                    `QUERY: AuraTech charger overheating safety troubleshooting`
+
                     **User Input**: "What's the weather like today?"
                     **Output**: `INVALID`
 
@@ -225,6 +253,7 @@ response_llm_system_prompt = f"""
                     """
         
 # Clean user input question
+@traced()
 def clean_question(question: str) -> str:
     logger.info(f"STEP 1: Cleaning question - Original length: {len(question) if question else 0}")
     logger.debug(f"Original question: '{question}'")
@@ -255,6 +284,7 @@ def clean_question(question: str) -> str:
     return cleaned
 
 # Check question
+@traced()
 def check_question(question: str) -> bool:
     logger.info(f"STEP 2: Validating question")
     
@@ -269,7 +299,29 @@ def check_question(question: str) -> bool:
     logger.info("Question validation passed")
     return True
 
+# Answer questions that are already answered verbatim in the FAQ without calling the LLM
+@traced()
+def faq_response(question: str):
+    logger.info("Checking FAQ index...")
+    start_time = time.time()
+    
+    match = match_faq(question)
+    if not match:
+        logger.info(f"No confident FAQ match ({time.time() - start_time:.3f}s)")
+        return None
+    
+    logger.info(f"FAQ match: '{match['question']}' (score={match['score']:.3f}, {time.time() - start_time:.3f}s)")
+    response = f"{match['answer']}\n\n---\n*Source*: {match['file_name']}"
+    sources = [{
+        "score": match['score'],
+        "file_name": match['file_name'],
+        "document_title": match['document_title'],
+        "chunk_content": f"Q: {match['question']}\nA: {match['answer']}"
+    }]
+    return response, sources
+
 # Modify user question into a proper query for RAG
+@traced()
 def get_query(question: str, conversation_history: List[Dict] = None) -> str:
     logger.info(f"STEP 3: Extracting query from question")
     logger.debug(f"Input question for extraction: '{question}'")
@@ -294,16 +346,40 @@ def get_query(question: str, conversation_history: List[Dict] = None) -> str:
         logger.error(f"Error during query extraction: {str(e)}")
         return "INVALID", flag
 
-# Semantic search to find relevant chunks
-def semantic_search(question: str) -> str:
+# Split the extraction output into its QUERY lines; output without any is searched as a whole
+def parse_queries(extracted_query: str) -> List[str]:
+    queries = []
+    for match in QUERY_LINE.finditer(extracted_query):
+        query = match.group('query').strip()
+        if query and query not in queries:
+            queries.append(query)
+    return queries[:MAX_SUB_QUERIES] or [extracted_query.strip()]
+
+# Semantic search to find relevant chunks, narrowed to the product lines the query or session is about.
+# Compound questions are searched as several sub-queries in one batched call and fused by chunk
+@traced()
+def semantic_search(question: str, conversation_history: List[Dict] = None, limit: int = 3) -> str:
     logger.info(f"STEP 4: Performing semantic search")
     logger.debug(f"Search query: '{question}'")
     
     start_time = time.time()
     
     try:
-        logger.info("Searching for similar chunks...")
-        results = search_documents(question, limit=3, score_threshold=0.2)
+        queries = parse_queries(question)
+        filters = [infer_search_filters(query, conversation_history) for query in queries]
+        logger.info(f"Searching for similar chunks... ({len(queries)} sub-queries, filters: {filters})")
+        
+        def search(query_filters):
+            if len(queries) == 1:
+                return search_documents(queries[0], limit=limit, score_threshold=0.2, filters=query_filters[0])
+            return search_documents_multi(queries, limit=limit, score_threshold=0.2, filters=query_filters)
+        
+        results = search(filters)
+        
+        # A wrong guess (or a collection indexed before metadata existed) must not cost the answer
+        if not results and any(filters):
+            logger.info("No results with filters, searching the whole collection")
+            results = search([None] * len(queries))
         
         search_time = time.time() - start_time
         logger.info(f"Semantic search completed in {search_time:.2f}s")
@@ -322,7 +398,8 @@ def semantic_search(question: str) -> str:
         return []
 
 # Generate RAG chat response
-def chat_response(question: str, conversation_history: List[Dict] = None, search_results: List[Dict] = None) -> str:
+@traced()
+def chat_response(question: str, conversation_history: List[Dict] = None, search_results: List[Dict] = None, max_tokens: int = 3000) -> str:
     logger.info(f"STEP 5: Generating chat response")
     logger.debug(f"Question: '{question}'")
     logger.info(f"Conversation history items: {len(conversation_history) if conversation_history else 0}")
@@ -359,7 +436,7 @@ def chat_response(question: str, conversation_history: List[Dict] = None, search
             logger.info(f"Built context from {len(context_strings)} sources, total length: {len(context)}")
         
         logger.info("Generating AI response...")
-        response, flag = generate_ai_response(question, conversation_history, max_tokens=3000, temperature=0.1, custom_system_prompt=response_llm_system_prompt+f"\nRAG Context: {context}")
+        response, flag = generate_ai_response(question, conversation_history, max_tokens=max_tokens, temperature=0.1, custom_system_prompt=response_llm_system_prompt+f"\nRAG Context: {context}")
         
         generation_time = time.time() - start_time
         logger.info(f"Chat response generated in {generation_time:.2f}s")
@@ -372,6 +449,7 @@ def chat_response(question: str, conversation_history: List[Dict] = None, search
         return "I apologize, but I encountered an error while processing your request. Please try again.", flag
 
 # Clean response
+@traced()
 def clean_response(response: str) -> str:
     logger.info(f"STEP 6: Cleaning response")
     logger.debug(f"Response length before cleaning: {len(response) if response else 0}")
@@ -389,8 +467,66 @@ def clean_response(response: str) -> str:
     
     return cleaned_response
 
-# Generate AI response using prompt flow pipeline
-def generate_promptflow_response(question: str, conversation_history: List[Dict] = None):
+# Singleflight key: the question up to case, spacing and trailing punctuation, and the data it is answered from
+def coalescing_key(question: str) -> str:
+    normalised = re.sub(r'\s+', ' ', question or '').strip().lower().rstrip('?!. ')
+    return hashlib.sha256(f"{normalised}\n{retrieval_fingerprint()}".encode('utf-8')).hexdigest()
+
+# Runs the pipeline in an admission slot, at the level admission control picks, and reports its
+# stage latencies back. Raises AdmissionShed when every slot is taken.
+def _run_admitted(admission_controller: Optional[AdmissionController], question: str, conversation_history: List[Dict] = None,
+                  summary: Optional[Dict] = None, turn_metadata: Dict = None):
+    if admission_controller is None:
+        return run_promptflow_pipeline(question, conversation_history, summary, turn_metadata)
+    
+    admission = admission_controller.admit()
+    if admission is None:
+        raise AdmissionShed(admission_controller.retry_after())
+    run_metadata = turn_metadata if turn_metadata is not None else {}
+    with admission:
+        result = run_promptflow_pipeline(question, conversation_history, summary, run_metadata, admission.level)
+        admission.record_stages(run_metadata.get('stage_seconds'))
+    return result
+
+# Generate AI response using prompt flow pipeline. summary is the session's rolling summary; per-turn
+# stats go into turn_metadata. A turn without history depends only on the question, so identical ones
+# in flight at the same time (a trending issue) run the pipeline once and all get its answer.
+# Only the turn that runs the pipeline is admitted: turns coalesced onto it wait without a slot of
+# their own, and share its AdmissionShed if it was shed
+def generate_promptflow_response(question: str, conversation_history: List[Dict] = None, summary: Optional[Dict] = None, turn_metadata: Dict = None,
+                                 admission_controller: AdmissionController = None):
+    if conversation_history or summary or not COALESCE_IDENTICAL_QUESTIONS:
+        return _run_admitted(admission_controller, question, conversation_history, summary, turn_metadata)
+    
+    def run():
+        run_metadata = {}
+        response, sources = _run_admitted(admission_controller, question, turn_metadata=run_metadata)
+        return response, sources, run_metadata
+    
+    (response, sources, run_metadata), shared = promptflow_singleflight.do(coalescing_key(question), run)
+    # A coalesced turn's pipeline spans are in the trace of the turn that ran it
+    current_span().set_attribute('coalesced', shared)
+    if turn_metadata is not None:
+        turn_metadata.update(run_metadata)
+        turn_metadata['coalesced'] = shared
+    if shared:
+        logger.info(f"Answered from a coalesced pipeline run: '{question[:50]}'")
+    return response, sources
+
+# The LLM calls get the summary plus the recent turns that fit the token budget. degradation is the
+# load level admission control picked for this turn (full pipeline by default).
+@traced('promptflow')
+def run_promptflow_pipeline(question: str, conversation_history: List[Dict] = None, summary: Optional[Dict] = None, turn_metadata: Dict = None,
+                            degradation: DegradationLevel = None):
+    degradation = degradation or DEGRADATION_LEVELS[0]
+    # Seconds spent in each stage, reported to admission control and kept in the message metadata
+    stage_seconds = {}
+    if turn_metadata is not None:
+        turn_metadata['stage_seconds'] = stage_seconds
+        if degradation != DEGRADATION_LEVELS[0]:
+            turn_metadata['degradation'] = degradation.name
+    current_span().set_attribute('degradation', degradation.name)
+    
     logger.info("=" * 80)
     logger.info("STARTING PROMPTFLOW PIPELINE")
     logger.info(f"Original question: '{question}'")
@@ -420,14 +556,45 @@ def generate_promptflow_response(question: str, conversation_history: List[Dict]
             logger.info("=" * 80)
             return response, []
         
-        # Extract query from the question
-        extracted_query, flag = get_query(cleaned_question, conversation_history)
+        # Check for a confident FAQ match. A question asked mid-conversation can lean on earlier turns
+        # ("and for the watch?"), which only the LLM path resolves, so the FAQ only answers opening questions.
+        faq_result = None
+        if conversation_history or summary:
+            logger.info("Conversation in progress, skipping the FAQ match")
+        else:
+            stage_start = time.time()
+            faq_result = faq_response(cleaned_question)
+            stage_seconds['faq'] = time.time() - stage_start
+        if faq_result:
+            response, sources = faq_result
+            logger.info("FAQ RESPONSE USED")
+            logger.info(f"Total pipeline time: {time.time() - pipeline_start_time:.2f}s")
+            logger.info("=" * 80)
+            return response, sources
+        
+        # History sent with both LLM calls, capped at the prompt token budget
+        prompt_history, history_stats = build_prompt_history(conversation_history, summary)
+        if turn_metadata is not None:
+            turn_metadata['prompt_history'] = history_stats
+        saved_tokens = history_stats['full_history_tokens'] - history_stats['history_tokens']
+        logger.info(f"Prompt history: {history_stats['history_tokens']} tokens per call, {history_stats['history_turns']} recent turns"
+                    + (f" + summary of {history_stats['summary_turns']} turns" if history_stats['summary_turns'] else "")
+                    + (f" ({saved_tokens} fewer than the full last turns)" if saved_tokens > 0 else ""))
+        
+        # Extract query from the question; under load the cleaned question is searched as it is
+        if degradation.extract_query:
+            stage_start = time.time()
+            extracted_query, flag = get_query(cleaned_question, prompt_history)
+            stage_seconds['query_extraction'] = time.time() - stage_start
+        else:
+            logger.info(f"Degraded ({degradation.name}): skipping query extraction")
+            extracted_query, flag = cleaned_question, 1
 
         if flag == 0:
             logger.warning("Query extraction failed, llm returned flag 0")
             return extracted_query, []
 
-        if "INVALID" in extracted_query:
+        if degradation.extract_query and "INVALID" in extracted_query:
             response = "Sorry I cannot answer that question. Please try asking something else."
             logger.warning(f"QUERY EXTRACTION INVALID - Response: '{response}'")
             logger.info(f"Total pipeline time: {time.time() - pipeline_start_time:.2f}s")
@@ -435,10 +602,14 @@ def generate_promptflow_response(question: str, conversation_history: List[Dict]
             search_results = []
         else:
             # Perform semantic search
-            search_results = semantic_search(extracted_query)
+            stage_start = time.time()
+            search_results = semantic_search(extracted_query, conversation_history, limit=degradation.search_limit)
+            stage_seconds['search'] = time.time() - stage_start
         
         # Perform augmented chat
-        response, flag = chat_response(cleaned_question, conversation_history, search_results)
+        stage_start = time.time()
+        response, flag = chat_response(cleaned_question, prompt_history, search_results, max_tokens=degradation.max_tokens)
+        stage_seconds['generation'] = time.time() - stage_start
         
         # Clean the response
         cleaned_response = clean_response(response)
@@ -0,0 +1,183 @@
+import os
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Dict, Tuple
+from .resilience import ConcurrencyLimiter, RateLimitTimeout
+from tracing import tracer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ERROR_MESSAGE = "I encountered an error while processing your request. Please try again later."
+UNAVAILABLE_MESSAGE = "I'm receiving a lot of requests right now. Please try again in a moment."
+NOT_INITIALISED_MESSAGE = "The AI service is not available at the moment."
+
+# Most history turns sent with a prompt; a rolling summary of older turns counts as one
+MAX_HISTORY_TURNS = int(os.getenv('PROMPT_HISTORY_TURNS', '5'))
+
+# Contract of the LLM backends behind generate_ai_response. Both methods return (text, flag): flag is
+# 1 for a model answer and 0 for a message to show as is (errors, safety refusals). They never raise.
+class LLMProvider(ABC):
+    name = "base"
+
+    @abstractmethod
+    def generate_response(self, prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1,
+                          custom_system_prompt: str = None, deadline: float = None) -> Tuple[str, int]:
+        pass
+
+    @abstractmethod
+    async def generate_response_async(self, prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1,
+                                      custom_system_prompt: str = None, deadline: float = None) -> Tuple[str, int]:
+        pass
+
+# Canned answers shared by the fake provider and the fake Gemini server
+def fake_answer(system_prompt: str, question: str, answer_words: int) -> str:
+    # Query-extraction prompts expect the QUERY: format, everything else gets a canned answer
+    if "QUERY:" in (system_prompt or ""):
+        return f"QUERY: {question}"
+
+    filler = " ".join(["AuraTech"] + ["support"] * max(0, answer_words - 1))
+    return f"**Fake answer** to: {question}\n\n{filler}"
+
+# Deterministic offline stand-in for Gemini (LLM_PROVIDER=fake), for load tests without network or
+# API key. Each call takes a lognormal base latency plus time per input and output token, with the
+# answer capped by max_tokens. Latency, failures and text are seeded from the request, so the same
+# prompt always behaves the same whatever the thread interleaving. Calls share a concurrency limiter
+# sized like the Gemini client's, so queueing under load behaves as it would in production.
+class FakeLLMProvider(LLMProvider):
+    name = "fake"
+
+    def __init__(self, latency_ms: float = None, latency_sigma: float = None, input_token_ms: float = None, output_token_ms: float = None,
+                 answer_words: int = None, error_rate: float = None, seed: int = None, max_concurrency: int = None, deadline: float = None):
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv('FAKE_LLM_LATENCY_MS', '300'))
+        self.latency_sigma = latency_sigma if latency_sigma is not None else float(os.getenv('FAKE_LLM_LATENCY_SIGMA', '0.3'))
+        self.input_token_ms = input_token_ms if input_token_ms is not None else float(os.getenv('FAKE_LLM_INPUT_TOKEN_MS', '0.02'))
+        self.output_token_ms = output_token_ms if output_token_ms is not None else float(os.getenv('FAKE_LLM_OUTPUT_TOKEN_MS', '5'))
+        self.answer_words = answer_words if answer_words is not None else int(os.getenv('FAKE_LLM_ANSWER_WORDS', '250'))
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv('FAKE_LLM_ERROR_RATE', '0'))
+        self.seed = seed if seed is not None else int(os.getenv('FAKE_LLM_SEED', '0'))
+        self.deadline = deadline or float(os.getenv('GOOGLE_AI_DEADLINE', '60'))
+        self.limiter = ConcurrencyLimiter(max_concurrent=max_concurrency or int(os.getenv('GOOGLE_AI_MAX_CONCURRENCY', '8')))
+        self._stats_lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "timeouts": 0, "unavailable": 0}
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    # Answer text, seconds the call takes and whether it fails, all derived from the request
+    def _plan(self, prompt: str, conversation_history: List[Dict], max_tokens: int, system_prompt: str) -> Tuple[str, float, bool]:
+        history = [turn for turn in (conversation_history or [])[-MAX_HISTORY_TURNS:] if 'question' in turn and 'answer' in turn]
+        digest = hashlib.sha256(f"{self.seed}\0{system_prompt}\0{prompt}\0{len(history)}".encode('utf-8')).digest()
+        rng = random.Random(digest)
+
+        text = fake_answer(system_prompt, prompt, min(self.answer_words, int(max_tokens * 0.75)))
+        input_chars = len(system_prompt or "") + len(prompt) + sum(len(turn['question']) + len(turn['answer']) for turn in history)
+        seconds = (
+            self.latency_ms * rng.lognormvariate(0, self.latency_sigma)
+            + input_chars / 4 * self.input_token_ms
+            + len(text) / 4 * self.output_token_ms
+        ) / 1000
+        return text, seconds, rng.random() < self.error_rate
+
+    def _outcome(self, text: str, seconds: float, failed: bool, deadline: float) -> Tuple[str, int]:
+        if seconds > deadline:
+            self._count("timeouts")
+            logger.error("Fake LLM call deadline exceeded")
+            return ERROR_MESSAGE, 0
+        if failed:
+            self._count("errors")
+            logger.error("Fake LLM injected failure")
+            return ERROR_MESSAGE, 0
+        return text, 1
+
+    def generate_response(self, prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1,
+                          custom_system_prompt: str = None, deadline: float = None) -> Tuple[str, int]:
+        self._count("calls")
+        text, seconds, failed = self._plan(prompt, conversation_history, max_tokens, custom_system_prompt)
+        deadline = deadline or self.deadline
+        deadline_at = time.monotonic() + deadline
+        try:
+            with self.limiter.slot(timeout=deadline):
+                time.sleep(max(0.0, min(seconds, deadline_at - time.monotonic())))
+        except RateLimitTimeout as e:
+            self._count("unavailable")
+            logger.warning(f"Fake LLM call not attempted: {str(e)}")
+            return UNAVAILABLE_MESSAGE, 0
+        return self._outcome(text, seconds, failed, deadline)
+
+    async def generate_response_async(self, prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1,
+                                      custom_system_prompt: str = None, deadline: float = None) -> Tuple[str, int]:
+        self._count("calls")
+        text, seconds, failed = self._plan(prompt, conversation_history, max_tokens, custom_system_prompt)
+        deadline = deadline or self.deadline
+        deadline_at = time.monotonic() + deadline
+        try:
+            async with self.limiter.slot_async(timeout=deadline):
+                await asyncio.sleep(max(0.0, min(seconds, deadline_at - time.monotonic())))
+        except RateLimitTimeout as e:
+            self._count("unavailable")
+            logger.warning(f"Fake LLM call not attempted: {str(e)}")
+            return UNAVAILABLE_MESSAGE, 0
+        return self._outcome(text, seconds, failed, deadline)
+
+# Global LLM provider instance
+llm_provider = None
+
+# LLM_PROVIDER selects the backend: gemini (default, needs GOOGLE_AI_API_KEY) or fake
+def setup_llm_provider(app, model_name: str = "gemini-1.5-flash", system_prompt: str = None, safety_settings: Dict = None) -> LLMProvider:
+    global llm_provider
+
+    provider_name = os.getenv('LLM_PROVIDER', 'gemini').lower()
+    if provider_name == 'fake':
+        llm_provider = FakeLLMProvider()
+        logger.warning("Using the fake LLM provider, answers are canned")
+    elif provider_name == 'gemini':
+        # The Gemini SDK is only imported when selected
+        from .google_ai import setup_google_ai_client
+        llm_provider = setup_google_ai_client(app, model_name=model_name, system_prompt=system_prompt, safety_settings=safety_settings)
+    else:
+        raise ValueError(f"Unknown LLM_PROVIDER: {provider_name}")
+
+    app.config['LLM_PROVIDER'] = llm_provider
+    return llm_provider
+
+def generate_ai_response(prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1, custom_system_prompt: str = None) -> Tuple[str, int]:
+    if not llm_provider:
+        logger.error("LLM provider not initialised.")
+        return NOT_INITIALISED_MESSAGE, 0
+
+    with tracer.span('llm.generate', provider=llm_provider.name, max_tokens=max_tokens) as span:
+        response, flag = llm_provider.generate_response(
+            prompt=prompt,
+            conversation_history=conversation_history,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            custom_system_prompt=custom_system_prompt
+        )
+        span.set_attribute('flag', flag)
+        span.set_attribute('response_chars', len(response))
+    return response, flag
+
+async def generate_ai_response_async(prompt: str, conversation_history: List[Dict] = None, max_tokens: int = 3000, temperature: float = 0.1, custom_system_prompt: str = None) -> Tuple[str, int]:
+    if not llm_provider:
+        logger.error("LLM provider not initialised.")
+        return NOT_INITIALISED_MESSAGE, 0
+
+    with tracer.span('llm.generate', provider=llm_provider.name, max_tokens=max_tokens) as span:
+        response, flag = await llm_provider.generate_response_async(
+            prompt=prompt,
+            conversation_history=conversation_history,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            custom_system_prompt=custom_system_prompt
+        )
+        span.set_attribute('flag', flag)
+        span.set_attribute('response_chars', len(response))
+    return response, flag
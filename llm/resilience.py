@@ -0,0 +1,147 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Raised when the circuit breaker is rejecting calls
+class CircuitOpenError(Exception):
+    pass
+
+# Raised when no concurrency slot or rate-limit token became available in time
+class RateLimitTimeout(Exception):
+    pass
+
+# Bounded retries with full-jitter exponential backoff
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        # attempt is 1-based: the delay before attempt 2 is drawn from [0, base_delay]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+# Opens after consecutive failures, then lets a single trial call through once reset_timeout has passed
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            return False
+
+    # The allowed call was never made (e.g. no concurrency slot), so it neither closes nor reopens the circuit
+    def release_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit breaker closed after successful trial call")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit breaker opened after {self.consecutive_failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+# Caps concurrent calls and smooths them to a requests-per-minute budget (token bucket)
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrent: int = 8, requests_per_minute: float = None):
+        self.max_concurrent = max_concurrent
+        self.requests_per_minute = requests_per_minute
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._bucket_lock = threading.Lock()
+        self._tokens = float(requests_per_minute or 0)
+        self._refilled_at = time.monotonic()
+
+    # Returns 0 when a token was taken, otherwise the seconds until one will be available
+    def _take_token(self) -> float:
+        if not self.requests_per_minute:
+            return 0.0
+
+        with self._bucket_lock:
+            now = time.monotonic()
+            rate = self.requests_per_minute / 60.0
+            self._tokens = min(self.requests_per_minute, self._tokens + (now - self._refilled_at) * rate)
+            self._refilled_at = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / rate
+
+    @contextmanager
+    def slot(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        if not self._semaphore.acquire(timeout=max(0.0, timeout)):
+            raise RateLimitTimeout(f"No LLM concurrency slot available within {timeout:.1f}s")
+
+        try:
+            while True:
+                wait = self._take_token()
+                if wait == 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    raise RateLimitTimeout("LLM rate limit budget exhausted")
+                time.sleep(wait)
+            yield
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot_async(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        # Poll without blocking the event loop; the semaphore is shared with synchronous callers
+        while not self._semaphore.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise RateLimitTimeout(f"No LLM concurrency slot available within {timeout:.1f}s")
+            await asyncio.sleep(0.01)
+
+        try:
+            while True:
+                wait = self._take_token()
+                if wait == 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    raise RateLimitTimeout("LLM rate limit budget exhausted")
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            self._semaphore.release()
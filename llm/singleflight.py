@@ -0,0 +1,65 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+# At most one execution per key at a time: callers arriving while it runs wait for it and share its
+# result (or exception) instead of running it again. Nothing is cached once the execution returns.
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._metrics = {"executions": 0, "coalesced": 0, "errors": 0, "max_waiters": 0}
+
+    # Returns (result, shared): shared is True for callers that waited on another caller's execution
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._metrics["executions"] += 1
+            else:
+                call.waiters += 1
+                self._metrics["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._metrics["errors"] += 1
+            raise
+        finally:
+            # Later callers start a fresh execution; the ones already waiting get this one
+            with self._lock:
+                del self._calls[key]
+                self._metrics["max_waiters"] = max(self._metrics["max_waiters"], call.waiters)
+            call.done.set()
+            if call.waiters:
+                logger.info(f"Shared one execution with {call.waiters} coalesced caller(s)")
+
+        return call.result, False
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["in_flight"] = len(self._calls)
+            metrics["waiting"] = sum(call.waiters for call in self._calls.values())
+        return metrics
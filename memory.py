@@ -0,0 +1,182 @@
+import os
+import gc
+import time
+import logging
+import threading
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds between resident memory samples; 0 disables the background sampler
+MEMORY_SAMPLE_INTERVAL = float(os.getenv('MEMORY_SAMPLE_INTERVAL', '60'))
+# Samples kept in memory, a day at the default interval
+MEMORY_HISTORY = int(os.getenv('MEMORY_HISTORY', '1440'))
+# Frames recorded per allocation when tracemalloc runs from startup; 0 leaves it to the admin endpoint,
+# since tracing every allocation slows the process down and costs memory of its own
+MEMORY_TRACEMALLOC_FRAMES = int(os.getenv('MEMORY_TRACEMALLOC_FRAMES', '0'))
+
+# Allocations made by tracemalloc and the import system are noise in a leak hunt
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>")
+)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Current resident set size in bytes. Without /proc (macOS) this falls back to the peak, which still
+# shows growth but never shrinks.
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+# Least squares slope of (seconds, bytes) samples, in bytes per hour
+def rss_growth_per_hour(samples: List[Dict[str, Any]]) -> Optional[float]:
+    if len(samples) < 2:
+        return None
+    times = [sample["time"] for sample in samples]
+    values = [sample["rss_bytes"] for sample in samples]
+    mean_time = sum(times) / len(times)
+    mean_value = sum(values) / len(values)
+    variance = sum((t - mean_time) ** 2 for t in times)
+    if variance == 0:
+        return None
+    covariance = sum((t - mean_time) * (v - mean_value) for t, v in zip(times, values))
+    return covariance / variance * 3600
+
+# Memory accounting for a long-running process: periodic RSS samples alongside the sizes of the
+# process's own queues and caches (registered as gauges), and tracemalloc snapshots whose diff
+# against a baseline shows which lines have been allocating the memory that is still held.
+class MemoryMonitor:
+    def __init__(self, interval: float = 60.0, history: int = 1440, trace_frames: int = 0):
+        self.interval = interval
+        self.trace_frames = trace_frames
+        self.samples = deque(maxlen=history)
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_at = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # fn() returns a number (e.g. a queue depth or entry count) recorded with every sample
+    def register(self, name: str, fn: Callable[[], Any]):
+        self._gauges[name] = fn
+
+    def start(self):
+        if self.trace_frames > 0:
+            self.start_tracing(self.trace_frames)
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"Memory monitor sampling every {self.interval:.0f}s")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"Memory sample failed: {e}")
+            self._stop_event.wait(self.interval)
+
+    def sample(self) -> Dict[str, Any]:
+        sample = {"time": time.time(), "rss_bytes": rss_bytes(), "gc_counts": gc.get_count()}
+        if tracemalloc.is_tracing():
+            sample["traced_bytes"], sample["traced_peak_bytes"] = tracemalloc.get_traced_memory()
+        gauges = {}
+        for name, fn in list(self._gauges.items()):
+            try:
+                gauges[name] = fn()
+            except Exception as e:
+                gauges[name] = None
+                logger.debug(f"Memory gauge {name} failed: {e}")
+        sample["gauges"] = gauges
+        with self._lock:
+            self.samples.append(sample)
+        return sample
+
+    # Starts tracemalloc (if needed) and takes the baseline that later snapshots are compared to
+    def start_tracing(self, frames: int = 1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info(f"Tracing allocations with {frames} frame(s)")
+        self.reset_baseline()
+
+    def stop_tracing(self) -> bool:
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        with self._lock:
+            self._baseline, self._baseline_at = None, None
+        logger.info("Stopped tracing allocations")
+        return True
+
+    # False when allocations are not being traced
+    def reset_baseline(self) -> bool:
+        if not tracemalloc.is_tracing():
+            return False
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        with self._lock:
+            self._baseline, self._baseline_at = snapshot, time.time()
+        return True
+
+    # Largest allocation growth since the baseline, grouped by 'lineno', 'filename' or 'traceback'.
+    # None when allocations are not being traced.
+    def top_allocations(self, limit: int = 20, group_by: str = 'lineno') -> Optional[List[Dict[str, Any]]]:
+        if not tracemalloc.is_tracing():
+            return None
+        with self._lock:
+            baseline = self._baseline
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        if baseline is None:
+            stats = snapshot.statistics(group_by)
+        else:
+            stats = snapshot.compare_to(baseline, group_by)
+        return [
+            {
+                "location": [str(frame) for frame in stat.traceback] if group_by == 'traceback' else str(stat.traceback[0]),
+                "size_bytes": stat.size,
+                "size_diff_bytes": getattr(stat, 'size_diff', stat.size),
+                "count": stat.count,
+                "count_diff": getattr(stat, 'count_diff', stat.count)
+            }
+            for stat in stats[:limit]
+        ]
+
+    def get_metrics(self, recent: int = 0) -> Dict[str, Any]:
+        current = self.sample() if not self.samples or time.time() - self.samples[-1]["time"] > 1 else self.samples[-1]
+        with self._lock:
+            samples = list(self.samples)
+            baseline_at = self._baseline_at
+        return {
+            "current": current,
+            "rss_growth_bytes_per_hour": rss_growth_per_hour(samples),
+            "rss_min_bytes": min(sample["rss_bytes"] for sample in samples),
+            "rss_max_bytes": max(sample["rss_bytes"] for sample in samples),
+            "samples": len(samples),
+            "sample_interval": self.interval,
+            "tracing": tracemalloc.is_tracing(),
+            "baseline_at": baseline_at,
+            "recent": samples[-recent:] if recent > 0 else []
+        }
+
+# Global memory monitor instance, configured from the environment
+memory_monitor = MemoryMonitor(interval=MEMORY_SAMPLE_INTERVAL, history=MEMORY_HISTORY, trace_frames=MEMORY_TRACEMALLOC_FRAMES)
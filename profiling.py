@@ -0,0 +1,189 @@
+import os
+import re
+import sys
+import time
+import random
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Optional
+from flask import request
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Where profiles are written, one collapsed-stack file per profile
+PROFILE_DIR = os.getenv('PROFILE_DIR', './profiles')
+# Fraction of turns profiled without being asked; 0 leaves only explicitly requested profiles
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+# Socket.IO connections opened with this header set to ADMIN_TOKEN have every turn profiled
+PROFILE_HEADER = 'X-Profile'
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+# Root-first "a;b;c" stack, the collapsed format flamegraph.pl, speedscope and inferno read
+def _fold(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+# Statistical profiler: one daemon thread snapshots sys._current_frames() every interval while any
+# profile is active, and stops when none is. Turn profiles sample only the thread handling the turn;
+# the process-wide profile samples every thread, rooted at the thread name. When nothing is
+# profiled there is no sampler thread, and deciding whether to profile a turn is a few lookups.
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, output_dir: str = PROFILE_DIR, sample_rate: float = 0.0):
+        self.interval = interval
+        self.output_dir = Path(output_dir)
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        # Stack counts per profiled thread, and for the process-wide profile while it runs
+        self._threads: Dict[int, Counter] = {}
+        self._process: Optional[Counter] = None
+        self._process_started_at = 0.0
+        # Connections opened with the profile header, and sessions flagged for their next turns
+        self._connections = set()
+        self._sessions: Dict[str, int] = {}
+        self._metrics = {"turn_profiles": 0, "process_profiles": 0, "samples": 0}
+
+    def flag_connection(self, sid: str):
+        with self._lock:
+            self._connections.add(sid)
+
+    def unflag_connection(self, sid: str):
+        with self._lock:
+            self._connections.discard(sid)
+
+    def flag_session(self, session_id: str, turns: int = 1):
+        with self._lock:
+            self._sessions[session_id] = turns
+
+    def unflag_session(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def should_profile(self, sid: str, session_id: str) -> bool:
+        if sid in self._connections:
+            return True
+        if session_id in self._sessions:
+            with self._lock:
+                remaining = self._sessions.get(session_id, 0)
+                if remaining <= 1:
+                    self._sessions.pop(session_id, None)
+                else:
+                    self._sessions[session_id] = remaining - 1
+            return remaining > 0
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    # Called with the lock held
+    def _ensure_sampler(self):
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._sampler.start()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._threads and self._process is None:
+                    self._sampler = None
+                    return
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()} if self._process is not None else {}
+                for ident, frame in sys._current_frames().items():
+                    counter = self._threads.get(ident)
+                    if ident == own_ident or (counter is None and self._process is None):
+                        continue
+                    stack = _fold(frame)
+                    if counter is not None:
+                        counter[stack] += 1
+                    if self._process is not None:
+                        self._process[f"{thread_names.get(ident, ident)};{stack}"] += 1
+                    self._metrics["samples"] += 1
+                del frame
+            time.sleep(self.interval)
+
+    def _write(self, name: str, counts: Counter, seconds: float) -> Optional[str]:
+        if not counts:
+            return None
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        safe_name = re.sub(r"[^\w.-]", "_", name)
+        path = self.output_dir / f"{safe_name}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.folded"
+        with open(path, 'w') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in counts.items())
+        logger.info(f"Wrote profile {path}: {sum(counts.values())} samples over {seconds:.2f}s")
+        return str(path)
+
+    # Samples the calling thread for the duration of the block
+    @contextmanager
+    def profile_thread(self, name: str):
+        ident = threading.get_ident()
+        counts = Counter()
+        with self._lock:
+            self._threads[ident] = counts
+            self._ensure_sampler()
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads.pop(ident, None)
+                self._metrics["turn_profiles"] += 1
+            self._write(name, counts, time.perf_counter() - started_at)
+
+    # False when a process-wide profile is already running
+    def start_process(self) -> bool:
+        with self._lock:
+            if self._process is not None:
+                return False
+            self._process = Counter()
+            self._process_started_at = time.perf_counter()
+            self._ensure_sampler()
+        logger.info("Started process-wide profiling")
+        return True
+
+    # None when no process-wide profile was running
+    def stop_process(self) -> Optional[Dict]:
+        with self._lock:
+            counts, self._process = self._process, None
+            if counts is None:
+                return None
+            self._metrics["process_profiles"] += 1
+        seconds = time.perf_counter() - self._process_started_at
+        return {"path": self._write("process", counts, seconds), "samples": sum(counts.values()), "seconds": seconds}
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            return dict(
+                self._metrics,
+                process_profiling=self._process is not None,
+                active_turn_profiles=len(self._threads),
+                flagged_connections=len(self._connections),
+                flagged_sessions=dict(self._sessions),
+                sample_rate=self.sample_rate,
+                output_dir=str(self.output_dir)
+            )
+
+# Global profiler instance, configured from the environment
+profiler = SamplingProfiler(interval=PROFILE_INTERVAL_MS / 1000, output_dir=PROFILE_DIR, sample_rate=PROFILE_SAMPLE_RATE)
+
+# Socket.IO handler decorator: profiles the turn when its connection, session or the sample rate asks
+def profile_turn(handler):
+    @wraps(handler)
+    def wrapper(data, *args):
+        session_id = data.get('session_id') if isinstance(data, dict) else None
+        if not profiler.should_profile(request.sid, session_id):
+            return handler(data, *args)
+        with profiler.profile_thread(f"turn_{session_id}"):
+            return handler(data, *args)
+    return wrapper
@@ -12,6 +12,8 @@ document.addEventListener('DOMContentLoaded', () => {
     let sessionId = getStoredSessionId();
     let sessionData = null;
     let messageHistory = getStoredMessages();
+    let loadingOlder = false;
+    let loadOlderButton = null;
 
     sendButton.disabled = true;
     restartButton.disabled = true;
@@ -27,6 +29,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // Event Listeners
     function initializeEventListeners() {
         chatForm.addEventListener('submit', handleFormSubmit);
+        chatMessages.addEventListener('scroll', () => { if (chatMessages.scrollTop === 0) loadOlderMessages(); });
         chatInput.addEventListener('input', () => { sendButton.disabled = chatInput.value.trim() === ''; });
         restartButton.addEventListener('click', restartChat);
         questionBoxes.forEach(box => {
@@ -69,6 +72,22 @@ document.addEventListener('DOMContentLoaded', () => {
                 storeMessages();
                 displayStoredMessages();
             }
+            updateLoadOlderButton();
+        });
+
+        socket.on('older_messages', (data) => {
+            loadingOlder = false;
+            if (data.session_id !== sessionId) return;
+
+            // Only keep messages older than what is already shown
+            const oldestCount = messageHistory.length > 0 ? messageHistory[0].message_count : Infinity;
+            const olderMessages = data.messages.filter(messageData => messageData.message_count < oldestCount);
+            if (olderMessages.length > 0) {
+                messageHistory = olderMessages.concat(messageHistory);
+                storeMessages();
+                prependMessages(olderMessages);
+            }
+            updateLoadOlderButton();
         });
 
         socket.on('ai_response', (data) => {
@@ -93,6 +112,14 @@ document.addEventListener('DOMContentLoaded', () => {
             chatInput.focus();
         });
 
+        // The server is shedding load; the message was not processed and can be sent again
+        socket.on('busy', (data) => {
+            removeTypingIndicator();
+            displayErrorMessage(data.message || 'The assistant is busy, please try again shortly');
+            chatInput.disabled = false;
+            chatInput.placeholder = 'Type your message...';
+        });
+
         socket.on('error', (data) => {
             console.error('Socket error:', data);
             displayErrorMessage(data.message || 'An error occurred');
@@ -147,6 +174,8 @@ document.addEventListener('DOMContentLoaded', () => {
         
         // Reset UI elements
         chatMessages.innerHTML = '';
+        loadOlderButton = null;
+        loadingOlder = false;
         welcomeMessage.classList.remove('hidden');
         chatStarted = false;
         restartButton.disabled = true;
@@ -164,6 +193,52 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // History Pagination
+    // Message counts are contiguous from 1, so anything above 1 means older messages exist on the server
+    function hasOlderMessages() {
+        return messageHistory.length > 0 && messageHistory[0].message_count > 1;
+    }
+
+    function updateLoadOlderButton() {
+        if (!hasOlderMessages()) {
+            if (loadOlderButton) loadOlderButton.remove();
+            loadOlderButton = null;
+            return;
+        }
+        if (!loadOlderButton) {
+            loadOlderButton = document.createElement('button');
+            loadOlderButton.type = 'button';
+            loadOlderButton.className = 'load-older-button';
+            loadOlderButton.textContent = 'Load older messages';
+            loadOlderButton.addEventListener('click', loadOlderMessages);
+        }
+        loadOlderButton.disabled = false;
+        chatMessages.prepend(loadOlderButton);
+    }
+
+    function loadOlderMessages() {
+        if (loadingOlder || !hasOlderMessages() || !socket || !socket.connected) return;
+        loadingOlder = true;
+        if (loadOlderButton) loadOlderButton.disabled = true;
+        socket.emit('load_older_messages', {
+            session_id: sessionId,
+            before: messageHistory[0].message_count
+        });
+    }
+
+    // Render older messages above the current ones without moving the visible scroll position
+    function prependMessages(messages) {
+        const fragment = document.createDocumentFragment();
+        messages.forEach(messageData => {
+            displayUserMessage(messageData.question, messageData.timestamp, false, fragment);
+            displayAIMessage(messageData.answer, messageData.timestamp, messageData.duration, false, fragment);
+        });
+        const previousHeight = chatMessages.scrollHeight;
+        const anchor = loadOlderButton ? loadOlderButton.nextSibling : chatMessages.firstChild;
+        chatMessages.insertBefore(fragment, anchor);
+        chatMessages.scrollTop += chatMessages.scrollHeight - previousHeight;
+    }
+
     // Sending Messages
     function sendMessage() {
         const message = chatInput.value.trim();
@@ -216,7 +291,7 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
     
-    function displayUserMessage(message, timestamp, animate = true) {
+    function displayUserMessage(message, timestamp, animate = true, target = chatMessages) {
         const messageDiv = document.createElement('div');
         messageDiv.className = 'message user';
         const time = new Date(timestamp).toLocaleTimeString([], {
@@ -234,12 +309,12 @@ document.addEventListener('DOMContentLoaded', () => {
                 <time class="message-time" datetime="${time}">${time}</time> 
             </div>
         `;
-        chatMessages.appendChild(messageDiv);
-        scrollToBottom();
+        target.appendChild(messageDiv);
+        if (target === chatMessages) scrollToBottom();
     }
 
-    function displayAIMessage(message, timestamp, duration = null, animate = true) {
-        removeTypingIndicator();
+    function displayAIMessage(message, timestamp, duration = null, animate = true, target = chatMessages) {
+        if (target === chatMessages) removeTypingIndicator();
         const messageDiv = document.createElement('div');
         messageDiv.className = 'message ai';
         const time = new Date(timestamp).toLocaleTimeString([], {
@@ -259,8 +334,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 <time class="message-time" datetime="${time}">Assistant • ${time}${durationText}</time> 
             </div>   
         `;
-        chatMessages.appendChild(messageDiv);
-        scrollToBottom();
+        target.appendChild(messageDiv);
+        if (target === chatMessages) scrollToBottom();
     }
 
     function displayErrorMessage(message) {
@@ -309,5 +384,6 @@ document.addEventListener('DOMContentLoaded', () => {
     initializeEventListeners();
     initializeSocket();
     displayStoredMessages();
+    updateLoadOlderButton();
 
 });
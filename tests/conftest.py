@@ -0,0 +1,63 @@
+import time
+import hashlib
+import numpy as np
+import pytest
+
+# Deterministic bag-of-words encoder standing in for the SentenceTransformer model: texts sharing
+# words get similar vectors, and nothing is downloaded
+class HashEncoder:
+    dimension = 64
+
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts, **kwargs):
+        vectors = np.full((len(texts), self.dimension), 1e-3, dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimension] += 1
+        return vectors
+
+# Polls condition until it holds, failing the test once timeout seconds have passed
+def wait_for(condition, timeout: float = 5.0):
+    give_up_at = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < give_up_at, "timed out"
+        time.sleep(0.01)
+
+def write_docx(path, title: str, chunks):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph(title)
+    for index, chunk in enumerate(chunks):
+        if index:
+            document.add_paragraph("---CHUNK_BOUNDARY---")
+        document.add_paragraph(chunk)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document.save(str(path))
+
+# A VectorSearchService on the NumPy backend in a scratch directory; settings override the config
+@pytest.fixture
+def make_vector_service(tmp_path, monkeypatch):
+    pytest.importorskip("sentence_transformers")
+    from vectordb import qdrant_vector_db
+    monkeypatch.setattr(qdrant_vector_db, "SentenceTransformer", HashEncoder)
+
+    def make(**settings):
+        config = dict(
+            collection_name="test_documents",
+            vector_backend="numpy",
+            local_vector_path=str(tmp_path / "vectors"),
+            default_documents_folder=str(tmp_path / "documents"),
+            text_cache_dir=str(tmp_path / "text_cache"),
+            embedding_store_dir=str(tmp_path / "embeddings"),
+            faq_index_path=str(tmp_path / "faq_index.npz"),
+            **settings
+        )
+        config_path = tmp_path / "config.json"
+        qdrant_vector_db.VectorSearchService._save_config(config, str(config_path))
+        return qdrant_vector_db.VectorSearchService(str(config_path))
+    return make
@@ -0,0 +1,95 @@
+import threading
+import pytest
+from llm.admission import AdmissionController, AdmissionShed
+from llm.singleflight import SingleFlight
+from tests.conftest import wait_for
+
+def test_levels_step_down_with_occupancy_and_turns_are_shed_when_full():
+    controller = AdmissionController(max_in_flight=4, latency_target=8)
+    admissions = [controller.admit() for _ in range(4)]
+    assert [admission.level.name for admission in admissions] == ["full", "full", "skip_query_extraction", "reduced_context"]
+    assert controller.admit() is None
+
+    for admission in admissions:
+        with admission:
+            pass
+    metrics = controller.get_metrics()
+    assert (metrics["admitted"], metrics["shed"], metrics["in_flight"]) == (4, 1, 0)
+
+def record_turn(controller, stage_seconds):
+    with controller.admit() as admission:
+        admission.record_stages(stage_seconds)
+    # Skip the once-a-second p95 cache
+    controller._p95_cache = (0.0, None, {})
+
+def test_slow_stages_pick_the_level_that_cuts_them():
+    controller = AdmissionController(max_in_flight=100, latency_target=8)
+    record_turn(controller, {"query_extraction": 2.5, "generation": 1.0})
+    assert controller.admit().level.name == "skip_query_extraction"
+
+    controller = AdmissionController(max_in_flight=100, latency_target=8)
+    record_turn(controller, {"generation": 5.0})
+    assert controller.admit().level.name == "reduced_context"
+
+    controller = AdmissionController(max_in_flight=100, latency_target=8)
+    record_turn(controller, {"generation": 6.5})
+    assert controller.admit().level.name == "short_answer"
+    assert controller.get_metrics()["stage_p95_seconds"] == {"generation": 6.5}
+
+# llm.promptflow with a stub pipeline that blocks until release is set, and a singleflight of its own
+@pytest.fixture
+def promptflow(monkeypatch):
+    pytest.importorskip("sentence_transformers")
+    from llm import promptflow
+    release = threading.Event()
+
+    def pipeline(question, conversation_history=None, summary=None, turn_metadata=None, degradation=None):
+        release.wait(5)
+        turn_metadata['stage_seconds'] = {"generation": 0.1}
+        return f"answer at {degradation.name}", []
+    monkeypatch.setattr(promptflow, "run_promptflow_pipeline", pipeline)
+    monkeypatch.setattr(promptflow, "COALESCE_IDENTICAL_QUESTIONS", True)
+    monkeypatch.setattr(promptflow, "promptflow_singleflight", SingleFlight())
+    return promptflow, release
+
+def ask_concurrently(promptflow, controller, callers: int):
+    results = []
+
+    def ask():
+        try:
+            results.append(promptflow.generate_promptflow_response("Is the battery replaceable?", [], admission_controller=controller))
+        except AdmissionShed as e:
+            results.append(e)
+    threads = [threading.Thread(target=ask) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: promptflow.promptflow_singleflight.get_metrics()["waiting"] == callers - 1)
+    return threads, results
+
+def test_coalesced_turns_do_not_take_admission_slots(promptflow):
+    promptflow, release = promptflow
+    controller = AdmissionController(max_in_flight=2, latency_target=8)
+    threads, results = ask_concurrently(promptflow, controller, 5)
+    assert controller.get_metrics()["in_flight"] == 1
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [("answer at full", [])] * 5
+    metrics = controller.get_metrics()
+    assert (metrics["admitted"], metrics["shed"]) == (1, 0)
+
+def test_shed_pipeline_run_raises_with_a_retry_hint(promptflow):
+    promptflow, release = promptflow
+    controller = AdmissionController(max_in_flight=1, latency_target=8)
+    held = controller.admit()
+    release.set()
+    results = []
+    for _ in range(2):
+        with pytest.raises(AdmissionShed) as shed:
+            promptflow.generate_promptflow_response("Is the battery replaceable?", [], admission_controller=controller)
+        results.append(shed.value.retry_after)
+    assert results == [2.0, 2.0]
+    with held:
+        pass
+    assert promptflow.generate_promptflow_response("Is the battery replaceable?", [], admission_controller=controller) == ("answer at full", [])
@@ -0,0 +1,57 @@
+import threading
+from llm import conversation_summary
+from llm.conversation_summary import build_prompt_history, needs_summary, turn_tokens, ConversationSummarizer, SUMMARY_QUESTION
+
+def turns(count: int, answer_chars: int = 400):
+    return [{"question": f"Question {index}", "answer": "x" * answer_chars} for index in range(count)]
+
+def test_short_conversation_is_sent_verbatim():
+    history, stats = build_prompt_history(turns(3), {"text": "unused", "turns": 2}, budget=2000, max_turns=5)
+    assert history == turns(3)
+    assert stats["summary_turns"] == 0
+    assert not needs_summary(turns(3), budget=2000, max_turns=5)
+
+def test_long_conversation_sends_the_summary_and_the_newest_turns_within_budget():
+    conversation = turns(10)
+    history, stats = build_prompt_history(conversation, {"text": "The customer has a broken AuraPhone.", "turns": 8}, budget=350, max_turns=5)
+
+    assert history[0] == {"question": SUMMARY_QUESTION, "answer": "The customer has a broken AuraPhone."}
+    assert history[1:] == conversation[-3:]
+    assert sum(turn_tokens(turn) for turn in history) == stats["history_tokens"] <= 350
+    assert stats["full_history_tokens"] == sum(turn_tokens(turn) for turn in conversation[-5:])
+    assert (stats["history_turns"], stats["summary_turns"]) == (3, 8)
+    assert needs_summary(conversation, budget=350, max_turns=5)
+
+def test_newest_turn_over_budget_is_cut_down_rather_than_dropped():
+    history, _ = build_prompt_history(turns(2, answer_chars=4000), budget=100, max_turns=5)
+    assert len(history) == 1
+    assert history[0]["question"] == "Question 1"
+    assert history[0]["answer"].endswith(" [...]")
+    assert turn_tokens(history[0]) <= 100 + 2
+
+def test_summariser_only_folds_in_turns_the_summary_does_not_cover(monkeypatch):
+    prompts, saved, done = [], [], threading.Event()
+    monkeypatch.setattr(conversation_summary, "needs_summary", lambda conversation: True)
+    monkeypatch.setattr(conversation_summary, "generate_ai_response", lambda prompt, history, **kwargs: (prompts.append(prompt) or "New summary", 1))
+
+    def save_summary(session_id, metadata):
+        saved.append((session_id, metadata))
+        done.set()
+    summarizer = ConversationSummarizer(save_summary)
+
+    conversation = turns(6, answer_chars=10)
+    summarizer.submit("s1", conversation[:5], {"text": "Old summary", "turns": 4})
+    # Coalesced with the pending request: only the latest conversation is summarised
+    summarizer.submit("s1", conversation, {"text": "Old summary", "turns": 4})
+    summarizer.start()
+    try:
+        assert done.wait(5), "summary not saved"
+    finally:
+        summarizer.stop()
+
+    assert len(prompts) == 1
+    assert "Old summary" in prompts[0]
+    assert "Question 3" not in prompts[0] and "Question 4" in prompts[0] and "Question 5" in prompts[0]
+    assert saved[0][0] == "s1" and saved[0][1]["summary"]["text"] == "New summary"
+    assert saved[0][1]["summary"]["turns"] == 6
+    assert summarizer.get_metrics()["coalesced"] == 1
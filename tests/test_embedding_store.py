@@ -0,0 +1,55 @@
+import multiprocessing
+import numpy as np
+from vectordb.embedding_store import EmbeddingStore
+
+MODEL = "test-model"
+
+def vectors_for(texts):
+    return np.array([[float(len(text)), float(sum(map(ord, text)) % 997), 1.0] for text in texts], dtype=np.float32)
+
+def _append_batches(store_dir, worker, batches):
+    store = EmbeddingStore(store_dir)
+    for batch in range(batches):
+        store.encode(MODEL, [f"worker {worker} text {batch} {i}" for i in range(5)], vectors_for)
+
+def test_stores_sharing_a_folder_keep_each_others_rows(tmp_path):
+    first, second = EmbeddingStore(str(tmp_path)), EmbeddingStore(str(tmp_path))
+    # second reads the (empty) index before first appends
+    second.lookup(MODEL, ["alpha"])
+    first.encode(MODEL, ["alpha", "beta"], vectors_for)
+    second.encode(MODEL, ["gamma", "alpha"], vectors_for)
+
+    reopened = EmbeddingStore(str(tmp_path))
+    texts = ["alpha", "beta", "gamma"]
+    assert np.array_equal(np.stack(reopened.lookup(MODEL, texts)), vectors_for(texts))
+    assert reopened.get_stats()["models"][MODEL] == 3
+
+def test_concurrent_processes_append_without_losing_rows(tmp_path):
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_append_batches, args=(str(tmp_path), worker, 10)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    texts = [f"worker {worker} text {batch} {i}" for worker in range(4) for batch in range(10) for i in range(5)]
+    rows = EmbeddingStore(str(tmp_path)).lookup(MODEL, texts)
+    assert all(row is not None for row in rows)
+    assert np.array_equal(np.stack(rows), vectors_for(texts))
+
+def test_unindexed_tail_is_kept_on_open_and_reused_by_the_next_append(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.encode(MODEL, ["alpha"], vectors_for)
+    matrix_path = next(tmp_path.glob("*.f32"))
+    # An append in progress elsewhere (or one that crashed) has written data but not its index yet
+    with open(matrix_path, 'ab') as f:
+        f.write(np.ones((2, 3), dtype=np.float32).tobytes())
+    size = matrix_path.stat().st_size
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert np.array_equal(reopened.lookup(MODEL, ["alpha"])[0], vectors_for(["alpha"])[0])
+    assert matrix_path.stat().st_size == size
+
+    reopened.encode(MODEL, ["beta"], vectors_for)
+    assert np.array_equal(np.stack(EmbeddingStore(str(tmp_path)).lookup(MODEL, ["alpha", "beta"])), vectors_for(["alpha", "beta"]))
@@ -0,0 +1,35 @@
+from vectordb.faq_index import FAQIndex, extract_faq_pairs
+from tests.conftest import HashEncoder
+
+def test_extracts_question_answer_pairs_from_chunks():
+    payloads = [
+        {"chunk_content": "Q: How long does the battery\nlast?\nA: About two\n days.", "file_name": "FAQs.pdf", "document_title": "FAQs"},
+        {"chunk_content": "The AuraPhone has a 6.1 inch screen.", "file_name": "Specs.pdf"},
+        {"chunk_content": "Q: how long does the battery last?\nA: A different answer.", "file_name": "Other.pdf"},
+        {"chunk_content": "Q: Is it waterproof?\nA: ", "file_name": "FAQs.pdf"}
+    ]
+    assert extract_faq_pairs(payloads) == [{
+        "question": "How long does the battery last?",
+        "answer": "About two days.",
+        "file_name": "FAQs.pdf",
+        "document_title": "FAQs"
+    }]
+
+def test_matches_above_threshold_and_counts_lookups(tmp_path):
+    encoder = HashEncoder()
+    pairs = [
+        {"question": "How long does the battery last?", "answer": "Two days."},
+        {"question": "How do I reset my password?", "answer": "Use the account page."}
+    ]
+    FAQIndex.build(pairs, encoder, "docs_v1").save(str(tmp_path / "faq.npz"))
+    index = FAQIndex.load(str(tmp_path / "faq.npz"))
+
+    assert index.collection_name == "docs_v1"
+    assert index.match(encoder.encode(["how do i reset my password?"])[0], threshold=0.9)["answer"] == "Use the account page."
+    assert index.match(encoder.encode(["which colours are available"])[0], threshold=0.9) is None
+    assert index.stats == {"lookups": 2, "answered": 1, "below_threshold": 1}
+
+def test_empty_index_never_matches():
+    index = FAQIndex.build([], HashEncoder())
+    assert len(index) == 0
+    assert index.match(HashEncoder().encode(["anything"])[0], threshold=0.0) is None
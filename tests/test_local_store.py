@@ -0,0 +1,53 @@
+import uuid
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from vectordb import local_store
+from vectordb.local_store import NumpyVectorStore
+
+PRODUCTS = ("auraphone", "aurabook", "aurawatch")
+
+def fill(client, points):
+    client.create_collection("docs", vectors_config=models.VectorParams(size=8, distance=models.Distance.COSINE))
+    client.create_payload_index("docs", "product", models.PayloadSchemaType.KEYWORD)
+    client.upsert("docs", points)
+
+@pytest.fixture
+def clients():
+    rng = np.random.default_rng(7)
+    points = [
+        models.PointStruct(id=str(uuid.UUID(int=index)), vector=rng.normal(size=8).tolist(),
+                           payload={"product": PRODUCTS[index % 3], "chunk_index": index, "title": f"doc {index % 5}"})
+        for index in range(60)
+    ]
+    qdrant, numpy_store = QdrantClient(":memory:"), NumpyVectorStore()
+    fill(qdrant, points)
+    fill(numpy_store, points)
+    yield qdrant, numpy_store, rng
+    qdrant.close()
+
+@pytest.mark.parametrize("query_filter", [
+    None,
+    models.Filter(must=[models.FieldCondition(key="product", match=models.MatchValue(value="aurabook"))]),
+    models.Filter(must=[models.FieldCondition(key="product", match=models.MatchAny(any=["auraphone", "aurawatch"]))],
+                  must_not=[models.FieldCondition(key="title", match=models.MatchValue(value="doc 0"))]),
+    models.Filter(should=[models.FieldCondition(key="chunk_index", range=models.Range(lt=10)),
+                          models.FieldCondition(key="title", match=models.MatchValue(value="doc 3"))])
+])
+def test_numpy_backend_matches_qdrant_local_mode(clients, query_filter):
+    qdrant, numpy_store, rng = clients
+    for _ in range(5):
+        query = rng.normal(size=8).tolist()
+        expected = qdrant.query_points("docs", query=query, query_filter=query_filter, limit=5, with_payload=True).points
+        actual = numpy_store.query_points("docs", query=query, query_filter=query_filter, limit=5, with_payload=True).points
+        assert [point.id for point in actual] == [point.id for point in expected]
+        assert [point.score for point in actual] == pytest.approx([point.score for point in expected], abs=1e-5)
+        assert [point.payload for point in actual] == [point.payload for point in expected]
+    assert numpy_store.count("docs", count_filter=query_filter).count == qdrant.count("docs", count_filter=query_filter).count
+
+def test_missing_filter_matcher_fails_with_a_clear_message(monkeypatch):
+    monkeypatch.setattr(local_store, "check_filter", None)
+    monkeypatch.setattr(local_store, "_check_filter_error", ImportError("No module named 'qdrant_client.local'"), raising=False)
+    with pytest.raises(ImportError, match="vector_backend 'numpy'"):
+        NumpyVectorStore()
@@ -0,0 +1,58 @@
+import tracemalloc
+import pytest
+from memory import MemoryMonitor, rss_growth_per_hour
+
+def test_rss_growth_is_the_least_squares_slope_per_hour():
+    samples = [{"time": 60.0 * minute, "rss_bytes": 1000 + 500 * minute + (50 if minute % 2 else -50)} for minute in range(10)]
+    assert rss_growth_per_hour(samples) == pytest.approx(500 * 60, rel=0.05)
+    assert rss_growth_per_hour(samples[:1]) is None
+    assert rss_growth_per_hour([{"time": 5.0, "rss_bytes": 1}, {"time": 5.0, "rss_bytes": 2}]) is None
+
+def test_samples_record_gauges_and_tolerate_failing_ones():
+    monitor = MemoryMonitor(interval=0)
+    monitor.register("queue_depth", lambda: 3)
+    monitor.register("broken", lambda: 1 / 0)
+    sample = monitor.sample()
+    assert sample["gauges"] == {"queue_depth": 3, "broken": None}
+    assert sample["rss_bytes"] > 0
+    assert monitor.get_metrics()["samples"] >= 1
+
+def allocate_blocks():
+    return [bytearray(1024) for _ in range(2000)]
+
+@pytest.fixture
+def monitor():
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc already running")
+    monitor = MemoryMonitor(interval=0)
+    assert monitor.top_allocations() is None
+    monitor.start_tracing(frames=5)
+    yield monitor
+    monitor.stop_tracing()
+
+def test_top_allocations_show_growth_since_the_baseline_by_line(monitor):
+    held = allocate_blocks()
+    top = monitor.top_allocations(limit=5)
+    assert "test_memory.py" in top[0]["location"]
+    assert top[0]["size_diff_bytes"] >= 2000 * 1024
+    assert top[0]["count_diff"] >= 2000
+
+    # A new baseline absorbs what is already held
+    assert monitor.reset_baseline()
+    assert all(entry["size_diff_bytes"] < 2000 * 1024 for entry in monitor.top_allocations(limit=5))
+    del held
+
+def test_top_allocations_group_by_file_and_traceback(monitor):
+    held = allocate_blocks()
+    by_file = monitor.top_allocations(limit=1, group_by='filename')
+    assert by_file[0]["location"].endswith("test_memory.py:0")
+    by_traceback = monitor.top_allocations(limit=1, group_by='traceback')
+    assert isinstance(by_traceback[0]["location"], list) and len(by_traceback[0]["location"]) > 1
+    del held
+
+def test_stop_tracing_clears_the_baseline(monitor):
+    assert monitor.stop_tracing()
+    assert not monitor.stop_tracing()
+    assert monitor.top_allocations() is None
+    assert not monitor.reset_baseline()
+    assert monitor.get_metrics()["baseline_at"] is None
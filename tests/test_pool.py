@@ -0,0 +1,60 @@
+import threading
+import time
+import pytest
+from database.pool import BlockingConnectionPool, PoolTimeout
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+def test_exhausted_pool_hands_a_returned_connection_to_the_waiter():
+    pool = BlockingConnectionPool(FakeConnection, min_size=1, max_size=1, timeout=5)
+    held = pool.getconn()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert pool.get_metrics()["waiting"] == 1
+
+    pool.putconn(held)
+    waiter.join(5)
+    assert got == [held]
+    metrics = pool.get_metrics()
+    assert metrics["waited_checkouts"] == 1
+    assert metrics["wait_p95_ms"] >= 40
+    assert metrics["connections_created"] == 1
+
+def test_checkout_times_out_when_nothing_is_returned():
+    pool = BlockingConnectionPool(FakeConnection, min_size=0, max_size=1)
+    pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.05)
+    assert pool.get_metrics()["timeouts"] == 1
+
+def test_connections_past_their_lifetime_are_replaced():
+    pool = BlockingConnectionPool(FakeConnection, min_size=1, max_size=1, max_lifetime=0.01)
+    conn = pool.getconn()
+    time.sleep(0.02)
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.getconn() is not conn
+
+def test_failed_connect_gives_the_slot_back():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("refused")
+        return FakeConnection()
+
+    pool = BlockingConnectionPool(connect, min_size=0, max_size=1)
+    with pytest.raises(ConnectionError):
+        pool.getconn()
+    assert pool.getconn(timeout=0.1) is not None
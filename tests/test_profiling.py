@@ -0,0 +1,53 @@
+import time
+from profiling import SamplingProfiler
+
+def test_flagged_session_is_profiled_for_its_next_turns_only():
+    profiler = SamplingProfiler(sample_rate=0.0)
+    profiler.flag_session("s1", turns=2)
+    assert [profiler.should_profile("sid", "s1") for _ in range(3)] == [True, True, False]
+    assert profiler.get_metrics()["flagged_sessions"] == {}
+
+    profiler.flag_session("s2", turns=5)
+    assert profiler.unflag_session("s2")
+    assert not profiler.unflag_session("s2")
+    assert not profiler.should_profile("sid", "s2")
+
+def test_flagged_connection_is_profiled_every_turn():
+    profiler = SamplingProfiler(sample_rate=0.0)
+    profiler.flag_connection("sid")
+    assert all(profiler.should_profile("sid", None) for _ in range(3))
+    profiler.unflag_connection("sid")
+    assert not profiler.should_profile("sid", None)
+
+def test_sample_rate_profiles_unflagged_turns():
+    assert all(SamplingProfiler(sample_rate=1.0).should_profile("sid", "s1") for _ in range(3))
+    assert not any(SamplingProfiler(sample_rate=0.0).should_profile("sid", "s1") for _ in range(3))
+
+def busy_turn(seconds: float):
+    give_up_at = time.perf_counter() + seconds
+    while time.perf_counter() < give_up_at:
+        sum(range(100))
+
+def test_turn_profile_writes_the_threads_folded_stacks(tmp_path):
+    profiler = SamplingProfiler(interval=0.001, output_dir=str(tmp_path))
+    with profiler.profile_thread("turn_s1/x"):
+        busy_turn(0.2)
+
+    profile, = tmp_path.glob("turn_s1_x_*.folded")
+    lines = profile.read_text().splitlines()
+    assert any("busy_turn (test_profiling.py:" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert profiler.get_metrics()["turn_profiles"] == 1
+
+def test_process_profile_roots_stacks_at_the_thread_name(tmp_path):
+    profiler = SamplingProfiler(interval=0.001, output_dir=str(tmp_path))
+    assert profiler.stop_process() is None
+    assert profiler.start_process()
+    assert not profiler.start_process()
+    busy_turn(0.1)
+    result = profiler.stop_process()
+
+    assert result["samples"] > 0
+    with open(result["path"]) as f:
+        assert any(line.startswith("MainThread;") for line in f)
+    assert profiler.get_metrics()["process_profiling"] is False
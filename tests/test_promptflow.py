@@ -0,0 +1,36 @@
+import pytest
+
+# llm.promptflow, and the questions its FAQ match was called with
+@pytest.fixture
+def promptflow(monkeypatch):
+    pytest.importorskip("sentence_transformers")
+    from llm import promptflow
+    calls = []
+
+    def faq_response(question):
+        calls.append(question)
+        return "From the FAQ", []
+    monkeypatch.setattr(promptflow, "faq_response", faq_response)
+    # Stops the pipeline right after query extraction, before any search or LLM call
+    monkeypatch.setattr(promptflow, "get_query", lambda question, history: ("Query extraction failed", 0))
+    return promptflow, calls
+
+def test_opening_question_is_answered_from_the_faq(promptflow):
+    promptflow, faq_calls = promptflow
+    response, _ = promptflow.run_promptflow_pipeline("How long does the battery last?")
+    assert response == "From the FAQ"
+    assert faq_calls == ["How long does the battery last?"]
+
+def test_follow_up_question_skips_the_faq(promptflow):
+    promptflow, faq_calls = promptflow
+    history = [{"question": "Tell me about the AuraPhone", "answer": "It is a phone."}]
+    response, _ = promptflow.run_promptflow_pipeline("How long does the battery last?", conversation_history=history)
+    assert response == "Query extraction failed"
+    assert faq_calls == []
+
+def test_summarised_session_skips_the_faq(promptflow):
+    promptflow, faq_calls = promptflow
+    summary = {"text": "The user asked about the AuraPhone.", "turns": 4}
+    response, _ = promptflow.run_promptflow_pipeline("How long does the battery last?", summary=summary)
+    assert response == "Query extraction failed"
+    assert faq_calls == []
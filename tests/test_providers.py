@@ -0,0 +1,17 @@
+import pytest
+from llm.providers import LLMProvider, FakeLLMProvider
+
+def test_provider_missing_a_method_fails_when_created():
+    class SyncOnlyProvider(LLMProvider):
+        def generate_response(self, prompt, conversation_history=None, max_tokens=3000, temperature=0.1, custom_system_prompt=None, deadline=None):
+            return "answer", 1
+
+    with pytest.raises(TypeError, match="generate_response_async"):
+        SyncOnlyProvider()
+
+def test_fake_provider_answers_the_same_prompt_the_same_way():
+    provider = FakeLLMProvider(latency_ms=0, input_token_ms=0, output_token_ms=0, answer_words=5)
+    first = provider.generate_response("Is the battery replaceable?")
+    assert first == provider.generate_response("Is the battery replaceable?")
+    assert first[1] == 1 and first[0].startswith("**Fake answer** to: Is the battery replaceable?")
+    assert provider.generate_response("q", custom_system_prompt="Reply with QUERY: <query>") == ("QUERY: q", 1)
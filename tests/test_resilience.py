@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from llm.resilience import CircuitBreaker, ConcurrencyLimiter, RateLimitTimeout
+from llm.providers import UNAVAILABLE_MESSAGE
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+def test_breaker_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    open_breaker(breaker)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0)
+    open_breaker(breaker)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_released_trial_lets_the_next_call_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    open_breaker(breaker)
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+def test_limiter_times_out_when_slots_are_taken():
+    limiter = ConcurrencyLimiter(max_concurrent=1)
+    with limiter.slot(timeout=1):
+        with pytest.raises(RateLimitTimeout):
+            with limiter.slot(timeout=0.05):
+                pass
+    with limiter.slot(timeout=0.05):
+        pass
+
+def test_limiter_rate_budget_exhausted():
+    limiter = ConcurrencyLimiter(max_concurrent=4, requests_per_minute=1)
+    with limiter.slot(timeout=0.05):
+        pass
+    with pytest.raises(RateLimitTimeout):
+        with limiter.slot(timeout=0.05):
+            pass
+
+class _FailingModels:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, **kwargs):
+        self.calls += 1
+        # Not retryable: the provider answered, which counts as the circuit being healthy
+        raise ValueError("bad request")
+
+class _FakeClient:
+    def __init__(self):
+        self.models = _FailingModels()
+
+@pytest.fixture
+def integration():
+    google_ai = pytest.importorskip("llm.google_ai")
+    provider = google_ai.GoogleAIIntegration(api_key="test", max_concurrency=1, max_retries=0, deadline=0.2)
+    provider.client = _FakeClient()
+    provider.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    return provider
+
+# A half-open trial that never got a limiter slot must not leave the breaker stuck rejecting calls
+def test_half_open_trial_without_slot_does_not_wedge_breaker(integration):
+    open_breaker(integration.circuit_breaker)
+    integration.limiter._semaphore.acquire()
+    try:
+        assert integration.generate_response("hello")[0] == UNAVAILABLE_MESSAGE
+    finally:
+        integration.limiter._semaphore.release()
+
+    assert integration.circuit_breaker.state == CircuitBreaker.HALF_OPEN
+    assert not integration.circuit_breaker._trial_in_flight
+    integration.generate_response("hello")
+    assert integration.client.models.calls == 1
+    assert integration.circuit_breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_trial_without_slot_async(integration):
+    open_breaker(integration.circuit_breaker)
+    integration.limiter._semaphore.acquire()
+    try:
+        result = asyncio.run(integration.generate_response_async("hello"))
+    finally:
+        integration.limiter._semaphore.release()
+    assert result[0] == UNAVAILABLE_MESSAGE
+    assert not integration.circuit_breaker._trial_in_flight
+    assert integration.circuit_breaker.allow()
@@ -0,0 +1,51 @@
+import threading
+from llm.singleflight import SingleFlight
+from tests.conftest import wait_for
+
+def run_concurrently(flight, key, fn, callers: int):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+def test_concurrent_callers_share_one_execution():
+    flight, release, executions = SingleFlight(), threading.Event(), []
+
+    def fn():
+        executions.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results, _ = run_concurrently(flight, "q", fn, 4)
+    wait_for(lambda: flight.get_metrics()["waiting"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(executions) == 1
+    assert sorted(results) == [("answer", False)] + [("answer", True)] * 3
+    assert flight.get_metrics() == {"executions": 1, "coalesced": 3, "errors": 0, "max_waiters": 3, "in_flight": 0, "waiting": 0}
+
+def test_followers_get_the_leaders_exception_and_later_calls_run_again():
+    flight, release = SingleFlight(), threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("boom")
+
+    threads, _, errors = run_concurrently(flight, "q", fail, 3)
+    wait_for(lambda: flight.get_metrics()["waiting"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [str(error) for error in errors] == ["boom"] * 3
+    assert flight.do("q", lambda: "fresh") == ("fresh", False)
+    assert flight.get_metrics()["errors"] == 1
@@ -0,0 +1,101 @@
+import json
+import pytest
+from tracing import Tracer, SpanExporter, FileSpanExporter, NOOP_SPAN, STATUS_ERROR, current_span, current_trace_id
+
+# Keeps finished spans in memory instead of writing them anywhere; start() is never called
+class ListSpanExporter(SpanExporter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def write(self, request):
+        pass
+
+def test_nested_spans_share_the_trace_of_the_outermost_one():
+    exporter = ListSpanExporter()
+    tracer = Tracer(exporter)
+    with tracer.span("turn", session="s1") as root:
+        with tracer.span("search") as child:
+            assert current_span() is child
+            assert current_trace_id() == root.trace_id
+        assert current_span() is root
+    assert current_span() is NOOP_SPAN
+
+    child, root = exporter.spans
+    assert (child.trace_id, child.parent_id) == (root.trace_id, root.span_id)
+    assert root.parent_id is None
+    assert root.attributes == {"session": "s1"}
+    assert root.start_ns <= child.start_ns <= child.end_ns <= root.end_ns
+
+def test_children_of_an_unsampled_root_are_not_recorded():
+    exporter = ListSpanExporter()
+    tracer = Tracer(exporter, sample_rate=0.0)
+    with tracer.span("turn") as root:
+        with tracer.span("search") as child:
+            assert child is NOOP_SPAN
+        assert root is NOOP_SPAN
+    assert exporter.spans == []
+    assert current_span() is NOOP_SPAN
+
+def test_disabled_tracer_yields_the_noop_span():
+    with Tracer(None).span("turn") as span:
+        span.set_attribute("ignored", 1)
+        assert span is NOOP_SPAN and current_trace_id() is None
+
+def test_exception_marks_the_span_as_failed_and_propagates():
+    exporter = ListSpanExporter()
+    with pytest.raises(ValueError):
+        with Tracer(exporter).span("turn"):
+            raise ValueError("boom")
+
+    span, = exporter.spans
+    assert (span.status, span.status_message) == (STATUS_ERROR, "boom")
+    assert span.attributes["exception.type"] == "ValueError"
+    assert span.to_otlp()["status"] == {"code": STATUS_ERROR, "message": "boom"}
+
+def test_otlp_request_shape():
+    exporter = ListSpanExporter()
+    tracer = Tracer(exporter)
+    with tracer.span("turn", flag=True, count=3, ratio=0.5, question="q", empty=None):
+        with tracer.span("search"):
+            pass
+
+    child, root = (span.to_otlp() for span in exporter.spans)
+    assert root["attributes"] == [
+        {"key": "flag", "value": {"boolValue": True}},
+        {"key": "count", "value": {"intValue": "3"}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "question", "value": {"stringValue": "q"}}
+    ]
+    assert "parentSpanId" not in root and child["parentSpanId"] == root["spanId"]
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert int(root["endTimeUnixNano"]) >= int(root["startTimeUnixNano"])
+
+    request = SpanExporter.export_request(exporter.spans)
+    resource_spans, = request["resourceSpans"]
+    assert resource_spans["resource"]["attributes"][0]["key"] == "service.name"
+    assert [span["name"] for span in resource_spans["scopeSpans"][0]["spans"]] == ["search", "turn"]
+
+def test_file_exporter_writes_batches_once_started(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = FileSpanExporter(str(path), flush_interval=0.01)
+    tracer = Tracer(exporter)
+    with tracer.span("turn"):
+        pass
+    assert not path.exists()
+
+    exporter.start()
+    exporter.shutdown()
+    request = json.loads(path.read_text())
+    assert request["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["name"] == "turn"
+    assert exporter.get_metrics() == {"exported": 1, "dropped": 0, "failed_batches": 0, "queued": 0}
+
+def test_exporter_without_write_cannot_be_created():
+    class Incomplete(SpanExporter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
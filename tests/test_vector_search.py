@@ -0,0 +1,125 @@
+from tests.conftest import write_docx
+
+def test_same_file_name_in_two_folders_gets_distinct_points(make_vector_service, tmp_path):
+    from vectordb.indexer import IndexingWorker
+
+    service = make_vector_service()
+    documents = tmp_path / "documents"
+    write_docx(documents / "auraphone" / "FAQs.docx", "AuraPhone FAQs", ["Battery life is two days", "Charging takes an hour"])
+    write_docx(documents / "aurawatch" / "FAQs.docx", "AuraWatch FAQs", ["Battery life is a week", "Charging takes two hours"])
+
+    worker = IndexingWorker(service, state_path=str(tmp_path / "index_state.json"))
+    results = worker.run([str(documents / "auraphone"), str(documents / "aurawatch")])
+
+    assert results["status"] == "success"
+    assert results["points_in_collection"] == 4
+    points, _ = service.qdrant_client.scroll(collection_name=service.config['collection_name'], limit=10)
+    assert sorted(point.payload["source_path"] for point in points) == [
+        "auraphone/FAQs.docx", "auraphone/FAQs.docx", "aurawatch/FAQs.docx", "aurawatch/FAQs.docx"
+    ]
+
+def test_resumed_run_only_replaces_points_of_the_same_path(make_vector_service, tmp_path):
+    from vectordb.indexer import IndexingWorker
+
+    service = make_vector_service()
+    documents = tmp_path / "documents"
+    write_docx(documents / "auraphone" / "FAQs.docx", "AuraPhone FAQs", ["Battery life is two days"])
+    write_docx(documents / "aurawatch" / "FAQs.docx", "AuraWatch FAQs", ["Battery life is a week"])
+    collection_name = service.create_shadow_collection()
+    processor = service.document_processor(str(documents / "auraphone"))
+    service._store_chunks(processor.process_single_file(documents / "auraphone" / "FAQs.docx"), collection_name=collection_name)
+    processor = service.document_processor(str(documents / "aurawatch"))
+    service._store_chunks(processor.process_single_file(documents / "aurawatch" / "FAQs.docx"), collection_name=collection_name)
+
+    worker = IndexingWorker(service, state_path=str(tmp_path / "index_state.json"))
+    worker._delete_file_points(collection_name, documents / "auraphone" / "FAQs.docx")
+
+    points, _ = service.qdrant_client.scroll(collection_name=collection_name, limit=10)
+    assert [point.payload["source_path"] for point in points] == ["aurawatch/FAQs.docx"]
+
+def test_switch_alias_replaces_legacy_collection(make_vector_service, tmp_path):
+    service = make_vector_service()
+    alias_name = service.config['collection_name']
+    service._create_collection(alias_name)
+    write_docx(tmp_path / "documents" / "FAQs.docx", "FAQs", ["Battery life is two days"])
+    result = service.index_documents(str(tmp_path / "documents"), overwrite=True)
+
+    assert result["status"] == "success"
+    assert service.get_alias_target() in service.list_collection_versions()
+    assert service.search("battery life")
+
+def test_search_reprobes_when_the_alias_was_just_missing(make_vector_service, tmp_path):
+    service = make_vector_service()
+    write_docx(tmp_path / "documents" / "FAQs.docx", "FAQs", ["Battery life is two days"])
+    assert service.index_documents(str(tmp_path / "documents"), overwrite=True)["status"] == "success"
+    assert service.is_ready()
+
+    query_points = service.qdrant_client.query_points
+    calls = []
+
+    def missing_once(*args, **kwargs):
+        calls.append(kwargs.get("collection_name"))
+        if len(calls) == 1:
+            raise ValueError(f"Collection {kwargs.get('collection_name')} not found")
+        return query_points(*args, **kwargs)
+
+    service.qdrant_client.query_points = missing_once
+    assert service.search("battery life")
+    assert len(calls) == 2
+
+def test_search_many_caps_the_fused_results(make_vector_service, tmp_path):
+    service = make_vector_service()
+    write_docx(tmp_path / "documents" / "FAQs.docx", "FAQs", [
+        "Battery life is two days", "Battery charging takes an hour", "Battery replacement costs 50 euros",
+        "Screen repair takes a week", "Screen protectors are sold separately", "Screen brightness adjusts itself"
+    ])
+    assert service.index_documents(str(tmp_path / "documents"), overwrite=True)["status"] == "success"
+
+    queries = ["battery life charging", "screen repair protectors"]
+    assert len(service.search_many(queries, limit=3, score_threshold=0.0)) == 3
+    assert len(service.search_many(queries, limit=3, score_threshold=0.0, total_limit=5)) == 5
+
+def test_faq_index_is_only_replaced_after_a_successful_promotion(make_vector_service, tmp_path, monkeypatch):
+    from vectordb.indexer import IndexingWorker
+
+    service = make_vector_service()
+    write_docx(tmp_path / "documents" / "FAQs.docx", "FAQs", ["Q: How long does the battery last?\nA: Two days."])
+    worker = IndexingWorker(service, state_path=str(tmp_path / "index_state.json"))
+
+    monkeypatch.setattr(service, "verify_collection", lambda collection_name, expected_points=None: False)
+    assert worker.run([str(tmp_path / "documents")], resume=False)["status"] == "failed"
+    assert not (tmp_path / "faq_index.npz").exists()
+
+    monkeypatch.undo()
+    assert worker.run([str(tmp_path / "documents")], resume=False)["status"] == "success"
+    assert service.match_faq("How long does the battery last?")["answer"] == "Two days."
+    assert service.faq_stats() == {"lookups": 1, "answered": 1, "below_threshold": 0, "questions": 1}
+
+def test_serving_does_not_create_the_indexing_stores(make_vector_service, tmp_path):
+    service = make_vector_service()
+    service.search("battery life")
+    assert not (tmp_path / "text_cache").exists()
+    assert not (tmp_path / "embeddings").exists()
+
+    write_docx(tmp_path / "documents" / "FAQs.docx", "FAQs", ["Battery life is two days"])
+    assert service.index_documents(str(tmp_path / "documents"), overwrite=True)["status"] == "success"
+    assert (tmp_path / "text_cache").exists() and (tmp_path / "embeddings").exists()
+
+def test_failed_verification_drops_the_build_so_the_next_run_starts_over(make_vector_service, tmp_path, monkeypatch):
+    from vectordb.indexer import IndexingWorker
+
+    service = make_vector_service()
+    write_docx(tmp_path / "documents" / "FAQs.docx", "FAQs", ["Battery life is two days"])
+    worker = IndexingWorker(service, state_path=str(tmp_path / "index_state.json"))
+
+    monkeypatch.setattr(service, "verify_collection", lambda collection_name, expected_points=None: False)
+    failed = worker.run([str(tmp_path / "documents")])
+    assert failed["status"] == "failed"
+    assert not service.collection_exists(failed["collection_name"])
+    assert "checkpoint" not in worker.load_state()
+
+    monkeypatch.undo()
+    result = worker.run([str(tmp_path / "documents")])
+    assert result["status"] == "success"
+    assert not result["resumed"]
+    assert result["points_in_collection"] == 1
@@ -0,0 +1,176 @@
+import json
+import pytest
+from database.write_behind import WriteBehindQueue
+from tests.conftest import wait_for
+
+# In-memory stand-in for MessageDAO.write_batch: applies session updates in call order and can be made
+# unreachable, or to reject any batch containing a given message id
+class FakeMessageDAO:
+    def __init__(self):
+        self.down = False
+        self.poison_ids = set()
+        self.messages = []
+        self.conversations = {}
+        self.updates = []
+
+    def ping(self) -> bool:
+        if self.down:
+            raise ConnectionError("database unreachable")
+        return True
+
+    def write_batch(self, messages, session_updates) -> int:
+        self.ping()
+        for message in messages:
+            if message['id'] in self.poison_ids:
+                raise ValueError(f"invalid input in message {message['id']}")
+        self.messages.extend(message['id'] for message in messages)
+        for update in session_updates:
+            self.conversations[update['session_id']] = update['conversation_data']
+            self.updates.append((update['session_id'], update['conversation_data']))
+        return len(messages)
+
+def message(message_id: str, session_id: str = "s1", count: int = 1):
+    return {"id": message_id, "session_id": session_id, "message_count": count, "question": "q", "answer": "a", "timestamp": "2026-01-01T00:00:00"}
+
+# What the writer thread does, without waiting for its idle replay interval
+def drive(write_behind, rounds: int = 5):
+    for _ in range(rounds):
+        write_behind._replay_spill()
+        batch = write_behind._divert_spilled_sessions(write_behind._drain(limit=None))
+        unwritten = write_behind._flush_with_retry(batch) if batch else []
+        if unwritten:
+            write_behind._spill(unwritten)
+
+@pytest.fixture
+def dao():
+    return FakeMessageDAO()
+
+@pytest.fixture
+def make_queue(dao, tmp_path):
+    queues = []
+
+    def make(**settings):
+        settings = dict(dict(flush_interval=0.01, max_retries=1, spill_path=str(tmp_path / "spill.jsonl")), **settings)
+        write_behind = WriteBehindQueue(dao, **settings)
+        queues.append(write_behind)
+        return write_behind
+    yield make
+    for write_behind in queues:
+        write_behind.stop(timeout=1)
+
+def test_flushes_messages_and_merges_session_updates(dao, make_queue):
+    write_behind = make_queue()
+    write_behind.start()
+    write_behind.enqueue_message(message("m1"))
+    write_behind.enqueue_session_update("s1", conversation_data=[1])
+    wait_for(lambda: dao.messages == ["m1"] and dao.conversations.get("s1") == [1])
+    wait_for(lambda: write_behind.pending_messages("s1") == [])
+
+def test_session_update_after_an_overflow_spill_is_not_applied_before_it(dao, make_queue):
+    write_behind = make_queue(max_queue_size=1)
+    write_behind.enqueue_session_update("s1", conversation_data=[1])
+    # Queue full: spilled
+    write_behind.enqueue_session_update("s1", conversation_data=[1, 2])
+    write_behind._flush(write_behind._drain(limit=None))
+    # The queue has room again, but an older update of s1 is still on disk
+    write_behind.enqueue_session_update("s1", conversation_data=[1, 2, 3])
+    assert write_behind.queue.empty()
+
+    drive(write_behind)
+    # The two spilled updates are replayed in one batch, merged in order
+    assert dao.updates == [("s1", [1]), ("s1", [1, 2, 3])]
+    assert write_behind.get_metrics()["spilled_sessions"] == 0
+
+def test_items_queued_behind_a_failed_batch_are_spilled_after_it(dao, make_queue):
+    write_behind = make_queue()
+    dao.down = True
+    write_behind.enqueue_session_update("s1", conversation_data=[1])
+    write_behind._spill(write_behind._flush_with_retry(write_behind._drain(limit=None)))
+    assert write_behind.get_metrics()["spilled"] == 1
+
+    # Queued by a request thread racing the failed flush
+    write_behind.queue.put_nowait({"type": "session", "data": {"session_id": "s1", "conversation_data": [1, 2], "end_timestamp": None, "metadata": None}})
+    write_behind.enqueue_session_update("s2", conversation_data=["other"])
+    assert write_behind._divert_spilled_sessions(write_behind._drain(limit=None))[0]["data"]["session_id"] == "s2"
+
+    dao.down = False
+    drive(write_behind)
+    assert [update for update in dao.updates if update[0] == "s1"] == [("s1", [1, 2])]
+
+def test_spilled_sessions_survive_a_restart(dao, make_queue, tmp_path):
+    first = make_queue(max_queue_size=1)
+    first.enqueue_session_update("s1", conversation_data=[1])
+    first.enqueue_session_update("s1", conversation_data=[1, 2])
+    first.stop()
+
+    # A new process enqueues for s1 before the spill file is replayed
+    second = make_queue()
+    second.enqueue_session_update("s1", conversation_data=[1, 2, 3])
+    assert second.queue.empty()
+    drive(second)
+    assert dao.conversations["s1"] == [1, 2, 3]
+
+def test_rejected_item_is_dead_lettered_and_the_rest_of_the_batch_written(dao, make_queue, tmp_path):
+    write_behind = make_queue()
+    dao.poison_ids.add("bad")
+    for message_id in ("m1", "bad", "m2"):
+        write_behind.enqueue_message(message(message_id))
+    write_behind.start()
+
+    wait_for(lambda: write_behind.get_metrics()["dead_lettered"] == 1)
+    assert dao.messages == ["m1", "m2"]
+    assert not (tmp_path / "spill.jsonl").exists()
+    with open(tmp_path / "spill.dead.jsonl") as f:
+        dead = [json.loads(line) for line in f]
+    assert [item["data"]["id"] for item in dead] == ["bad"]
+    assert "invalid input" in dead[0]["error"]
+    assert write_behind.pending_messages("s1") == []
+
+def test_unreachable_database_spills_instead_of_dead_lettering(dao, make_queue, tmp_path):
+    write_behind = make_queue()
+    dao.down = True
+    write_behind.enqueue_message(message("m1"))
+    write_behind.enqueue_message(message("m2", session_id="s2"))
+    write_behind._spill(write_behind._flush_with_retry(write_behind._drain(limit=None)))
+
+    metrics = write_behind.get_metrics()
+    assert metrics["dead_lettered"] == 0
+    assert metrics["spilled"] == 2
+    assert metrics["spilled_sessions"] == 2
+    assert not (tmp_path / "spill.dead.jsonl").exists()
+    # Still readable by the process while waiting on disk
+    assert [pending["id"] for pending in write_behind.pending_messages("s1")] == ["m1"]
+
+    dao.down = False
+    write_behind.start()
+    wait_for(lambda: sorted(dao.messages) == ["m1", "m2"])
+    assert write_behind.get_metrics()["spilled_sessions"] == 0
+
+def test_replay_that_fails_midway_keeps_unwritten_items_ahead_of_newer_spills(dao, make_queue, tmp_path):
+    write_behind = make_queue(batch_size=1)
+    dao.down = True
+    for version in ([1], [1, 2]):
+        write_behind.enqueue_session_update("s1", conversation_data=version)
+    write_behind._spill(write_behind._drain(limit=None))
+
+    dao.down = False
+    write_batch = dao.write_batch
+
+    # The database goes away after the first replayed batch, while a request adds a newer update
+    def fail_after_first(messages, session_updates):
+        result = write_batch(messages, session_updates)
+        dao.down = True
+        write_behind.enqueue_session_update("s1", conversation_data=[1, 2, 3])
+        return result
+    dao.write_batch = fail_after_first
+    write_behind._replay_spill()
+
+    with open(tmp_path / "spill.jsonl") as f:
+        assert [json.loads(line)["data"]["conversation_data"] for line in f] == [[1, 2], [1, 2, 3]]
+    assert write_behind.get_metrics()["spilled_sessions"] == 1
+    assert not (tmp_path / "spill.jsonl.replaying").exists()
+
+    dao.write_batch = write_batch
+    dao.down = False
+    drive(write_behind)
+    assert [update for _, update in dao.updates] == [[1], [1, 2], [1, 2, 3]]
@@ -0,0 +1,324 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import argparse
+import inspect
+import logging
+import threading
+import contextvars
+import urllib.request
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# none (default, spans cost one attribute check), file or otlp
+TRACE_EXPORTER = os.getenv('TRACE_EXPORTER', 'none').lower()
+# OTLP/JSON export requests, one per line: what the OpenTelemetry Collector's otlpjsonfile receiver reads
+TRACE_FILE = os.getenv('TRACE_FILE', './traces.jsonl')
+TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'rag-chatbot')
+# Fraction of root spans (turns, joins, write-behind flushes) traced; their children follow the decision
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '1.0'))
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+class Span:
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'start_ns', 'end_ns', 'status', 'status_message')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = STATUS_OK
+        self.status_message = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = str(error)
+        self.attributes['exception.type'] = type(error).__name__
+
+    @staticmethod
+    def _otlp_value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": self._otlp_value(value)} for key, value in self.attributes.items() if value is not None],
+            "status": {"code": self.status}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+# Stands in for spans that are not recorded (tracing off, or the trace was not sampled)
+class _NoopSpan:
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+# Batches finished spans on a background thread, started by start(), so the request path never waits
+# on the export. Spans arriving while the buffer is full are dropped and counted.
+class SpanExporter(ABC):
+    def __init__(self, max_queue_size: int = 10000, batch_size: int = 512, flush_interval: float = 1.0):
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._metrics = {"exported": 0, "dropped": 0, "failed_batches": 0}
+
+    def start(self) -> "SpanExporter":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def export(self, span: Span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self._metrics["dropped"] += 1
+
+    def _run(self):
+        while not self._stop_event.is_set() or not self.queue.empty():
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write(self.export_request(batch))
+                self._metrics["exported"] += len(batch)
+            except Exception as e:
+                self._metrics["failed_batches"] += 1
+                logger.warning(f"Failed to export {len(batch)} spans: {e}")
+
+    @staticmethod
+    def export_request(spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": "rag-chatbot.tracing"}, "spans": [span.to_otlp() for span in spans]}]
+            }]
+        }
+
+    @abstractmethod
+    def write(self, request: Dict[str, Any]):
+        pass
+
+    def shutdown(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def get_metrics(self) -> Dict[str, int]:
+        return dict(self._metrics, queued=self.queue.qsize())
+
+class FileSpanExporter(SpanExporter):
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def write(self, request: Dict[str, Any]):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(request) + "\n")
+
+# OTLP/HTTP with JSON encoding, e.g. to a local OpenTelemetry Collector or Jaeger on port 4318
+class OTLPHttpSpanExporter(SpanExporter):
+    def __init__(self, endpoint: str, timeout: float = 5.0, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def write(self, request: Dict[str, Any]):
+        http_request = urllib.request.Request(
+            self.endpoint, data=json.dumps(request).encode('utf-8'), headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(http_request, timeout=self.timeout) as response:
+            response.read()
+
+def create_exporter(name: str = TRACE_EXPORTER) -> Optional[SpanExporter]:
+    if name == 'none':
+        return None
+    if name == 'file':
+        logger.info(f"Writing trace spans to {TRACE_FILE}")
+        return FileSpanExporter(TRACE_FILE).start()
+    if name == 'otlp':
+        logger.info(f"Exporting trace spans to {TRACE_OTLP_ENDPOINT}")
+        return OTLPHttpSpanExporter(TRACE_OTLP_ENDPOINT).start()
+    raise ValueError(f"Unknown TRACE_EXPORTER: {name}")
+
+# The span the current thread (or task) is in; threads started elsewhere begin with none
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+def current_trace_id() -> Optional[str]:
+    return current_span().trace_id
+
+# OpenTelemetry-style spans without the SDK: nested spans share the trace of the outermost one
+class Tracer:
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        if parent is NOOP_SPAN or (parent is None and random.random() >= self.sample_rate):
+            # Unsampled trace: mark the context so children are not recorded as new roots
+            token = _current_span.set(NOOP_SPAN)
+            try:
+                yield NOOP_SPAN
+            finally:
+                _current_span.reset(token)
+            return
+
+        span = Span(name, parent.trace_id if parent else os.urandom(16).hex(), parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            self.exporter.export(span)
+
+    def shutdown(self):
+        if self.exporter:
+            self.exporter.shutdown()
+
+# Global tracer instance, configured from the environment
+tracer = Tracer(create_exporter(), TRACE_SAMPLE_RATE)
+
+# Function decorator: one span per call, named after the function unless given a name
+def traced(name: str = None):
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if tracer.exporter is None:
+                return fn(*args, **kwargs)
+            with tracer.span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Class decorator: spans named "<prefix>.<method>" around the public methods the class defines
+def trace_methods(prefix: str):
+    def decorator(cls):
+        for attribute, value in list(vars(cls).items()):
+            if inspect.isfunction(value) and not attribute.startswith('_'):
+                setattr(cls, attribute, traced(f"{prefix}.{attribute}")(value))
+        return cls
+    return decorator
+
+def _load_spans(path: str) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                for resource_spans in json.loads(line)["resourceSpans"]:
+                    for scope_spans in resource_spans["scopeSpans"]:
+                        spans.extend(scope_spans["spans"])
+    return spans
+
+def _duration_ms(span: Dict[str, Any]) -> float:
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+def _print_tree(span: Dict[str, Any], children: Dict[str, List[Dict[str, Any]]], trace_start: int, depth: int = 0):
+    offset_ms = (int(span["startTimeUnixNano"]) - trace_start) / 1e6
+    attributes = ", ".join(f"{item['key']}={next(iter(item['value'].values()))}" for item in span.get("attributes", []))
+    error = " ERROR" if span.get("status", {}).get("code") == STATUS_ERROR else ""
+    print(f"{offset_ms:>9.1f}ms {_duration_ms(span):>9.1f}ms  {'  ' * depth}{span['name']}{error}" + (f"  [{attributes}]" if attributes else ""))
+    for child in sorted(children.get(span["spanId"], []), key=lambda child: int(child["startTimeUnixNano"])):
+        _print_tree(child, children, trace_start, depth + 1)
+
+# Dissect traces from a TRACE_FILE: the slowest turns, or one trace by the id kept in messages.metadata
+# python tracing.py --file traces.jsonl --slowest 5
+# python tracing.py --file traces.jsonl --trace <trace_id>
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Print span trees from a trace file")
+    parser.add_argument("--file", default=TRACE_FILE)
+    parser.add_argument("--trace", default=None, help="Trace id to print")
+    parser.add_argument("--slowest", type=int, default=5, help="Print the N slowest root spans")
+    parser.add_argument("--root", default="socketio.user_message", help="Root span name ranked by --slowest")
+    args = parser.parse_args(argv)
+
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    for span in _load_spans(args.file):
+        traces.setdefault(span["traceId"], []).append(span)
+
+    if args.trace:
+        selected = [args.trace] if args.trace in traces else []
+    else:
+        roots = [span for spans in traces.values() for span in spans if "parentSpanId" not in span and span["name"] == args.root]
+        selected = [span["traceId"] for span in sorted(roots, key=_duration_ms, reverse=True)[:args.slowest]]
+    if not selected:
+        print("No matching traces", file=sys.stderr)
+        return 1
+
+    for trace_id in selected:
+        spans = traces[trace_id]
+        children: Dict[str, List[Dict[str, Any]]] = {}
+        for span in spans:
+            children.setdefault(span.get("parentSpanId"), []).append(span)
+        trace_start = min(int(span["startTimeUnixNano"]) for span in spans)
+        print(f"trace {trace_id}")
+        for root in sorted(children.get(None, []), key=lambda span: int(span["startTimeUnixNano"])):
+            _print_tree(root, children, trace_start)
+        print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import sys
+import json
+import argparse
+import logging
+from .qdrant_vector_db import VectorSearchService, CONFIG_FILE
+from .indexer import IndexingWorker
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m vectordb", description="Document indexing for the RAG chatbot vector database")
+    parser.add_argument("--config", default=CONFIG_FILE, help="Path to the vector service config file")
+    parser.add_argument("--state", default=None, help="Path to the checkpoint/state file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("index", help="Build a new index from files or folders and switch the alias to it")
+    index_parser.add_argument("paths", nargs="*", help="Files or folders to index (default: default_documents_folder)")
+    index_parser.add_argument("--fresh", action="store_true", help="Ignore the checkpoint of an interrupted run")
+
+    watch_parser = subparsers.add_parser("watch", help="Run as a worker that re-indexes when the documents folder changes")
+    watch_parser.add_argument("folder", nargs="?", help="Folder to watch (default: default_documents_folder)")
+    watch_parser.add_argument("--interval", type=float, default=10.0, help="Polling interval in seconds")
+
+    subparsers.add_parser("status", help="Show the alias target and any interrupted build")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    service = VectorSearchService(args.config)
+    worker = IndexingWorker(service, state_path=args.state)
+
+    if args.command == "index":
+        paths = args.paths or [service.config['default_documents_folder']]
+        result = worker.run(paths, resume=not args.fresh)
+        print(json.dumps(result, indent=2))
+        return 0 if result["status"] in ("success", "no_documents") else 1
+
+    if args.command == "watch":
+        try:
+            worker.watch(args.folder or service.config['default_documents_folder'], interval=args.interval)
+        except KeyboardInterrupt:
+            logger.info("Watcher stopped")
+        return 0
+
+    state = worker.load_state()
+    print(json.dumps({
+        "alias": service.config['collection_name'],
+        "alias_target": service.get_alias_target(),
+        "last_indexed": state.get('last_indexed'),
+        "interrupted_build": state.get('checkpoint')
+    }, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import sys
+import json
+import time
+import argparse
+import logging
+import numpy as np
+from qdrant_client.models import Distance, VectorParams, PayloadSchemaType
+from bench_utils import summarise_latencies, time_calls, format_row
+from ..qdrant_vector_db import VectorSearchService, CONFIG_FILE, create_vector_client
+from ..doc_metadata import PRODUCT_KEYWORDS, GENERAL_PRODUCT
+from .transport import make_points
+
+# Upsert throughput and search latency of the vector store backends at several collection sizes:
+# the Qdrant server from config.json (skipped when unreachable), Qdrant's embedded local mode
+# and the in-process NumPy store. Random vectors of the production embedding size; filtered
+# searches restrict to one product line plus general documents, as semantic_search does.
+# python -m vectordb.benchmarks.backends --sizes 10000,1000000
+BENCH_COLLECTION = "bench_backends"
+
+def bench_backend(config, backend: str, points: int, batch_size: int, queries: int, dim: int, limit: int):
+    client = create_vector_client(dict(config, vector_backend=backend))
+    rng = np.random.default_rng(42)
+
+    if client.collection_exists(BENCH_COLLECTION):
+        client.delete_collection(BENCH_COLLECTION)
+    client.create_collection(collection_name=BENCH_COLLECTION, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+    client.create_payload_index(collection_name=BENCH_COLLECTION, field_name="product", field_schema=PayloadSchemaType.KEYWORD)
+    products = list(PRODUCT_KEYWORDS)
+
+    try:
+        # Batches are generated as we go (a million points do not fit up front); only upserts are timed
+        upsert_seconds = 0.0
+        for offset in range(0, points, batch_size):
+            batch = make_points(min(batch_size, points - offset), dim, offset, rng)
+            # Documents of 1000 chunks, mostly product guides with one in ten general, as the corpus grows
+            for point in batch:
+                document = point.id // 1000
+                point.payload["product"] = GENERAL_PRODUCT if document % 10 == 0 else products[document % len(products)]
+            start = time.perf_counter()
+            client.upsert(collection_name=BENCH_COLLECTION, points=batch, wait=True)
+            upsert_seconds += time.perf_counter() - start
+
+        query_vectors = rng.standard_normal((64, dim), dtype=np.float32).tolist()
+        counter = {"i": 0}
+
+        def search():
+            counter["i"] += 1
+            client.query_points(collection_name=BENCH_COLLECTION, query=query_vectors[counter["i"] % 64], limit=limit, with_payload=True)
+
+        def filtered_search():
+            counter["i"] += 1
+            query_filter = VectorSearchService.build_filter({"product": [products[0], GENERAL_PRODUCT]})
+            client.query_points(collection_name=BENCH_COLLECTION, query=query_vectors[counter["i"] % 64], query_filter=query_filter, limit=limit, with_payload=True)
+
+        search_stats = summarise_latencies(time_calls(search, queries))
+        filtered_stats = summarise_latencies(time_calls(filtered_search, queries))
+    finally:
+        client.delete_collection(BENCH_COLLECTION)
+        client.close()
+
+    return {
+        "upsert_points_per_second": points / upsert_seconds,
+        "search": search_stats,
+        "filtered_search": filtered_stats
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare vector store backends for upsert throughput and search latency")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--sizes", default="10000,1000000", help="Comma-separated collection sizes")
+    parser.add_argument("--backends", default="qdrant,qdrant_local,numpy")
+    parser.add_argument("--local-path", default=":memory:", help="Storage for the local backends (default: in memory)")
+    parser.add_argument("--qdrant-local-max", type=int, default=100000, help="Skip embedded Qdrant above this size")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384, help="Vector size (all-MiniLM-L6-v2 produces 384)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    config = dict(VectorSearchService._load_config(args.config), local_vector_path=args.local_path)
+
+    results = {"dim": args.dim, "limit": args.limit, "sizes": {}}
+    for size in (int(size) for size in args.sizes.split(",")):
+        results["sizes"][size] = {}
+        for backend in args.backends.split(","):
+            if backend == "qdrant_local" and size > args.qdrant_local_max:
+                results["sizes"][size][backend] = {"skipped": f"above --qdrant-local-max ({args.qdrant_local_max})"}
+                continue
+            try:
+                results["sizes"][size][backend] = bench_backend(config, backend, size, args.batch_size, args.queries, args.dim, args.limit)
+            except Exception as e:
+                # Typically the Qdrant server not running
+                results["sizes"][size][backend] = {"skipped": f"{type(e).__name__}: {str(e).splitlines()[0][:120]}"}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for size, backends in results["sizes"].items():
+            print(f"{size:,} points")
+            for backend, result in backends.items():
+                if "skipped" in result:
+                    print(f"  {backend:<13} skipped: {result['skipped']}")
+                    continue
+                print(f"  {backend:<13} upsert: {result['upsert_points_per_second']:10.0f} points/s")
+                print(format_row(f"  {backend} search", result['search']))
+                print(format_row(f"  {backend} filtered", result['filtered_search']))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import sys
+import json
+import argparse
+import logging
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from ..chunk_docs import DocumentProcessor
+from ..faq_index import FAQIndex, extract_faq_pairs
+from ..text_cache import TextCache
+from ..qdrant_vector_db import VectorSearchService, CONFIG_FILE
+
+# Sweeps faq_match_threshold over paraphrased FAQ questions (should be answered) and
+# non-FAQ questions (should fall through to the LLM). Runs from the documents folder, no Qdrant needed.
+OFF_TOPIC_QUERIES = [
+    "What's the weather like today?",
+    "Who won the football last night?",
+    "Write me a poem about the sea",
+    "What is Apple's iPhone X price?",
+    "How do I bake sourdough bread?"
+]
+
+def question_variants(question: str):
+    base = question.rstrip('?').strip()
+    words = base.split()
+    return [
+        question.lower().rstrip('?'),
+        base.replace("AuraTech ", "").replace("AuraTech's ", "") + "?",
+        f"Hi, quick question: {base}?",
+        " ".join(words[:max(3, int(len(words) * 0.7))])
+    ]
+
+def non_faq_queries(processor: DocumentProcessor, faq_files: set):
+    queries = list(OFF_TOPIC_QUERIES)
+    for chunk in processor.process_all_documents():
+        if chunk.file_name in faq_files:
+            continue
+        # First line of a guide chunk is usually its heading, a realistic support question
+        heading = chunk.chunk_content.strip().split('\n')[0].strip()
+        if 3 <= len(heading.split()) <= 15:
+            queries.append(f"How do I fix: {heading}")
+    return queries
+
+def load_labelled_queries(path: str):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tune faq_match_threshold for the FAQ answer index")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--documents", default=None, help="Documents folder (default: default_documents_folder)")
+    parser.add_argument("--queries", default=None, help='Optional JSONL of {"query": ..., "faq": <FAQ question or null>}')
+    parser.add_argument("--thresholds", default="0.5,0.55,0.6,0.65,0.7,0.75,0.8,0.85,0.9,0.95")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    config = VectorSearchService._load_config(args.config)
+    text_cache = TextCache(config['text_cache_dir'], config['text_cache_max_mb'] * 1024 * 1024)
+    processor = DocumentProcessor(args.documents or config['default_documents_folder'], text_cache=text_cache)
+    payloads = processor.export_chunks_to_dict(processor.process_all_documents())
+    pairs = extract_faq_pairs(payloads)
+    if not pairs:
+        print("No Q:/A: pairs found in the documents", file=sys.stderr)
+        return 1
+
+    model = SentenceTransformer(config['embedding_model'])
+    faq_index = FAQIndex.build(pairs, model)
+
+    # Labelled set: (query, index of the FAQ that should answer it, or None)
+    if args.queries:
+        question_to_index = {pair['question']: i for i, pair in enumerate(pairs)}
+        labelled = [(item['query'], question_to_index.get(item['faq'])) for item in load_labelled_queries(args.queries)]
+    else:
+        labelled = [(variant, i) for i, pair in enumerate(pairs) for variant in question_variants(pair['question'])]
+        labelled += [(query, None) for query in non_faq_queries(processor, {pair['file_name'] for pair in pairs})]
+
+    # Score everything once, then sweep thresholds over the best match per query
+    query_vectors = model.encode([query for query, _ in labelled], batch_size=64)
+    scores = np.stack([faq_index.scores(vector) for vector in query_vectors])
+    best = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(labelled)), best]
+    expected = [label for _, label in labelled]
+
+    positives = sum(1 for label in expected if label is not None)
+    rows = []
+    for threshold in (float(t) for t in args.thresholds.split(',')):
+        accepted = best_scores >= threshold
+        correct = sum(1 for i, label in enumerate(expected) if accepted[i] and label == best[i])
+        wrong_faq = sum(1 for i, label in enumerate(expected) if accepted[i] and label is not None and label != best[i])
+        false_accepts = sum(1 for i, label in enumerate(expected) if accepted[i] and label is None)
+        total_accepted = int(accepted.sum())
+        rows.append({
+            "threshold": threshold,
+            "absorbed_fraction": total_accepted / len(labelled),
+            "precision": correct / total_accepted if total_accepted else 1.0,
+            "recall": correct / positives if positives else 0.0,
+            "wrong_faq": wrong_faq,
+            "false_accepts": false_accepts
+        })
+
+    results = {"faq_questions": len(pairs), "queries": len(labelled), "positives": positives, "sweep": rows}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{len(pairs)} FAQ questions, {len(labelled)} queries ({positives} should be answered from the FAQ)")
+        print(f"{'threshold':>9} {'absorbed':>9} {'precision':>9} {'recall':>7} {'wrong':>6} {'false+':>6}")
+        for row in rows:
+            print(f"{row['threshold']:>9.2f} {row['absorbed_fraction']:>9.1%} {row['precision']:>9.1%} {row['recall']:>7.1%} {row['wrong_faq']:>6} {row['false_accepts']:>6}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
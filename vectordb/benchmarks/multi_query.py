@@ -0,0 +1,91 @@
+import sys
+import json
+import argparse
+import logging
+import numpy as np
+from qdrant_client.models import Distance, VectorParams, QueryRequest
+from bench_utils import summarise_latencies, time_calls, format_row
+from ..qdrant_vector_db import VectorSearchService, CONFIG_FILE, create_vector_client
+from .transport import make_points
+
+# Latency of answering a question of N sub-queries: one search, N searches one after another,
+# and the N searches sent as one query_batch_points request (what search_many does).
+# python -m vectordb.benchmarks.multi_query --points 200000 --backends numpy
+BENCH_COLLECTION = "bench_multi_query"
+
+def bench_backend(config, backend: str, points: int, sub_queries: int, queries: int, dim: int, limit: int):
+    client = create_vector_client(dict(config, vector_backend=backend))
+    rng = np.random.default_rng(42)
+
+    if client.collection_exists(BENCH_COLLECTION):
+        client.delete_collection(BENCH_COLLECTION)
+    client.create_collection(collection_name=BENCH_COLLECTION, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+
+    try:
+        for offset in range(0, points, 1024):
+            client.upsert(collection_name=BENCH_COLLECTION, points=make_points(min(1024, points - offset), dim, offset, rng), wait=True)
+
+        query_vectors = rng.standard_normal((64, dim), dtype=np.float32).tolist()
+        counter = {"i": 0}
+
+        def next_queries(n: int):
+            counter["i"] += 1
+            return [query_vectors[(counter["i"] + j) % 64] for j in range(n)]
+
+        def single():
+            client.query_points(collection_name=BENCH_COLLECTION, query=next_queries(1)[0], limit=limit, with_payload=True)
+
+        def sequential():
+            for query in next_queries(sub_queries):
+                client.query_points(collection_name=BENCH_COLLECTION, query=query, limit=limit, with_payload=True)
+
+        def batched():
+            requests = [QueryRequest(query=query, limit=limit, with_payload=True) for query in next_queries(sub_queries)]
+            client.query_batch_points(collection_name=BENCH_COLLECTION, requests=requests)
+
+        return {
+            "single": summarise_latencies(time_calls(single, queries)),
+            "sequential": summarise_latencies(time_calls(sequential, queries)),
+            "batched": summarise_latencies(time_calls(batched, queries))
+        }
+    finally:
+        client.delete_collection(BENCH_COLLECTION)
+        client.close()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare sequential and batched search for multi-query questions")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--points", type=int, default=200000)
+    parser.add_argument("--sub-queries", type=int, default=3)
+    parser.add_argument("--backends", default="qdrant,numpy")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384, help="Vector size (all-MiniLM-L6-v2 produces 384)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    config = dict(VectorSearchService._load_config(args.config), local_vector_path=":memory:")
+
+    results = {"points": args.points, "sub_queries": args.sub_queries, "backends": {}}
+    for backend in args.backends.split(","):
+        try:
+            results["backends"][backend] = bench_backend(config, backend, args.points, args.sub_queries, args.queries, args.dim, args.limit)
+        except Exception as e:
+            # Typically the Qdrant server not running
+            results["backends"][backend] = {"skipped": f"{type(e).__name__}: {str(e).splitlines()[0][:120]}"}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.points:,} points, {args.sub_queries} sub-queries")
+        for backend, result in results["backends"].items():
+            if "skipped" in result:
+                print(f"  {backend:<13} skipped: {result['skipped']}")
+                continue
+            for mode in ("single", "sequential", "batched"):
+                print(format_row(f"  {backend} {mode}", result[mode]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
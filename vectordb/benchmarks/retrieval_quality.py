@@ -0,0 +1,284 @@
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+from bench_utils import summarise_latencies, format_row
+from ..chunk_docs import DocumentProcessor
+from ..qdrant_vector_db import VectorSearchService, CONFIG_FILE
+from .faq_threshold import question_variants
+
+# Retrieval quality and cost of VectorSearchService.search across configurations, so changes to
+# chunking, the embedding model, limit, score_threshold or the vector backend are measured instead of
+# made blind. Each (backend, model) pair gets a cold index of the documents folder in a scratch
+# directory (fresh text cache and embedding store, collection BENCH_COLLECTION on a Qdrant server).
+# Every limit/threshold combination is then searched with a labelled query set.
+# Labels are chunk-agnostic: a result is relevant when it comes from the query's file and contains its
+# evidence text. So recall stays comparable when chunk boundaries move. Queries are generated from
+# the documents (FAQ questions, section headings, passage fragments) unless --queries gives a JSONL set.
+# python -m vectordb.benchmarks.retrieval_quality --backends numpy,qdrant_local --output run.json
+# python -m vectordb.benchmarks.retrieval_quality --baseline run.json   (exits 1 on a regression)
+BENCH_COLLECTION = "bench_retrieval"
+
+# Recall is reported at each of these cut-offs that fits within the search limit
+RECALL_AT = (1, 3, 5)
+
+# Words taken from a body sentence for a passage query
+PASSAGE_QUERY_WORDS = 10
+
+def normalise(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+def sentences(text: str):
+    return [sentence.strip() for sentence in re.split(r"(?<=[.!?])\s+|\n+", text) if sentence.strip()]
+
+# Labelled queries from the chunks: {"query", "kind", "file_name", "evidence"}
+def generate_queries(chunks):
+    labelled = []
+    for chunk in chunks:
+        lines = [line.strip() for line in chunk.chunk_content.split('\n') if line.strip()]
+        if not lines:
+            continue
+
+        questions = [line[2:].strip() for line in lines if line.startswith("Q:")]
+        for question in questions:
+            labelled.append({"query": question, "kind": "faq", "file_name": chunk.file_name, "evidence": question})
+            # The shortened variant, a harder match for the same answer
+            labelled.append({"query": question_variants(question)[3], "kind": "faq_partial", "file_name": chunk.file_name, "evidence": question})
+
+        heading = lines[0]
+        if not questions and 2 <= len(heading.split()) <= 15:
+            labelled.append({"query": heading, "kind": "heading", "file_name": chunk.file_name, "evidence": heading})
+
+        # A fragment of the longest body sentence stands in for a user describing the problem
+        body = [sentence for sentence in sentences("\n".join(lines[1:])) if not sentence.startswith(("Q:", "A:"))]
+        if body:
+            fragment = " ".join(max(body, key=len).split()[:PASSAGE_QUERY_WORDS])
+            if len(fragment.split()) >= 5:
+                labelled.append({"query": fragment, "kind": "passage", "file_name": chunk.file_name, "evidence": fragment})
+    return labelled
+
+def load_queries(path: str):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def is_relevant(result, label) -> bool:
+    return result['file_name'] == label['file_name'] and normalise(label['evidence']) in normalise(result['chunk_content'])
+
+def score_run(service: VectorSearchService, labelled, limit: int, threshold: float, repeats: int):
+    latencies, reciprocal_ranks, empty = [], [], 0
+    hits = {k: 0 for k in RECALL_AT if k <= limit}
+    by_kind = {}
+
+    for label in labelled:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            results = service.search(label['query'], limit=limit, score_threshold=threshold)
+            latencies.append(time.perf_counter() - start)
+
+        rank = next((i + 1 for i, result in enumerate(results) if is_relevant(result, label)), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        empty += not results
+        for k in hits:
+            hits[k] += bool(rank and rank <= k)
+        kind = by_kind.setdefault(label['kind'], {"queries": 0, "found": 0})
+        kind["queries"] += 1
+        kind["found"] += bool(rank)
+
+    count = len(labelled)
+    return {
+        "limit": limit,
+        "score_threshold": threshold,
+        "recall": {f"@{k}": hits[k] / count for k in hits},
+        "mrr": sum(reciprocal_ranks) / count,
+        "empty_fraction": empty / count,
+        "recall_by_kind": {kind: stats["found"] / stats["queries"] for kind, stats in by_kind.items()},
+        "search_latency": summarise_latencies(latencies)
+    }
+
+def directory_bytes(path: Path) -> int:
+    return sum(entry.stat().st_size for entry in path.rglob('*') if entry.is_file())
+
+# Vector and payload bytes held by the served collection, plus on-disk size for local backends
+def collection_memory(service: VectorSearchService, workdir: Path):
+    client = service.qdrant_client
+    collection_name = service.get_alias_target() or service.config['collection_name']
+    dim = len(service.embedding_model.encode(["sample text"])[0])
+
+    payload_bytes, points, offset = 0, 0, None
+    while True:
+        records, offset = client.scroll(collection_name=collection_name, limit=256, offset=offset, with_payload=True)
+        points += len(records)
+        payload_bytes += sum(len(json.dumps(record.payload)) for record in records)
+        if offset is None:
+            break
+
+    local = service.config['vector_backend'] != 'qdrant'
+    return {
+        "points": points,
+        "dimension": dim,
+        "vector_bytes": points * dim * 4,
+        "payload_bytes": payload_bytes,
+        "disk_bytes": directory_bytes(workdir / "vectors") if local else None
+    }
+
+# Cold index of the documents with one backend and model; returns the service and build costs
+def build_index(base_config, backend: str, model: str, documents: str, workdir: Path):
+    config = dict(
+        base_config,
+        vector_backend=backend,
+        embedding_model=model,
+        collection_name=BENCH_COLLECTION,
+        local_vector_path=str(workdir / "vectors"),
+        text_cache_dir=str(workdir / "text_cache"),
+        embedding_store_dir=str(workdir / "embeddings"),
+        faq_index_path=str(workdir / "faq_index.npz")
+    )
+    config_path = workdir / "config.json"
+    VectorSearchService._save_config(config, str(config_path))
+
+    start = time.perf_counter()
+    service = VectorSearchService(str(config_path))
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = service.index_documents(documents, overwrite=True)
+    build_seconds = time.perf_counter() - start
+    if result['status'] != 'success':
+        raise RuntimeError(f"Indexing with {backend}/{model} failed: {result['error'] or result['status']}")
+
+    return service, {
+        "model_load_seconds": load_seconds,
+        "index_build_seconds": build_seconds,
+        "chunks": result['total_chunks'],
+        "memory": collection_memory(service, workdir)
+    }
+
+def drop_index(service: VectorSearchService):
+    # Local stores go with the scratch directory; a Qdrant server keeps collections until deleted
+    if service.config['vector_backend'] == 'qdrant':
+        for collection_name in service.list_collection_versions():
+            service.qdrant_client.delete_collection(collection_name)
+    service.qdrant_client.close()
+
+# Regressions of each configuration against the same configuration in a baseline run
+def compare(results, baseline, max_recall_drop: float, max_latency_increase: float):
+    baseline_runs = {run['name']: run for run in baseline['runs']}
+    rows, regressions = [], []
+    for run in results['runs']:
+        before = baseline_runs.get(run['name'])
+        if not before:
+            continue
+        row = {
+            "name": run['name'],
+            "mrr_delta": run['mrr'] - before['mrr'],
+            "recall_delta": {k: run['recall'][k] - before['recall'][k] for k in run['recall'] if k in before['recall']},
+            "p95_latency_ratio": run['search_latency']['p95_ms'] / before['search_latency']['p95_ms'] if before['search_latency']['p95_ms'] else None
+        }
+        rows.append(row)
+        for k, delta in row['recall_delta'].items():
+            if -delta > max_recall_drop:
+                regressions.append(f"{run['name']}: recall{k} {before['recall'][k]:.3f} -> {run['recall'][k]:.3f}")
+        if -row['mrr_delta'] > max_recall_drop:
+            regressions.append(f"{run['name']}: MRR {before['mrr']:.3f} -> {run['mrr']:.3f}")
+        if row['p95_latency_ratio'] and row['p95_latency_ratio'] > 1 + max_latency_increase:
+            regressions.append(f"{run['name']}: p95 search latency x{row['p95_latency_ratio']:.2f}")
+    return rows, regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Recall@k, MRR, search latency, index build time and collection size across retrieval configurations")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--documents", default=None, help="Documents folder (default: default_documents_folder)")
+    parser.add_argument("--queries", default=None, help='Optional JSONL of {"query": ..., "file_name": ..., "evidence": <text the relevant chunk contains>}')
+    parser.add_argument("--write-queries", default=None, help="Write the labelled query set as JSONL (for curating a --queries file) and exit")
+    parser.add_argument("--backends", default="numpy,qdrant_local", help="Comma-separated vector_backend values (qdrant needs a running server)")
+    parser.add_argument("--models", default=None, help="Comma-separated embedding models (default: embedding_model)")
+    parser.add_argument("--limits", default="1,3,5")
+    parser.add_argument("--thresholds", default="0.0,0.2,0.35")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed searches per query")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Override a config.json setting for every run, value parsed as JSON")
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--max-recall-drop", type=float, default=0.02, help="Recall or MRR drop counted as a regression")
+    parser.add_argument("--max-latency-increase", type=float, default=0.25, help="Relative p95 latency increase counted as a regression")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    base_config = VectorSearchService._load_config(args.config)
+    for setting in args.set:
+        key, _, value = setting.partition("=")
+        try:
+            base_config[key] = json.loads(value)
+        except json.JSONDecodeError:
+            base_config[key] = value
+    documents = args.documents or base_config['default_documents_folder']
+
+    if args.queries:
+        labelled = load_queries(args.queries)
+        for label in labelled:
+            label.setdefault("kind", "custom")
+    else:
+        labelled = generate_queries(DocumentProcessor(documents).process_all_documents())
+    if args.write_queries:
+        with open(args.write_queries, 'w') as f:
+            f.writelines(json.dumps(label) + "\n" for label in labelled)
+        print(f"Wrote {len(labelled)} labelled queries to {args.write_queries}")
+        return 0
+
+    models = args.models.split(",") if args.models else [base_config['embedding_model']]
+    limits = [int(limit) for limit in args.limits.split(",")]
+    thresholds = [float(threshold) for threshold in args.thresholds.split(",")]
+    results = {"settings": vars(args), "queries": len(labelled), "builds": [], "runs": []}
+
+    for backend in args.backends.split(","):
+        for model in models:
+            workdir = Path(tempfile.mkdtemp(prefix="retrieval_bench_"))
+            service = None
+            try:
+                service, build = build_index(base_config, backend, model, documents, workdir)
+                results["builds"].append(dict(build, backend=backend, model=model))
+                for limit in limits:
+                    for threshold in thresholds:
+                        run = score_run(service, labelled, limit, threshold, args.repeats)
+                        run.update(name=f"{backend}/{model} limit={limit} threshold={threshold:g}", backend=backend, model=model)
+                        results["runs"].append(run)
+            except Exception as e:
+                print(f"Skipping {backend}/{model}: {e}", file=sys.stderr)
+            finally:
+                if service:
+                    drop_index(service)
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"], regressions = compare(results, json.load(f), args.max_recall_drop, args.max_latency_increase)
+        results["regressions"] = regressions
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{len(labelled)} labelled queries")
+        for build in results["builds"]:
+            memory = build["memory"]
+            disk = f"{memory['disk_bytes'] / 1024:.0f} KiB on disk" if memory['disk_bytes'] is not None else "server-side"
+            print(f"{build['backend']}/{build['model']}: {build['chunks']} chunks, build {build['index_build_seconds']:.2f}s "
+                  f"(model load {build['model_load_seconds']:.2f}s), vectors {memory['vector_bytes'] / 1024:.0f} KiB, "
+                  f"payloads {memory['payload_bytes'] / 1024:.0f} KiB, {disk}")
+        for run in results["runs"]:
+            recall = " ".join(f"R{k}={value:.2f}" for k, value in run["recall"].items())
+            print(format_row(run["name"], run["search_latency"]) + f"  {recall} MRR={run['mrr']:.2f} empty={run['empty_fraction']:.0%}")
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import sys
+import json
+import argparse
+import logging
+from bench_utils import summarise_latencies, time_calls, format_row
+from ..qdrant_vector_db import VectorSearchService, CONFIG_FILE
+
+# Per-turn search path before and after removing the get_collection readiness probe.
+# Requires an indexed collection: python -m vectordb index
+QUERIES = [
+    "AuraPhone battery drains quickly troubleshooting",
+    "AuraLaptop not turning on",
+    "How do I contact AuraTech support",
+    "warranty and repair services",
+    "Bluetooth headphones not pairing"
+]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the search path with and without the per-query get_collection probe")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    service = VectorSearchService(args.config)
+    collection_name = service.config['collection_name']
+    if not service.refresh_readiness():
+        print("Collection is not ready, run `python -m vectordb index` first", file=sys.stderr)
+        return 1
+
+    # Raw Qdrant round trips with a pre-computed vector, isolating network cost from encoding
+    query_vector = service.embedding_model.encode([QUERIES[0]])[0].tolist()
+
+    def probe_then_query():
+        service.qdrant_client.get_collection(collection_name)
+        service.qdrant_client.query_points(collection_name=collection_name, query=query_vector, limit=3, score_threshold=0.2)
+
+    def query_only():
+        service.qdrant_client.query_points(collection_name=collection_name, query=query_vector, limit=3, score_threshold=0.2)
+
+    # Full VectorSearchService.search including encoding, as called once per chat turn
+    turn = {"i": 0}
+
+    def next_query() -> str:
+        turn["i"] += 1
+        return QUERIES[turn["i"] % len(QUERIES)]
+
+    def search_with_probe():
+        service.refresh_readiness()
+        service.search(next_query(), limit=3, score_threshold=0.2)
+
+    def search_cached():
+        service.search(next_query(), limit=3, score_threshold=0.2)
+
+    results = {
+        "collection": service.get_alias_target() or collection_name,
+        "iterations": args.iterations,
+        "raw_probe_then_query": summarise_latencies(time_calls(probe_then_query, args.iterations)),
+        "raw_query_only": summarise_latencies(time_calls(query_only, args.iterations)),
+        "search_with_probe": summarise_latencies(time_calls(search_with_probe, args.iterations)),
+        "search_cached_readiness": summarise_latencies(time_calls(search_cached, args.iterations))
+    }
+    results["saving_per_turn_ms"] = results["search_with_probe"]["mean_ms"] - results["search_cached_readiness"]["mean_ms"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name in ("raw_probe_then_query", "raw_query_only", "search_with_probe", "search_cached_readiness"):
+            print(format_row(name, results[name]))
+        print(f"Mean saving per turn: {results['saving_per_turn_ms']:.2f}ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
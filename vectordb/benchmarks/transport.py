@@ -0,0 +1,94 @@
+import sys
+import json
+import time
+import argparse
+import logging
+import numpy as np
+from qdrant_client.models import Distance, VectorParams, PointStruct
+from bench_utils import summarise_latencies, time_calls, format_row
+from ..qdrant_vector_db import VectorSearchService, CONFIG_FILE, create_qdrant_client
+
+# REST vs gRPC upsert throughput and search latency against the local Qdrant container.
+# Uses random vectors of the production embedding size so no model has to be loaded.
+BENCH_COLLECTION = "bench_transport"
+
+def make_points(count: int, dim: int, offset: int, rng: np.random.Generator):
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    text = "Lorem ipsum troubleshooting step. " * 30
+    return [
+        PointStruct(
+            id=offset + i,
+            vector=vectors[i].tolist(),
+            payload={
+                "file_name": "bench.docx",
+                "document_title": "Benchmark",
+                "chunk_content": text,
+                "chunk_index": offset + i,
+                "content_length": len(text)
+            }
+        )
+        for i in range(count)
+    ]
+
+def bench_transport(config, prefer_grpc: bool, points: int, batch_size: int, queries: int, dim: int):
+    client = create_qdrant_client(config, prefer_grpc=prefer_grpc)
+    collection_name = f"{BENCH_COLLECTION}_{'grpc' if prefer_grpc else 'rest'}"
+    rng = np.random.default_rng(42)
+
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    client.create_collection(collection_name=collection_name, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+
+    try:
+        # Build batches up front so only serialisation and transport are timed
+        batches = [make_points(min(batch_size, points - offset), dim, offset, rng) for offset in range(0, points, batch_size)]
+        start = time.perf_counter()
+        for batch in batches:
+            client.upsert(collection_name=collection_name, points=batch, wait=True)
+        upsert_seconds = time.perf_counter() - start
+
+        query_vectors = rng.standard_normal((64, dim), dtype=np.float32).tolist()
+        counter = {"i": 0}
+
+        def search():
+            counter["i"] += 1
+            client.query_points(collection_name=collection_name, query=query_vectors[counter["i"] % 64], limit=3, with_payload=True)
+
+        search_stats = summarise_latencies(time_calls(search, queries))
+    finally:
+        client.delete_collection(collection_name)
+        client.close()
+
+    return {
+        "upsert_points_per_second": points / upsert_seconds,
+        "upsert_seconds": upsert_seconds,
+        "search": search_stats
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare REST and gRPC transports for upsert throughput and search latency")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384, help="Vector size (all-MiniLM-L6-v2 produces 384)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    config = VectorSearchService._load_config(args.config)
+
+    results = {"points": args.points, "batch_size": args.batch_size, "dim": args.dim}
+    for name, prefer_grpc in (("rest", False), ("grpc", True)):
+        results[name] = bench_transport(config, prefer_grpc, args.points, args.batch_size, args.queries, args.dim)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name in ("rest", "grpc"):
+            print(f"{name:<5} upsert: {results[name]['upsert_points_per_second']:10.0f} points/s")
+            print(format_row(f"{name} search", results[name]['search']))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,11 @@
 import logging
 from pathlib import Path
+import docx
 import pypdf
 from docx import Document
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
+from .text_cache import TextCache
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -15,11 +17,20 @@ class DocumentChunk:
     document_title: str
     chunk_content: str
     chunk_index: int
+    # Full path of the source file; file_name alone is not unique across folders
+    file_path: str = ""
+
+# Part of the text cache key: bump when extraction code changes so cached text is not reused
+EXTRACTOR_VERSIONS = {
+    '.pdf': f"1:pypdf-{pypdf.__version__}",
+    '.docx': f"1:python-docx-{getattr(docx, '__version__', 'unknown')}"
+}
 
 # Handles processing of PDF and DOCX documents for vector indexing
 class DocumentProcessor:
-    def __init__(self, folder_path: str):
+    def __init__(self, folder_path: str, text_cache: Optional[TextCache] = None):
         self.folder_path = Path(folder_path)
+        self.text_cache = text_cache
         self.chunk_delimiter = "---CHUNK_BOUNDARY---"
         self.supported_extensions = {'.pdf', '.docx'}
         
@@ -56,13 +67,27 @@ class DocumentProcessor:
     def extract_text_from_file(self, file_path: Path) -> str:
         extension = file_path.suffix.lower()
         
-        if extension == '.pdf':
-            return self.extract_text_from_pdf(file_path)
-        elif extension == '.docx':
-            return self.extract_text_from_docx(file_path)
-        else:
+        if extension not in EXTRACTOR_VERSIONS:
             logger.warning(f"Unsupported file type: {extension}")
             return ""
+        
+        # Unchanged files are served from the cache instead of being parsed again
+        cache_key = None
+        if self.text_cache:
+            cache_key = self.text_cache.key(file_path, EXTRACTOR_VERSIONS[extension])
+            cached_text = self.text_cache.get(cache_key)
+            if cached_text is not None:
+                return cached_text
+        
+        if extension == '.pdf':
+            text = self.extract_text_from_pdf(file_path)
+        else:
+            text = self.extract_text_from_docx(file_path)
+        
+        # Empty text is also what a failed extraction returns, so it is never cached
+        if cache_key and text:
+            self.text_cache.put(cache_key, text)
+        return text
     
     def parse_document_content(self, text: str) -> tuple[str, List[str]]:
         if not text.strip():
@@ -111,25 +136,29 @@ class DocumentProcessor:
                 file_name=file_path.name,
                 document_title=document_title,
                 chunk_content=chunk_content,
-                chunk_index=i
+                chunk_index=i,
+                file_path=str(file_path)
             )
             chunk_objects.append(chunk_obj)
         
         logger.info(f"Extracted {len(chunk_objects)} chunks from {file_path.name}")
         return chunk_objects
     
-    def process_all_documents(self) -> List[DocumentChunk]:
+    def get_supported_files(self) -> List[Path]:
         if not self.folder_path.exists():
             raise FileNotFoundError(f"Folder not found: {self.folder_path}")
         
+        return sorted(
+            f for f in self.folder_path.iterdir() 
+            if f.is_file() and f.suffix.lower() in self.supported_extensions
+        )
+    
+    def process_all_documents(self) -> List[DocumentChunk]:
         all_chunks = []
         processed_files = 0
         
         # Get all supported files
-        supported_files = [
-            f for f in self.folder_path.iterdir() 
-            if f.is_file() and f.suffix.lower() in self.supported_extensions
-        ]
+        supported_files = self.get_supported_files()
         
         if not supported_files:
             logger.warning(f"No supported files found in {self.folder_path}")
@@ -0,0 +1,66 @@
+import re
+from typing import List, Dict, Any, Optional
+
+# Payload fields derived from each document at index time, with a keyword payload index each
+METADATA_FIELDS = ("file_name", "product", "category")
+
+# Documents that are not about one product line (FAQ, contact, company, catalogue)
+GENERAL_PRODUCT = "general"
+
+# Product lines and the words that point a question at one of them
+PRODUCT_KEYWORDS = {
+    "AuraPhone": ("auraphone", "phone", "smartphone", "mobile", "sim", "cellular"),
+    "AuraLaptop": ("auralaptop", "aurabook", "laptop", "notebook", "trackpad", "touchpad"),
+    "AuraAccessories": ("auraaccessories", "accessory", "accessories", "charger", "earbuds", "headphones",
+                        "case", "keyboard", "mouse", "cable", "dock", "docking", "screen protector")
+}
+
+# Document categories, matched against the file name and title in this order
+CATEGORY_KEYWORDS = (
+    ("troubleshooting", ("troubleshooting",)),
+    ("faq", ("faq",)),
+    ("contact", ("contact",)),
+    ("company", ("about",)),
+    ("products", ("product",))
+)
+
+_PRODUCT_PATTERNS = {
+    product: re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + r')\b', re.IGNORECASE)
+    for product, keywords in PRODUCT_KEYWORDS.items()
+}
+
+def derive_metadata(file_name: str, document_title: str) -> Dict[str, str]:
+    source = f"{file_name} {document_title}".lower()
+
+    product = GENERAL_PRODUCT
+    for name in PRODUCT_KEYWORDS:
+        if name.lower() in source:
+            product = name
+            break
+
+    category = "general"
+    for name, keywords in CATEGORY_KEYWORDS:
+        if any(keyword in source for keyword in keywords):
+            category = name
+            break
+
+    return {"product": product, "category": category}
+
+def products_mentioned(text: str) -> List[str]:
+    return [product for product, pattern in _PRODUCT_PATTERNS.items() if pattern.search(text or "")]
+
+# Narrow a search to the product lines a question is about. The query wins; otherwise the most
+# recent question in the session that named a product is used, so follow-ups ("it still won't
+# charge") stay on the same product. General documents always stay in scope.
+def infer_search_filters(query: str, conversation_history: List[Dict] = None) -> Optional[Dict[str, Any]]:
+    products = products_mentioned(query)
+    if not products:
+        for turn in reversed(conversation_history or []):
+            products = products_mentioned(turn.get('question', ''))
+            if products:
+                break
+
+    # Nothing to narrow, or every product line anyway
+    if not products or len(products) == len(PRODUCT_KEYWORDS):
+        return None
+    return {"product": products + [GENERAL_PRODUCT]}
@@ -0,0 +1,135 @@
+import os
+import re
+import json
+import fcntl
+import hashlib
+import logging
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rows of one model's embeddings: an append-only float32 matrix file, memory-mapped for reads,
+# and an index file mapping chunk text hash -> row. Several processes may share a store (indexing
+# workers, the CLI, benchmarks), so appends hold an exclusive lock on a sidecar lock file.
+class _ModelShard:
+    def __init__(self, store_dir: Path, model_name: str):
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self.model_name = model_name
+        self.matrix_path = store_dir / f"{safe_name}.f32"
+        self.index_path = store_dir / f"{safe_name}.index.json"
+        self.lock_path = store_dir / f"{safe_name}.lock"
+        self.rows: Dict[str, int] = {}
+        self.dimension: Optional[int] = None
+        self.matrix: Optional[np.memmap] = None
+        self._load()
+
+    # The index is replaced atomically, so it can be read without the lock. Bytes past the indexed rows
+    # (an append in progress in another process, or one that died before writing its index) are never
+    # mapped, and only an appender holding the lock reuses them.
+    def _load(self):
+        if self.index_path.exists():
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            self.rows = index['rows']
+            self.dimension = index['dimension']
+        self._map()
+
+    def _map(self):
+        if self.rows:
+            self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r', shape=(len(self.rows), self.dimension))
+        else:
+            self.matrix = None
+
+    def append(self, hashes: List[str], embeddings: np.ndarray):
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process may have appended since this one last read the index
+                self._load()
+                if self.dimension is None:
+                    self.dimension = embeddings.shape[1]
+                elif embeddings.shape[1] != self.dimension:
+                    raise ValueError(f"{self.model_name} embeddings have dimension {embeddings.shape[1]}, store has {self.dimension}")
+
+                new_rows = [i for i, text_hash in enumerate(hashes) if text_hash not in self.rows]
+                if not new_rows:
+                    return
+
+                # Data first, then the index: a crash in between only leaves unindexed bytes behind, which
+                # the next appender overwrites. Holding the lock means no live process owns them.
+                with os.fdopen(os.open(self.matrix_path, os.O_RDWR | os.O_CREAT), 'r+b') as f:
+                    f.seek(len(self.rows) * self.dimension * 4)
+                    f.write(embeddings[new_rows].tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                for i in new_rows:
+                    self.rows[hashes[i]] = len(self.rows)
+
+                tmp_path = self.index_path.with_suffix(f".tmp{os.getpid()}")
+                with open(tmp_path, 'w') as f:
+                    json.dump({"model": self.model_name, "dimension": self.dimension, "rows": self.rows}, f)
+                os.replace(tmp_path, self.index_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._map()
+
+# Persistent embeddings keyed by (model name, chunk text hash), so only text never seen before
+# is sent to the embedding model. Shared across re-indexes, collection rebuilds and experiments.
+class EmbeddingStore:
+    def __init__(self, store_dir: str):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._shards: Dict[str, _ModelShard] = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _shard(self, model_name: str) -> _ModelShard:
+        if model_name not in self._shards:
+            self._shards[model_name] = _ModelShard(self.store_dir, model_name)
+        return self._shards[model_name]
+
+    # Rows come back as views into the memory-mapped matrix where possible
+    def lookup(self, model_name: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            shard = self._shard(model_name)
+            return [shard.matrix[shard.rows[h]] if h in shard.rows else None for h in map(self.text_hash, texts)]
+
+    # encode_fn receives only the distinct unseen texts and must return one embedding per text
+    def encode(self, model_name: str, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        hashes = [self.text_hash(text) for text in texts]
+
+        with self._lock:
+            shard = self._shard(model_name)
+            # Identical text repeated across files is only embedded once
+            unseen = {}
+            for text_hash, text in zip(hashes, texts):
+                if text_hash not in shard.rows and text_hash not in unseen:
+                    unseen[text_hash] = text
+
+            if unseen:
+                shard.append(list(unseen), np.asarray(encode_fn(list(unseen.values())), dtype=np.float32))
+
+            self.stats["misses"] += len(unseen)
+            self.stats["hits"] += len(texts) - len(unseen)
+            if not texts:
+                return np.zeros((0, shard.dimension or 0), dtype=np.float32)
+            # Fancy indexing copies just the requested rows out of the map
+            return shard.matrix[[shard.rows[text_hash] for text_hash in hashes]]
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["models"] = {name: len(shard.rows) for name, shard in self._shards.items()}
+        return stats
@@ -0,0 +1,99 @@
+import os
+import re
+import json
+import logging
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# FAQ chunks are written as "Q: <question>" followed by "A: <answer>"
+FAQ_PATTERN = re.compile(r'^\s*Q:\s*(?P<question>.+?)\s*\n\s*A:\s*(?P<answer>.+)$', re.DOTALL)
+
+def extract_faq_pairs(payloads: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    pairs = []
+    seen_questions = set()
+    for payload in payloads:
+        match = FAQ_PATTERN.match(payload.get('chunk_content', ''))
+        if not match:
+            continue
+
+        # PDF extraction breaks lines mid-sentence, so collapse whitespace
+        question = re.sub(r'\s+', ' ', match.group('question')).strip()
+        answer = re.sub(r'\s+', ' ', match.group('answer')).strip()
+        if not question or not answer or question.lower() in seen_questions:
+            continue
+
+        seen_questions.add(question.lower())
+        pairs.append({
+            "question": question,
+            "answer": answer,
+            "file_name": payload.get('file_name', ''),
+            "document_title": payload.get('document_title', '')
+        })
+    return pairs
+
+# Precomputed FAQ question embeddings, matched with a single matrix-vector product
+class FAQIndex:
+    def __init__(self, pairs: List[Dict[str, str]], matrix: np.ndarray, collection_name: str = None):
+        self.pairs = pairs
+        self.matrix = matrix.astype(np.float32, copy=False)
+        self.collection_name = collection_name
+        self._stats_lock = threading.Lock()
+        self.stats = {"lookups": 0, "answered": 0, "below_threshold": 0}
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    @staticmethod
+    def _normalise(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    @classmethod
+    def build(cls, pairs: List[Dict[str, str]], embedding_model, collection_name: str = None) -> "FAQIndex":
+        if not pairs:
+            return cls([], np.zeros((0, 0), dtype=np.float32), collection_name)
+
+        # Questions are embedded once at index time
+        embeddings = embedding_model.encode([pair['question'] for pair in pairs], batch_size=32)
+        return cls(pairs, cls._normalise(np.asarray(embeddings, dtype=np.float32)), collection_name)
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            matrix=self.matrix,
+            meta=np.array(json.dumps({"pairs": self.pairs, "collection_name": self.collection_name}))
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FAQIndex":
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(meta['pairs'], data['matrix'], meta.get('collection_name'))
+
+    # Returns every FAQ score for a query embedding, highest first
+    def scores(self, query_vector: np.ndarray) -> np.ndarray:
+        return self.matrix @ self._normalise(np.asarray(query_vector, dtype=np.float32))
+
+    def match(self, query_vector: np.ndarray, threshold: float) -> Optional[Dict[str, Any]]:
+        if not self.pairs:
+            return None
+
+        scores = self.scores(query_vector)
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+
+        with self._stats_lock:
+            self.stats["lookups"] += 1
+            if score < threshold:
+                self.stats["below_threshold"] += 1
+                return None
+            self.stats["answered"] += 1
+
+        return dict(self.pairs[best], score=score)
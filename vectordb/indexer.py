@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable
+from datetime import datetime
+from qdrant_client.models import Filter, FieldCondition, MatchValue, FilterSelector
+from .chunk_docs import DocumentProcessor
+from .qdrant_vector_db import VectorSearchService
+
+# State file holding the in-progress checkpoint and the last indexed snapshot
+STATE_FILE = ".vectordb_state.json"
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Builds a complete index in a shadow collection, then switches the serving alias to it
+class IndexingWorker:
+    def __init__(self, service: VectorSearchService, state_path: str = None, progress_callback: Callable[[Dict[str, Any]], None] = None):
+        self.service = service
+        self.state_path = Path(state_path or service.config.get('index_state_path', STATE_FILE))
+        self.progress_callback = progress_callback or self._log_progress
+
+    def _log_progress(self, progress: Dict[str, Any]):
+        percent = (progress['done'] / progress['total'] * 100) if progress['total'] else 100
+        logger.info(
+            f"[{progress['done']}/{progress['total']} files, {percent:.0f}%] "
+            f"{progress['status']}: {progress['file']} ({progress['chunks']} chunks, {progress['total_chunks']} total)"
+        )
+
+    def load_state(self) -> Dict[str, Any]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable index state {self.state_path}: {e}")
+            return {}
+
+    def _save_state(self, state: Dict[str, Any]):
+        # Write to a temporary file first so a crash never leaves a truncated checkpoint
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def _fingerprint(file_path: Path) -> str:
+        stat = file_path.stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def resolve_files(self, paths: List[str]) -> List[Path]:
+        files = []
+        for path in paths:
+            path = Path(path)
+            if path.is_dir():
+                files.extend(DocumentProcessor(str(path)).get_supported_files())
+            elif path.is_file() and path.suffix.lower() in DocumentProcessor(str(path.parent)).supported_extensions:
+                files.append(path)
+            else:
+                logger.warning(f"Skipping unsupported or missing path: {path}")
+
+        # Preserve order but drop duplicates from overlapping arguments
+        return list(dict.fromkeys(f.resolve() for f in files))
+
+    def snapshot(self, paths: List[str]) -> Dict[str, str]:
+        return {str(f): self._fingerprint(f) for f in self.resolve_files(paths)}
+
+    def _resumable_checkpoint(self, files: List[Path]) -> Optional[Dict[str, Any]]:
+        checkpoint = self.load_state().get('checkpoint')
+        if not checkpoint:
+            return None
+
+        if checkpoint.get('files') != [str(f) for f in files]:
+            logger.info("Checkpoint is for a different set of files, starting a fresh build")
+            return None
+
+        if not self.service.collection_exists(checkpoint['collection_name']):
+            logger.info(f"Checkpoint collection {checkpoint['collection_name']} no longer exists, starting a fresh build")
+            return None
+
+        return checkpoint
+
+    def _delete_file_points(self, collection_name: str, file_path: Path):
+        self.service.qdrant_client.delete(
+            collection_name=collection_name,
+            points_selector=FilterSelector(
+                filter=Filter(must=[FieldCondition(key="source_path", match=MatchValue(value=self.service.source_path(str(file_path))))])
+            )
+        )
+
+    def run(self, paths: List[str], resume: bool = True) -> Dict[str, Any]:
+        results = {
+            "status": "failed",
+            "collection_name": None,
+            "total_files": 0,
+            "total_chunks": 0,
+            "processing_time": 0,
+            "resumed": False,
+            "error": None
+        }
+
+        try:
+            start_time = datetime.now()
+
+            files = self.resolve_files(paths)
+            results["total_files"] = len(files)
+            if not files:
+                logger.warning(f"No supported files found in {paths}")
+                results["status"] = "no_documents"
+                return results
+
+            checkpoint = self._resumable_checkpoint(files) if resume else None
+            if checkpoint:
+                logger.info(f"Resuming build of {checkpoint['collection_name']} ({len(checkpoint['completed'])}/{len(files)} files done)")
+                results["resumed"] = True
+            else:
+                checkpoint = {
+                    "collection_name": self.service.create_shadow_collection(),
+                    "files": [str(f) for f in files],
+                    "completed": {},
+                    "started_at": start_time.isoformat()
+                }
+
+            state = self.load_state()
+            state['checkpoint'] = checkpoint
+            self._save_state(state)
+
+            collection_name = checkpoint['collection_name']
+            results["collection_name"] = collection_name
+
+            for i, file_path in enumerate(files):
+                fingerprint = self._fingerprint(file_path)
+                chunk_count = 0
+
+                completed = checkpoint['completed'].get(str(file_path))
+                if completed and completed['fingerprint'] == fingerprint:
+                    chunk_count = completed['chunks']
+                    status = "skipped"
+                else:
+                    processor = self.service.document_processor(str(file_path.parent))
+                    chunks = processor.process_single_file(file_path)
+
+                    # A file may have been half written before an interruption or edited since
+                    if results["resumed"]:
+                        self._delete_file_points(collection_name, file_path)
+
+                    if chunks:
+                        self.service._store_chunks(chunks, collection_name=collection_name, show_progress_bar=False)
+
+                    chunk_count = len(chunks)
+                    checkpoint['completed'][str(file_path)] = {"fingerprint": fingerprint, "chunks": chunk_count}
+                    self._save_state(state)
+                    status = "indexed"
+
+                self.progress_callback({
+                    "status": status,
+                    "file": file_path.name,
+                    "chunks": chunk_count,
+                    "done": i + 1,
+                    "total": len(files),
+                    "total_chunks": sum(c['chunks'] for c in checkpoint['completed'].values())
+                })
+
+            logger.info(f"Text cache: {self.service.text_cache.get_stats()}")
+
+            # Only a fully built and verified collection ever becomes visible to search
+            total_chunks = sum(c['chunks'] for c in checkpoint['completed'].values())
+            if not self.service.promote_collection(collection_name, expected_points=total_chunks):
+                results["error"] = f"Verification of {collection_name} failed, alias not switched"
+                logger.error(results["error"])
+                # Resuming would skip every file and fail the same way, so the next run rebuilds from scratch
+                self.service._discard_collection(collection_name)
+                state.pop('checkpoint', None)
+                self._save_state(state)
+                return results
+            # Servers reload the FAQ index on their own, so it is only replaced once its collection is live
+            self.service.build_faq_index(collection_name)
+            collection_info = self.service.qdrant_client.get_collection(collection_name)
+
+            state.pop('checkpoint', None)
+            state['last_indexed'] = {
+                "collection_name": collection_name,
+                "files": {path: completed['fingerprint'] for path, completed in checkpoint['completed'].items()},
+                "indexed_at": datetime.now().isoformat()
+            }
+            self._save_state(state)
+
+            results.update({
+                "status": "success",
+                "total_chunks": total_chunks,
+                "points_in_collection": collection_info.points_count,
+                "processing_time": (datetime.now() - start_time).total_seconds()
+            })
+            logger.info(f"Indexing completed: {collection_name} with {collection_info.points_count} points in {results['processing_time']:.2f} seconds")
+            return results
+
+        except Exception as e:
+            results["error"] = str(e)
+            logger.error(f"Indexing failed: {str(e)}")
+            return results
+
+    # Poll the documents folder and rebuild once a change has been stable for one interval
+    def watch(self, folder: str, interval: float = 10.0):
+        logger.info(f"Watching {folder} for changes every {interval:.0f}s")
+        indexed_snapshot = self.load_state().get('last_indexed', {}).get('files')
+        pending_snapshot = None
+
+        while True:
+            try:
+                current_snapshot = self.snapshot([folder])
+
+                if current_snapshot == indexed_snapshot:
+                    pending_snapshot = None
+                elif current_snapshot == pending_snapshot:
+                    logger.info("Change detected in documents folder, rebuilding index")
+                    result = self.run([folder])
+                    if result["status"] in ("success", "no_documents"):
+                        indexed_snapshot = current_snapshot
+                    pending_snapshot = None
+                else:
+                    pending_snapshot = current_snapshot
+
+            except Exception as e:
+                logger.error(f"Watch iteration failed: {e}")
+
+            time.sleep(interval)
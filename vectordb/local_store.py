@@ -0,0 +1,599 @@
+import os
+import json
+import uuid
+import shutil
+import logging
+import threading
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Union
+from qdrant_client.http import models
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Payload filters are evaluated with qdrant-client's own local-mode matcher, which is not part of
+# its public API and may move between releases. Only the NumPy backend needs it.
+try:
+    from qdrant_client.local.payload_filters import check_filter
+except ImportError as e:
+    check_filter = None
+    _check_filter_error = e
+
+PointId = Union[int, str]
+
+# Qdrant normalises UUID ids to their canonical string form
+def _normalise_id(point_id: PointId) -> PointId:
+    return point_id if isinstance(point_id, int) else str(uuid.UUID(str(point_id)))
+
+# Rows per block when scoring several queries: small enough that a block read from memory stays
+# in L2 cache while every query is scored against it. A plain matrix-matrix product was no faster
+# than separate matrix-vector products here; blocking brings 3 queries to ~1.4x one query.
+BATCH_SCORE_BLOCK_ROWS = 256
+
+def _batch_scores(vectors: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    scores = np.empty((len(queries), len(vectors)), dtype=np.float32)
+    for start in range(0, len(vectors), BATCH_SCORE_BLOCK_ROWS):
+        block = vectors[start:start + BATCH_SCORE_BLOCK_ROWS]
+        for i, query in enumerate(queries):
+            np.dot(block, query, out=scores[i, start:start + len(block)])
+    return scores
+
+def _select_payload(payload: Dict[str, Any], with_payload) -> Optional[Dict[str, Any]]:
+    if with_payload is True:
+        return payload
+    if not with_payload:
+        return None
+    return {key: payload[key] for key in with_payload if key in payload}
+
+# One collection: a float32 matrix with one row per write, plus ids and payloads per row.
+# Overwritten and deleted points only clear their row's alive flag; rows are never reused, so a
+# snapshot of the first `size` rows taken by a reader stays valid while a writer appends.
+# On disk: collection.json, vectors.f32 (raw rows, memory-mapped on load) and points.jsonl
+# (one {"id", "payload"} line per row, or a {"delete": [...]} line), both append-only.
+class _Collection:
+    def __init__(self, name: str, params: models.VectorParams, directory: Optional[Path] = None):
+        if params.distance not in (models.Distance.COSINE, models.Distance.DOT, models.Distance.EUCLID):
+            raise ValueError(f"Distance {params.distance} is not supported by the numpy backend")
+        self.name = name
+        self.params = params
+        self.directory = directory
+        self.payload_schema: Dict[str, Any] = {}
+        # Keyword payload indexes: field -> value -> rows, so filtered queries skip the payload scan
+        self.keyword_index: Dict[str, Dict[Any, List[int]]] = {}
+        self._index_arrays: Dict[Tuple[str, Any], np.ndarray] = {}
+        self.vectors = np.zeros((0, params.size), dtype=np.float32)
+        self.size = 0
+        self.alive = np.zeros(0, dtype=bool)
+        self.ids: List[PointId] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.row_of: Dict[PointId, int] = {}
+        # (size, mtime) of points.jsonl as last read or written, to notice writes by another process
+        self.file_state = None
+        self._points_bytes = 0
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def points_path(self) -> Path:
+        return self.directory / "points.jsonl"
+
+    def _current_file_state(self):
+        try:
+            stat = self.points_path.stat()
+            return stat.st_size, stat.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _save_meta(self):
+        tmp_path = self.directory / f"collection.json.tmp{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump({"vectors": self.params.model_dump(mode='json'), "payload_schema": self.payload_schema}, f)
+        os.replace(tmp_path, self.directory / "collection.json")
+
+    def create_files(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._save_meta()
+        self.vectors_path.touch()
+        self.points_path.touch()
+        self.file_state = self._current_file_state()
+
+    @classmethod
+    def load(cls, name: str, directory: Path) -> "_Collection":
+        with open(directory / "collection.json", 'r') as f:
+            meta = json.load(f)
+        collection = cls(name, models.VectorParams(**meta['vectors']), directory)
+        collection.payload_schema = meta.get('payload_schema', {})
+        collection.keyword_index = {field: {} for field, schema in collection.payload_schema.items() if schema == "keyword"}
+        collection.file_state = collection._current_file_state()
+
+        dim = collection.params.size
+        vector_rows = collection.vectors_path.stat().st_size // (dim * 4)
+        collection.alive = np.zeros(vector_rows, dtype=bool)
+        with open(collection.points_path, 'rb') as f:
+            for line in f:
+                # A torn last line from an interrupted write is ignored, and truncated on the next write
+                if not line.endswith(b"\n"):
+                    break
+                record = json.loads(line)
+                if "delete" in record:
+                    for point_id in record["delete"]:
+                        row = collection.row_of.pop(point_id, None)
+                        if row is not None:
+                            collection.alive[row] = False
+                else:
+                    # Rows whose vector never reached vectors.f32 are dropped the same way
+                    if collection.size == vector_rows:
+                        break
+                    collection._append_row(record["id"], record["payload"])
+                collection._points_bytes += len(line)
+
+        collection.alive = collection.alive[:collection.size]
+        if collection.size:
+            # Zero-copy until the first write: the OS page cache is shared by every process reading it
+            collection.vectors = np.memmap(collection.vectors_path, dtype=np.float32, mode='r', shape=(collection.size, dim))
+        return collection
+
+    def _append_row(self, point_id: PointId, payload: Dict[str, Any]):
+        previous = self.row_of.get(point_id)
+        if previous is not None:
+            self.alive[previous] = False
+        row = self.size
+        self.row_of[point_id] = row
+        self.ids.append(point_id)
+        self.payloads.append(payload)
+        self.alive[row] = True
+        self.size += 1
+        for field, index in self.keyword_index.items():
+            self._index_value(index, payload.get(field), row)
+
+    @staticmethod
+    def _index_value(index: Dict[Any, List[int]], value: Any, row: int):
+        # Like Qdrant, a list value matches on any of its elements
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, str):
+                index.setdefault(item, []).append(row)
+
+    # Row arrays are rebuilt only after the value gained rows
+    def _index_rows(self, field: str, value: str) -> np.ndarray:
+        rows = self.keyword_index[field].get(value, [])
+        cached = self._index_arrays.get((field, value))
+        if cached is None or len(cached) != len(rows):
+            cached = np.asarray(rows, dtype=np.int64)
+            self._index_arrays[(field, value)] = cached
+        return cached
+
+    def create_keyword_index(self, field: str):
+        if field in self.keyword_index:
+            return
+        index = {}
+        for row in range(self.size):
+            self._index_value(index, self.payloads[row].get(field), row)
+        self.keyword_index[field] = index
+        self.payload_schema[field] = "keyword"
+        if self.directory is not None:
+            self._save_meta()
+
+    def _reserve(self, rows: int):
+        needed = self.size + rows
+        # Growing copies the (possibly memory-mapped) rows into a fresh array; readers keep the old one
+        if needed > len(self.vectors) or isinstance(self.vectors, np.memmap):
+            capacity = max(needed, len(self.vectors) * 2, 1024)
+            vectors = np.zeros((capacity, self.params.size), dtype=np.float32)
+            vectors[:self.size] = self.vectors[:self.size]
+            self.vectors = vectors
+        if needed > len(self.alive):
+            alive = np.zeros(len(self.vectors), dtype=bool)
+            alive[:self.size] = self.alive[:self.size]
+            self.alive = alive
+
+    def _prepare_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        if self.params.distance == models.Distance.COSINE:
+            norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors.astype(np.float32, copy=False)
+
+    # Drop rows an interrupted write left in only one of the two files before appending
+    def _repair_files(self):
+        with open(self.points_path, 'r+b') as f:
+            f.truncate(self._points_bytes)
+        with open(self.vectors_path, 'r+b') as f:
+            f.truncate(self.size * self.params.size * 4)
+
+    def _append_files(self, vectors: Optional[np.ndarray], lines: List[str]):
+        if self.directory is None:
+            return
+        if self.points_path.stat().st_size != self._points_bytes or self.vectors_path.stat().st_size != self.size * self.params.size * 4:
+            self._repair_files()
+        # Vectors first: rows only become visible once their points.jsonl line exists
+        if vectors is not None:
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.ascontiguousarray(vectors).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        data = "".join(lines).encode('utf-8')
+        with open(self.points_path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._points_bytes += len(data)
+        self.file_state = self._current_file_state()
+
+    def upsert(self, points: List[models.PointStruct]):
+        if not points:
+            return
+        vectors = self._prepare_vectors(np.asarray([point.vector for point in points], dtype=np.float32))
+        if vectors.ndim != 2 or vectors.shape[1] != self.params.size:
+            raise ValueError(f"Wrong input: vector dimension error: expected dim: {self.params.size}, got {vectors.shape[-1]}")
+        ids = [_normalise_id(point.id) for point in points]
+        payloads = [point.payload or {} for point in points]
+
+        self._append_files(vectors, [json.dumps({"id": point_id, "payload": payload}) + "\n" for point_id, payload in zip(ids, payloads)])
+        self._reserve(len(points))
+        self.vectors[self.size:self.size + len(points)] = vectors
+        for point_id, payload in zip(ids, payloads):
+            self._append_row(point_id, payload)
+
+    def delete(self, point_ids: List[PointId]):
+        point_ids = [point_id for point_id in point_ids if point_id in self.row_of]
+        if not point_ids:
+            return
+        self._append_files(None, [json.dumps({"delete": point_ids}) + "\n"])
+        for point_id in point_ids:
+            self.alive[self.row_of.pop(point_id)] = False
+
+    # Rows allowed by the keyword-indexed conditions in `must`, and whether those were all the conditions
+    def _indexed_candidates(self, query_filter: models.Filter, size: int) -> Tuple[Optional[np.ndarray], bool]:
+        must = query_filter.must if isinstance(query_filter.must, list) else [query_filter.must] if query_filter.must else []
+        candidates = None
+        fully_indexed = not (query_filter.should or query_filter.must_not or query_filter.min_should)
+
+        for condition in must:
+            index = self.keyword_index.get(getattr(condition, 'key', None))
+            match = getattr(condition, 'match', None)
+            if index is None or not isinstance(match, (models.MatchValue, models.MatchAny)) or condition.__class__ is not models.FieldCondition:
+                fully_indexed = False
+                continue
+            values = [match.value] if isinstance(match, models.MatchValue) else match.any
+            if not all(isinstance(value, str) for value in values):
+                fully_indexed = False
+                continue
+
+            rows = np.zeros(size, dtype=bool)
+            for value in values:
+                matching = self._index_rows(condition.key, value)
+                rows[matching[matching < size]] = True
+            candidates = rows if candidates is None else candidates & rows
+
+        return candidates, fully_indexed and candidates is not None
+
+    def mask(self, alive: np.ndarray, query_filter: Optional[models.Filter]) -> np.ndarray:
+        if query_filter is None:
+            return alive
+        candidates, fully_indexed = self._indexed_candidates(query_filter, len(alive))
+        if candidates is not None:
+            alive = alive & candidates
+            if fully_indexed:
+                return alive
+
+        mask = alive.copy()
+        for row in np.flatnonzero(alive):
+            if not check_filter(query_filter, self.payloads[row], self.ids[row], {"": True}):
+                mask[row] = False
+        return mask
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.vectors[:self.size], self.alive[:self.size].copy()
+
+    def info(self) -> models.CollectionInfo:
+        return models.CollectionInfo(
+            status=models.CollectionStatus.GREEN,
+            optimizer_status=models.OptimizersStatusOneOf.OK,
+            indexed_vectors_count=0,
+            points_count=len(self.row_of),
+            segments_count=1,
+            payload_schema={
+                field: models.PayloadIndexInfo(data_type=models.PayloadSchemaType.KEYWORD, points=sum(len(rows) for rows in self.keyword_index.get(field, {}).values()))
+                for field in self.payload_schema
+            },
+            config=models.CollectionConfig(
+                params=models.CollectionParams(vectors=self.params),
+                hnsw_config=models.HnswConfig(m=16, ef_construct=100, full_scan_threshold=10000),
+                wal_config=models.WalConfig(wal_capacity_mb=32, wal_segments_ahead=0),
+                optimizer_config=models.OptimizersConfig(
+                    deleted_threshold=0.2,
+                    vacuum_min_vector_number=1000,
+                    default_segment_number=0,
+                    indexing_threshold=20000,
+                    flush_interval_sec=5,
+                    max_optimization_threads=1
+                )
+            )
+        )
+
+# In-process vector store answering the subset of the QdrantClient API that VectorSearchService,
+# the indexer and the benchmarks use, with the same request and response models. Search is an
+# exact (brute-force) top-k over a NumPy matrix. With a path, collections and aliases persist
+# on disk and changes made by another process (the indexer) are picked up on the next call;
+# with path=None or ":memory:" everything lives in memory. One writer process at a time.
+class NumpyVectorStore:
+    def __init__(self, path: Optional[str] = None):
+        if check_filter is None:
+            raise ImportError(
+                "vector_backend 'numpy' needs qdrant_client.local.payload_filters.check_filter, which this "
+                f"qdrant-client release does not provide ({_check_filter_error}); install a qdrant-client 1.x "
+                "release that has it, or use the 'qdrant' backend"
+            )
+        self.path = Path(path) if path and path != ":memory:" else None
+        self._lock = threading.RLock()
+        self._collections: Dict[str, _Collection] = {}
+        self._aliases: Dict[str, str] = {}
+        self._aliases_state = None
+        if self.path:
+            (self.path / "collections").mkdir(parents=True, exist_ok=True)
+            self._load_aliases()
+
+    @property
+    def _aliases_path(self) -> Path:
+        return self.path / "aliases.json"
+
+    def _collection_dir(self, name: str) -> Path:
+        return self.path / "collections" / name
+
+    def _load_aliases(self):
+        try:
+            stat = self._aliases_path.stat()
+        except FileNotFoundError:
+            self._aliases, self._aliases_state = {}, None
+            return
+        if (stat.st_size, stat.st_mtime_ns) != self._aliases_state:
+            with open(self._aliases_path, 'r') as f:
+                self._aliases = json.load(f)
+            self._aliases_state = (stat.st_size, stat.st_mtime_ns)
+
+    def _save_aliases(self):
+        if not self.path:
+            return
+        tmp_path = self._aliases_path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, 'w') as f:
+            json.dump(self._aliases, f)
+        os.replace(tmp_path, self._aliases_path)
+        stat = self._aliases_path.stat()
+        self._aliases_state = (stat.st_size, stat.st_mtime_ns)
+
+    def _collection_names(self) -> List[str]:
+        if not self.path:
+            return sorted(self._collections)
+        return sorted(entry.name for entry in (self.path / "collections").iterdir() if (entry / "collection.json").exists())
+
+    # Resolve an alias or collection name, (re)loading from disk when another process changed it
+    def _get(self, collection_name: str) -> _Collection:
+        if self.path:
+            self._load_aliases()
+        name = self._aliases.get(collection_name, collection_name)
+        collection = self._collections.get(name)
+
+        if self.path:
+            directory = self._collection_dir(name)
+            if not (directory / "collection.json").exists():
+                self._collections.pop(name, None)
+                collection = None
+            elif collection is None or collection._current_file_state() != collection.file_state:
+                collection = _Collection.load(name, directory)
+                self._collections[name] = collection
+
+        if collection is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return collection
+
+    def get_collections(self) -> models.CollectionsResponse:
+        with self._lock:
+            return models.CollectionsResponse(collections=[models.CollectionDescription(name=name) for name in self._collection_names()])
+
+    def collection_exists(self, collection_name: str) -> bool:
+        with self._lock:
+            return collection_name in self._collection_names()
+
+    def create_collection(self, collection_name: str, vectors_config: models.VectorParams, **kwargs) -> bool:
+        with self._lock:
+            if collection_name in self._collection_names():
+                raise ValueError(f"Collection {collection_name} already exists")
+            directory = self._collection_dir(collection_name) if self.path else None
+            collection = _Collection(collection_name, vectors_config, directory)
+            if directory:
+                collection.create_files()
+            self._collections[collection_name] = collection
+            return True
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        with self._lock:
+            existed = collection_name in self._collection_names()
+            self._collections.pop(collection_name, None)
+            if self.path and existed:
+                shutil.rmtree(self._collection_dir(collection_name), ignore_errors=True)
+            # As in Qdrant, aliases of a deleted collection go with it
+            self._aliases = {alias: target for alias, target in self._aliases.items() if target != collection_name}
+            self._save_aliases()
+            return existed
+
+    def get_collection(self, collection_name: str) -> models.CollectionInfo:
+        with self._lock:
+            return self._get(collection_name).info()
+
+    def get_aliases(self) -> models.CollectionsAliasesResponse:
+        with self._lock:
+            if self.path:
+                self._load_aliases()
+            return models.CollectionsAliasesResponse(aliases=[
+                models.AliasDescription(alias_name=alias, collection_name=target) for alias, target in self._aliases.items()
+            ])
+
+    # All operations are applied together and written with one atomic file replace
+    def update_collection_aliases(self, change_aliases_operations: List[Any], **kwargs) -> bool:
+        with self._lock:
+            if self.path:
+                self._load_aliases()
+            aliases = dict(self._aliases)
+            for operation in change_aliases_operations:
+                if isinstance(operation, models.CreateAliasOperation):
+                    if operation.create_alias.collection_name not in self._collection_names():
+                        raise ValueError(f"Collection {operation.create_alias.collection_name} not found")
+                    aliases[operation.create_alias.alias_name] = operation.create_alias.collection_name
+                elif isinstance(operation, models.DeleteAliasOperation):
+                    aliases.pop(operation.delete_alias.alias_name, None)
+                elif isinstance(operation, models.RenameAliasOperation):
+                    aliases[operation.rename_alias.new_alias_name] = aliases.pop(operation.rename_alias.old_alias_name)
+                else:
+                    raise ValueError(f"Unsupported alias operation: {operation}")
+            self._aliases = aliases
+            self._save_aliases()
+            return True
+
+    def upsert(self, collection_name: str, points: List[models.PointStruct], **kwargs) -> models.UpdateResult:
+        with self._lock:
+            self._get(collection_name).upsert(points)
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    def delete(self, collection_name: str, points_selector, **kwargs) -> models.UpdateResult:
+        with self._lock:
+            collection = self._get(collection_name)
+            if isinstance(points_selector, models.FilterSelector):
+                _, alive = collection.snapshot()
+                rows = np.flatnonzero(collection.mask(alive, points_selector.filter))
+                point_ids = [collection.ids[row] for row in rows]
+            elif isinstance(points_selector, models.PointIdsList):
+                point_ids = [_normalise_id(point_id) for point_id in points_selector.points]
+            else:
+                point_ids = [_normalise_id(point_id) for point_id in points_selector]
+            collection.delete(point_ids)
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    # Only keyword indexes are built; other schemas are accepted and answered by scanning payloads
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs) -> models.UpdateResult:
+        with self._lock:
+            if field_schema in (None, models.PayloadSchemaType.KEYWORD, "keyword"):
+                self._get(collection_name).create_keyword_index(field_name)
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    def count(self, collection_name: str, count_filter: Optional[models.Filter] = None, exact: bool = True, **kwargs) -> models.CountResult:
+        with self._lock:
+            collection = self._get(collection_name)
+            _, alive = collection.snapshot()
+            return models.CountResult(count=int(collection.mask(alive, count_filter).sum()))
+
+    def _record(self, collection: _Collection, row: int, with_payload, with_vectors: bool, vectors: np.ndarray) -> models.Record:
+        return models.Record(
+            id=collection.ids[row],
+            payload=_select_payload(collection.payloads[row], with_payload),
+            vector=vectors[row].tolist() if with_vectors else None
+        )
+
+    # Points come back in write order (Qdrant orders by id); offset is the id to resume from
+    def scroll(self, collection_name: str, scroll_filter: Optional[models.Filter] = None, limit: int = 10, offset: Optional[PointId] = None,
+               with_payload=True, with_vectors: bool = False, **kwargs) -> Tuple[List[models.Record], Optional[PointId]]:
+        with self._lock:
+            collection = self._get(collection_name)
+            vectors, alive = collection.snapshot()
+            rows = np.flatnonzero(collection.mask(alive, scroll_filter))
+            if offset is not None:
+                start_row = collection.row_of.get(_normalise_id(offset))
+                rows = rows[np.searchsorted(rows, start_row):] if start_row is not None else rows[:0]
+
+            page = rows[:limit]
+            next_offset = collection.ids[rows[limit]] if len(rows) > limit else None
+            return [self._record(collection, row, with_payload, with_vectors, vectors) for row in page], next_offset
+
+    def query_points(self, collection_name: str, query=None, query_filter: Optional[models.Filter] = None, limit: int = 10, offset: int = 0,
+                     score_threshold: Optional[float] = None, with_payload=True, with_vectors: bool = False, **kwargs) -> models.QueryResponse:
+        with self._lock:
+            collection = self._get(collection_name)
+            vectors, alive = collection.snapshot()
+            mask = collection.mask(alive, query_filter)
+
+        # Scoring runs outside the lock; the snapshot is immutable
+        return models.QueryResponse(points=self._top_k(collection, vectors, mask, query, limit, offset, score_threshold, with_payload, with_vectors))
+
+    # Several queries in one call. Queries that would scan most of the matrix are scored together
+    # in one blocked pass, so N queries read the vectors from memory once instead of N times
+    def query_batch_points(self, collection_name: str, requests: List[models.QueryRequest], **kwargs) -> List[models.QueryResponse]:
+        with self._lock:
+            collection = self._get(collection_name)
+            vectors, alive = collection.snapshot()
+            masks = [collection.mask(alive, request.filter) for request in requests]
+
+        full_scores = [None] * len(requests)
+        if collection.params.distance != models.Distance.EUCLID:
+            shared = [i for i, mask in enumerate(masks) if mask.sum() >= len(vectors) // 2]
+            if len(shared) > 1:
+                queries = collection._prepare_vectors(np.asarray([requests[i].query for i in shared], dtype=np.float32))
+                scores = _batch_scores(vectors, queries)
+                for column, i in enumerate(shared):
+                    full_scores[i] = scores[column]
+
+        return [
+            models.QueryResponse(points=self._top_k(
+                collection, vectors, mask, request.query, request.limit or 10, request.offset or 0, request.score_threshold,
+                request.with_payload if request.with_payload is not None else False, bool(request.with_vector), full_scores=scores
+            ))
+            for request, mask, scores in zip(requests, masks, full_scores)
+        ]
+
+    # full_scores: unmasked scores of every row for this query, when a batch already computed them
+    @staticmethod
+    def _top_k(collection: _Collection, vectors: np.ndarray, mask: np.ndarray, query, limit: int, offset: int,
+               score_threshold: Optional[float], with_payload, with_vectors: bool, full_scores: np.ndarray = None) -> List[models.ScoredPoint]:
+        rows = np.flatnonzero(mask)
+        k = min(limit + offset, len(rows))
+        if k <= 0:
+            return []
+
+        query_vector = collection._prepare_vectors(np.asarray(query, dtype=np.float32)[None, :])[0]
+        euclid = collection.params.distance == models.Distance.EUCLID
+
+        def score(matrix: np.ndarray) -> np.ndarray:
+            if euclid:
+                # Qdrant reports the distance itself: lower is better
+                return -np.sqrt(np.maximum(((matrix - query_vector) ** 2).sum(axis=1), 0))
+            return matrix @ query_vector
+
+        # A filter only scores its candidate rows. Points are written file by file, so candidates
+        # usually form a few contiguous runs that can be scored in place; scattered candidates are
+        # gathered when there are few of them, otherwise the whole matrix is scored and masked
+        selective = len(rows) < len(vectors) // 2 and full_scores is None
+        if selective:
+            breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+            starts = rows[np.r_[0, breaks]]
+            ends = rows[np.r_[breaks - 1, len(rows) - 1]] + 1
+            if len(starts) <= max(64, len(rows) // 256):
+                scores = np.concatenate([score(vectors[start:end]) for start, end in zip(starts, ends)])
+            elif len(rows) < len(vectors) // 10:
+                scores = score(vectors[rows])
+            else:
+                selective = False
+        if not selective:
+            scores = np.where(mask, score(vectors) if full_scores is None else full_scores, -np.inf)
+        threshold = (-score_threshold if euclid else score_threshold) if score_threshold is not None else None
+
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')][offset:]
+        if threshold is not None:
+            top = top[scores[top] >= threshold]
+
+        sign = -1.0 if euclid else 1.0
+        return [
+            models.ScoredPoint(
+                id=collection.ids[row],
+                version=0,
+                score=sign * float(point_score),
+                payload=_select_payload(collection.payloads[row], with_payload),
+                vector=vectors[row].tolist() if with_vectors else None
+            )
+            for row, point_score in zip(rows[top] if selective else top, scores[top])
+        ]
+
+    def close(self, **kwargs):
+        with self._lock:
+            self._collections.clear()
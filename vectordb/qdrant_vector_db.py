@@ -2,12 +2,25 @@ import os
 import json
 import logging
 import uuid
-from typing import List, Dict, Any
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime
+from pathlib import Path
 from .chunk_docs import DocumentProcessor, DocumentChunk
+from .faq_index import FAQIndex, extract_faq_pairs
+from .text_cache import TextCache
+from .embedding_store import EmbeddingStore
+from .local_store import NumpyVectorStore
+from .doc_metadata import METADATA_FIELDS, derive_metadata
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+    PayloadSchemaType, Filter, FieldCondition, MatchValue, MatchAny, QueryRequest
+)
 from sentence_transformers import SentenceTransformer
+from tracing import tracer
 
 # Configuration file for service settings
 CONFIG_FILE = "config.json"
@@ -16,23 +29,111 @@ CONFIG_FILE = "config.json"
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Build a Qdrant client for the configured transport. gRPC avoids JSON encoding of vectors and
+# payloads; indexing and search both go through here so they always share the same choice
+def create_qdrant_client(config: Dict[str, Any], prefer_grpc: bool = None) -> QdrantClient:
+    prefer_grpc = config.get('prefer_grpc', False) if prefer_grpc is None else prefer_grpc
+    
+    if prefer_grpc:
+        logger.info(f"Connecting to Qdrant at {config['qdrant_host']}:{config['qdrant_grpc_port']} (gRPC)")
+    else:
+        logger.info(f"Connecting to Qdrant at {config['qdrant_host']}:{config['qdrant_port']} (REST)")
+    
+    return QdrantClient(
+        host=config['qdrant_host'],
+        port=config['qdrant_port'],
+        grpc_port=config.get('qdrant_grpc_port', 6334),
+        prefer_grpc=prefer_grpc,
+        timeout=config.get('qdrant_timeout'),
+        pool_size=config.get('qdrant_pool_size')
+    )
+
+# Pick the vector store backend from config. Every backend answers the same QdrantClient calls:
+#   qdrant        - a Qdrant server (REST or gRPC, see create_qdrant_client)
+#   qdrant_local  - Qdrant's embedded local mode; the folder is locked by one process at a time
+#   numpy         - in-process brute-force search over a memory-mapped matrix (local_store.py)
+# Local backends keep their data in local_vector_path, or in memory when it is ":memory:"
+def create_vector_client(config: Dict[str, Any]):
+    backend = config.get('vector_backend', 'qdrant')
+    
+    if backend == 'qdrant':
+        return create_qdrant_client(config)
+    if backend == 'qdrant_local':
+        logger.info(f"Opening embedded Qdrant at {config['local_vector_path']}")
+        return QdrantClient(location=":memory:") if config['local_vector_path'] == ":memory:" else QdrantClient(path=config['local_vector_path'])
+    if backend == 'numpy':
+        logger.info(f"Opening NumPy vector store at {config['local_vector_path']}")
+        return NumpyVectorStore(config['local_vector_path'])
+    raise ValueError(f"Unknown vector_backend: {backend}")
+
+# Reciprocal rank fusion constant: damps the weight of top ranks so one sub-query cannot dominate
+RRF_K = 60
+
+# Seconds a retrieval fingerprint is reused before the serving alias is looked up again
+RETRIEVAL_FINGERPRINT_TTL = 5.0
+
 # Vector Search Service using Qdrant and Sentence Transformers
 class VectorSearchService:
     def __init__(self, config_path: str = CONFIG_FILE):
         self.config = self._load_config(config_path)
         self.qdrant_client = None
         self.embedding_model = None
+        # Cached collection readiness: None until first checked, then refreshed on index events
+        self._collection_ready = None
+        self._readiness_checked_at = 0.0
+        # FAQ answer index, loaded lazily and reloaded when the indexer rewrites the file
+        self._faq_index = None
+        self._faq_index_mtime = None
+        self._faq_checked_at = 0.0
+        # What searches currently run against, see retrieval_fingerprint
+        self._retrieval_fingerprint = None
+        self._retrieval_fingerprint_at = 0.0
+        # Indexing-only stores, created on first use so serving processes never open them
+        self._text_cache = None
+        self._embedding_store = None
+        self._indexing_stores_lock = threading.Lock()
         self._initialise_clients()
     
-    def _load_config(self, config_path: str) -> Dict[str, Any]:
+    # Extracted document text, shared by every DocumentProcessor this service creates
+    @property
+    def text_cache(self) -> TextCache:
+        with self._indexing_stores_lock:
+            if self._text_cache is None:
+                self._text_cache = TextCache(self.config['text_cache_dir'], self.config['text_cache_max_mb'] * 1024 * 1024)
+            return self._text_cache
+    
+    # Chunk embeddings by (model, text hash), reused across re-indexes
+    @property
+    def embedding_store(self) -> EmbeddingStore:
+        with self._indexing_stores_lock:
+            if self._embedding_store is None:
+                self._embedding_store = EmbeddingStore(self.config['embedding_store_dir'])
+            return self._embedding_store
+    
+    @staticmethod
+    def _load_config(config_path: str) -> Dict[str, Any]:
         default_config = {
             "qdrant_host": "localhost",
             "qdrant_port": 6333,
+            "qdrant_grpc_port": 6334,
+            "prefer_grpc": False,
+            "qdrant_timeout": 10,
+            "qdrant_pool_size": None,
             "collection_name": "documents",
             "embedding_model": "all-MiniLM-L6-v2",
             "default_documents_folder": "./documents",
             "chunk_size": 1000,
-            "chunk_overlap": 200
+            "chunk_overlap": 200,
+            "keep_collection_versions": 2,
+            "readiness_recheck_interval": 30,
+            "faq_index_path": "./faq_index.npz",
+            "faq_match_threshold": 0.85,
+            "faq_reload_interval": 30,
+            "text_cache_dir": "./.text_cache",
+            "text_cache_max_mb": 256,
+            "embedding_store_dir": "./.embedding_store",
+            "vector_backend": "qdrant",
+            "local_vector_path": "./vector_store"
         }
         
         if os.path.exists(config_path):
@@ -47,12 +148,13 @@ class VectorSearchService:
                 logger.info("Using default configuration")
         else:
             # Create default config file
-            self._save_config(default_config, config_path)
+            VectorSearchService._save_config(default_config, config_path)
             logger.info(f"Created default configuration at {config_path}")
         
         return default_config
     
-    def _save_config(self, config: Dict[str, Any], config_path: str):
+    @staticmethod
+    def _save_config(config: Dict[str, Any], config_path: str):
         try:
             with open(config_path, 'w') as f:
                 json.dump(config, f, indent=2)
@@ -61,21 +163,18 @@ class VectorSearchService:
     
     def _initialise_clients(self):
         try:
-            # Initialise Qdrant client
-            logger.info(f"Connecting to Qdrant at {self.config['qdrant_host']}:{self.config['qdrant_port']}")
-            self.qdrant_client = QdrantClient(
-                host=self.config['qdrant_host'],
-                port=self.config['qdrant_port']
-            )
+            # Initialise the vector store client (Qdrant server or an in-process backend)
+            self.qdrant_client = create_vector_client(self.config)
             
             # Test connection
             self.qdrant_client.get_collections()
-            logger.info("Successfully connected to Qdrant")
+            logger.info(f"Successfully connected to vector store ({self.config['vector_backend']})")
             
         except Exception as e:
-            logger.error(f"Failed to connect to Qdrant: {str(e)}")
-            logger.error("Make sure Qdrant is running:")
-            logger.error("  Docker: docker run -p 6333:6333 -v $(pwd)/qdrant_storage:/qdrant/storage qdrant/qdrant")
+            logger.error(f"Failed to connect to vector store: {str(e)}")
+            if self.config['vector_backend'] == 'qdrant':
+                logger.error("Make sure Qdrant is running, or set vector_backend to \"numpy\" in config.json:")
+                logger.error("  Docker: docker run -p 6333:6333 -p 6334:6334 -v $(pwd)/qdrant_storage:/qdrant/storage qdrant/qdrant")
             raise
         
         try:
@@ -88,45 +187,161 @@ class VectorSearchService:
             logger.error(f"Failed to load embedding model: {str(e)}")
             raise
     
-    def create_index(self, overwrite: bool = False) -> bool:
+    # Returns the collection new chunks should be written to. Overwriting never touches the live
+    # collection: a fresh version is created and only becomes visible through promote_collection
+    def create_index(self, overwrite: bool = False) -> Optional[str]:
         try:
-            collection_name = self.config['collection_name']
+            alias_name = self.config['collection_name']
             
-            # Check if collection exists
-            collections = self.qdrant_client.get_collections()
-            collection_exists = any(
-                col.name == collection_name 
-                for col in collections.collections
-            )
+            if not overwrite:
+                current_target = self.get_alias_target()
+                if current_target:
+                    logger.info(f"Collection '{current_target}' already serves alias '{alias_name}'")
+                    return current_target
+                if self.collection_exists(alias_name):
+                    logger.info(f"Collection '{alias_name}' already exists")
+                    return alias_name
+            
+            return self.create_shadow_collection()
             
-            if collection_exists:
-                if overwrite:
-                    logger.warning(f"Deleting existing collection: {collection_name}")
-                    self.qdrant_client.delete_collection(collection_name)
-                else:
-                    logger.info(f"Collection '{collection_name}' already exists")
-                    return True
-            
-            # Get embedding dimension
-            sample_embedding = self.embedding_model.encode(["sample text"])
-            embedding_dim = len(sample_embedding[0])
-            
-            # Create collection
-            logger.info(f"Creating collection: {collection_name} (dimension: {embedding_dim})")
-            self.qdrant_client.create_collection(
+        except Exception as e:
+            logger.error(f"Failed to create index: {str(e)}")
+            return None
+    
+    def _create_collection(self, collection_name: str):
+        # Get embedding dimension
+        sample_embedding = self.embedding_model.encode(["sample text"])
+        embedding_dim = len(sample_embedding[0])
+        
+        # Create collection
+        logger.info(f"Creating collection: {collection_name} (dimension: {embedding_dim})")
+        self.qdrant_client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(
+                size=embedding_dim,
+                distance=Distance.COSINE
+            )
+        )
+        
+        # Keyword indexes let filtered searches go straight to the matching points
+        for field_name in METADATA_FIELDS:
+            self.qdrant_client.create_payload_index(
                 collection_name=collection_name,
-                vectors_config=VectorParams(
-                    size=embedding_dim,
-                    distance=Distance.COSINE
-                )
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD
             )
+        
+        logger.info(f"Successfully created collection: {collection_name}")
+    
+    def collection_exists(self, collection_name: str) -> bool:
+        collections = self.qdrant_client.get_collections()
+        return any(col.name == collection_name for col in collections.collections)
+    
+    # Versioned collections are named <alias>_v<timestamp> so they sort oldest to newest
+    def _version_prefix(self) -> str:
+        return f"{self.config['collection_name']}_v"
+    
+    def list_collection_versions(self) -> List[str]:
+        prefix = self._version_prefix()
+        collections = self.qdrant_client.get_collections()
+        return sorted(col.name for col in collections.collections if col.name.startswith(prefix))
+    
+    # Shadow collections are built off to the side and only become visible through the alias
+    def create_shadow_collection(self) -> str:
+        shadow_name = f"{self._version_prefix()}{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        self._create_collection(shadow_name)
+        return shadow_name
+    
+    def get_alias_target(self) -> Optional[str]:
+        aliases = self.qdrant_client.get_aliases()
+        for alias in aliases.aliases:
+            if alias.alias_name == self.config['collection_name']:
+                return alias.collection_name
+        return None
+    
+    # Point the serving alias at a fully built collection, returns the previous target
+    def switch_alias(self, collection_name: str) -> Optional[str]:
+        alias_name = self.config['collection_name']
+        previous_target = self.get_alias_target()
+        
+        # Delete and create are applied by Qdrant as a single atomic change
+        operations = []
+        if previous_target is not None:
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name)))
+        operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=alias_name)))
+        
+        # A physical collection still using the alias name (pre-alias deployments) has to go first. An alias
+        # cannot share a collection's name, so this one swap cannot be atomic: the alias is created in the
+        # very next call, and a search landing in between re-probes and retries (see _query_alias).
+        if previous_target is None and self.collection_exists(alias_name):
+            logger.warning(f"Replacing legacy collection '{alias_name}' with an alias")
+            self.qdrant_client.delete_collection(alias_name)
+        self.qdrant_client.update_collection_aliases(change_aliases_operations=operations)
+        
+        logger.info(f"Alias '{alias_name}' now points to '{collection_name}' (previously: {previous_target})")
+        return previous_target
+    
+    # Check a freshly built collection before any query can reach it
+    def verify_collection(self, collection_name: str, expected_points: int = None) -> bool:
+        try:
+            points_count = self.qdrant_client.count(collection_name=collection_name, exact=True).count
+            if points_count == 0:
+                logger.error(f"Verification failed: collection {collection_name} is empty")
+                return False
+            
+            if expected_points is not None and points_count != expected_points:
+                logger.error(f"Verification failed: collection {collection_name} has {points_count} points, expected {expected_points}")
+                return False
+            
+            # Probe search: a stored vector must come back as its own nearest neighbour
+            probe_points, _ = self.qdrant_client.scroll(collection_name=collection_name, limit=1, with_vectors=True)
+            probe = probe_points[0]
+            probe_results = self.qdrant_client.query_points(
+                collection_name=collection_name,
+                query=probe.vector,
+                limit=1
+            ).points
+            if not probe_results or probe_results[0].id != probe.id:
+                logger.error(f"Verification failed: probe search on {collection_name} did not return the probe point")
+                return False
             
-            logger.info(f"Successfully created collection: {collection_name}")
+            logger.info(f"Verified collection {collection_name}: {points_count} points, probe search ok")
             return True
             
         except Exception as e:
-            logger.error(f"Failed to create index: {str(e)}")
+            logger.error(f"Verification of {collection_name} failed: {str(e)}")
+            return False
+    
+    # Verify, flip the alias and garbage-collect versions that are no longer needed for rollback
+    def promote_collection(self, collection_name: str, expected_points: int = None) -> bool:
+        if not self.verify_collection(collection_name, expected_points):
             return False
+        
+        self.switch_alias(collection_name)
+        self.garbage_collect_versions()
+        self.refresh_readiness()
+        return True
+    
+    def garbage_collect_versions(self, keep: int = None) -> List[str]:
+        keep = self.config['keep_collection_versions'] if keep is None else keep
+        current_target = self.get_alias_target()
+        versions = self.list_collection_versions()
+        
+        if current_target not in versions:
+            return []
+        
+        # Versions newer than the live one may be builds in progress, so only older ones are candidates
+        older_versions = versions[:versions.index(current_target)]
+        expired_versions = older_versions[:max(len(older_versions) - max(keep - 1, 0), 0)]
+        
+        for collection_name in expired_versions:
+            logger.info(f"Deleting expired collection version: {collection_name}")
+            self.qdrant_client.delete_collection(collection_name)
+        
+        return expired_versions
+    
+    def document_processor(self, documents_folder: str) -> DocumentProcessor:
+        return DocumentProcessor(documents_folder, text_cache=self.text_cache)
     
     def index_documents(self, documents_folder: str = None, overwrite: bool = False) -> Dict[str, Any]:
         if documents_folder is None:
@@ -143,22 +358,29 @@ class VectorSearchService:
             "error": None
         }
         
+        new_version = None
         try:
             start_time = datetime.now()
             
             # Create index
             logger.info("Step 1: Creating/checking vector index")
-            if not self.create_index(overwrite=overwrite):
+            collection_name = self.create_index(overwrite=overwrite)
+            if not collection_name:
                 results["error"] = "Failed to create index"
                 return results
             
+            if collection_name not in (self.get_alias_target(), self.config['collection_name']):
+                new_version = collection_name
+            
             # Process documents
             logger.info("Step 2: Processing documents")
-            doc_processor = DocumentProcessor(documents_folder)
+            doc_processor = self.document_processor(documents_folder)
             chunks = doc_processor.process_all_documents()
+            logger.info(f"Text cache: {self.text_cache.get_stats()}")
             
             if not chunks:
                 logger.warning("No chunks extracted from documents")
+                self._discard_collection(new_version)
                 results["status"] = "no_documents"
                 return results
             
@@ -166,10 +388,21 @@ class VectorSearchService:
             
             # Generate embeddings and store
             logger.info(f"Step 3: Generating embeddings for {len(chunks)} chunks")
-            self._store_chunks(chunks)
+            self._store_chunks(chunks, collection_name=collection_name)
             
-            # Verify
-            collection_info = self.qdrant_client.get_collection(self.config['collection_name'])
+            # Verify and make a new version visible to search
+            if new_version:
+                logger.info(f"Step 4: Promoting collection {new_version}")
+                if not self.promote_collection(new_version, expected_points=len(chunks)):
+                    self._discard_collection(new_version)
+                    results["error"] = f"Verification of {new_version} failed, alias not switched"
+                    return results
+            
+            # The FAQ index is shared with running servers, so it only follows a collection that is live
+            self.build_faq_index(collection_name)
+            
+            collection_info = self.qdrant_client.get_collection(collection_name)
+            self.refresh_readiness()
             
             end_time = datetime.now()
             processing_time = (end_time - start_time).total_seconds()
@@ -188,35 +421,56 @@ class VectorSearchService:
             return results
             
         except Exception as e:
+            self._discard_collection(new_version)
             results["error"] = str(e)
             logger.error(f"Indexing failed: {str(e)}")
             return results
     
-    def _store_chunks(self, chunks: List[DocumentChunk]):
+    # Drop a version that never became live so failed builds don't accumulate
+    def _discard_collection(self, collection_name: Optional[str]):
+        if not collection_name or collection_name == self.get_alias_target():
+            return
+        try:
+            logger.info(f"Discarding unpromoted collection: {collection_name}")
+            self.qdrant_client.delete_collection(collection_name)
+        except Exception as e:
+            logger.warning(f"Failed to discard collection {collection_name}: {e}")
+    
+    # Path of a document relative to the documents folder, the same whichever directory indexing runs from.
+    # Files with one name in different folders stay distinct.
+    def source_path(self, file_path: str) -> str:
+        return Path(os.path.relpath(Path(file_path).resolve(), Path(self.config['default_documents_folder']).resolve())).as_posix()
+    
+    def _store_chunks(self, chunks: List[DocumentChunk], collection_name: str = None, show_progress_bar: bool = True):
         # Prepare texts for embedding
         texts = [chunk.chunk_content for chunk in chunks]
         
-        # Generate embeddings in batches
+        # Generate embeddings in batches, only for text the store has not seen with this model
         logger.info("Generating embeddings...")
-        embeddings = self.embedding_model.encode(
+        embeddings = self.embedding_store.encode(
+            self.config['embedding_model'],
             texts,
-            show_progress_bar=True,
-            batch_size=32
+            lambda unseen: self.embedding_model.encode(unseen, show_progress_bar=show_progress_bar, batch_size=32)
         )
+        logger.info(f"Embedding store: {self.embedding_store.get_stats()}")
         
         # Prepare points for Qdrant
         points = []
         for chunk, embedding in zip(chunks, embeddings):
+            source_path = self.source_path(chunk.file_path or chunk.file_name)
+            # Deterministic ids let a re-run overwrite the same chunk instead of duplicating it
             point = PointStruct(
-                id=str(uuid.uuid4()),
+                id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source_path}:{chunk.chunk_index}")),
                 vector=embedding.tolist(),
                 payload={
                     "file_name": chunk.file_name,
+                    "source_path": source_path,
                     "document_title": chunk.document_title,
                     "chunk_content": chunk.chunk_content,
                     "chunk_index": chunk.chunk_index,
                     "timestamp": datetime.now().isoformat(),
-                    "content_length": len(chunk.chunk_content)
+                    "content_length": len(chunk.chunk_content),
+                    **derive_metadata(chunk.file_name, chunk.document_title)
                 }
             )
             points.append(point)
@@ -224,60 +478,289 @@ class VectorSearchService:
         # Store in Qdrant
         logger.info(f"Storing {len(points)} points in vector database...")
         self.qdrant_client.upsert(
-            collection_name=self.config['collection_name'],
+            collection_name=collection_name or self.config['collection_name'],
             points=points
         )
     
-    def search(self, query: str, limit: int = 5, score_threshold: float = 0.2) -> List[Dict[str, Any]]:
+    # Pull Q/A pairs out of the stored chunks and embed the questions once, at index time
+    def build_faq_index(self, collection_name: str) -> int:
+        try:
+            payloads = []
+            offset = None
+            while True:
+                points, offset = self.qdrant_client.scroll(
+                    collection_name=collection_name,
+                    limit=256,
+                    offset=offset,
+                    with_payload=["chunk_content", "file_name", "document_title"]
+                )
+                payloads.extend(point.payload for point in points)
+                if offset is None:
+                    break
+            
+            pairs = extract_faq_pairs(payloads)
+            FAQIndex.build(pairs, self.embedding_model, collection_name).save(self.config['faq_index_path'])
+            logger.info(f"Built FAQ index with {len(pairs)} questions from {collection_name}")
+            return len(pairs)
+            
+        except Exception as e:
+            logger.error(f"Failed to build FAQ index: {str(e)}")
+            return 0
+    
+    def _current_faq_index(self) -> Optional[FAQIndex]:
+        now = time.monotonic()
+        if self._faq_index is not None and now - self._faq_checked_at < self.config['faq_reload_interval']:
+            return self._faq_index
+        self._faq_checked_at = now
+        
+        path = self.config['faq_index_path']
         try:
-            # Check if collection exists
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return self._faq_index
+        
+        if mtime != self._faq_index_mtime:
             try:
-                collection_info = self.qdrant_client.get_collection(self.config['collection_name'])
-                if collection_info.points_count == 0:
-                    logger.warning("Collection is empty. Run indexing first.")
-                    return []
+                faq_index = FAQIndex.load(path)
+                # Keep counters across reloads
+                if self._faq_index is not None:
+                    faq_index.stats = self._faq_index.stats
+                self._faq_index = faq_index
+                self._faq_index_mtime = mtime
+                logger.info(f"Loaded FAQ index with {len(faq_index)} questions")
+            except Exception as e:
+                logger.error(f"Failed to load FAQ index: {str(e)}")
+        
+        return self._faq_index
+    
+    def match_faq(self, question: str, threshold: float = None) -> Optional[Dict[str, Any]]:
+        faq_index = self._current_faq_index()
+        if not faq_index:
+            return None
+        
+        with tracer.span('encode', queries=1):
+            query_embedding = self.embedding_model.encode([question])[0]
+        return faq_index.match(query_embedding, self.config['faq_match_threshold'] if threshold is None else threshold)
+    
+    # Identifies the data a question is currently answered from: embedding model, the collection behind
+    # the alias (changes on every re-index) and the loaded FAQ index. Cached briefly as it is read per turn.
+    def retrieval_fingerprint(self) -> str:
+        now = time.monotonic()
+        if self._retrieval_fingerprint is None or now - self._retrieval_fingerprint_at >= RETRIEVAL_FINGERPRINT_TTL:
+            try:
+                target = self.get_alias_target() or self.config['collection_name']
             except Exception:
-                logger.error("Collection not found. Run indexing first.")
+                target = self.config['collection_name']
+            self._current_faq_index()
+            self._retrieval_fingerprint = f"{self.config['embedding_model']}|{target}|{self._faq_index_mtime}"
+            self._retrieval_fingerprint_at = now
+        return self._retrieval_fingerprint
+    
+    def faq_stats(self) -> Dict[str, int]:
+        if not self._faq_index:
+            return {}
+        return dict(self._faq_index.stats, questions=len(self._faq_index))
+    
+    def refresh_readiness(self) -> bool:
+        try:
+            collection_info = self.qdrant_client.get_collection(self.config['collection_name'])
+            self._collection_ready = collection_info.points_count > 0
+            if not self._collection_ready:
+                logger.warning("Collection is empty. Run indexing first.")
+        except Exception:
+            logger.error("Collection not found. Run indexing first.")
+            self._collection_ready = False
+        
+        self._readiness_checked_at = time.monotonic()
+        return self._collection_ready
+    
+    # A ready collection is never re-probed; a missing one is re-checked at most once per interval
+    def is_ready(self) -> bool:
+        if self._collection_ready is None:
+            return self.refresh_readiness()
+        
+        if not self._collection_ready and time.monotonic() - self._readiness_checked_at >= self.config['readiness_recheck_interval']:
+            return self.refresh_readiness()
+        
+        return self._collection_ready
+    
+    @staticmethod
+    def _is_collection_missing(error: Exception) -> bool:
+        if isinstance(error, UnexpectedResponse) and error.status_code == 404:
+            return True
+        return "not found" in str(error).lower()
+    
+    # Runs a query against the serving alias, None when the collection is missing. A miss is re-probed once
+    # straight away, as the alias may just have replaced a legacy collection, before the readiness recheck
+    # interval applies.
+    def _query_alias(self, query: Callable[[], Any]):
+        try:
+            return query()
+        except Exception as e:
+            if not self._is_collection_missing(e):
+                raise
+        if self.refresh_readiness():
+            return query()
+        return None
+    
+    # {"product": ["AuraPhone", "general"], "file_name": "FAQs.pdf"} -> every field must match one of its values
+    @staticmethod
+    def build_filter(filters: Optional[Dict[str, Any]]) -> Optional[Filter]:
+        if not filters:
+            return None
+        conditions = []
+        for key, value in filters.items():
+            match = MatchAny(any=list(value)) if isinstance(value, (list, tuple, set)) else MatchValue(value=value)
+            conditions.append(FieldCondition(key=key, match=match))
+        return Filter(must=conditions)
+    
+    def search(self, query: str, limit: int = 5, score_threshold: float = 0.2, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        try:
+            if not self.is_ready():
                 return []
             
             # Generate query embedding
-            query_embedding = self.embedding_model.encode([query])[0].tolist()
+            with tracer.span('encode', queries=1):
+                query_embedding = self.embedding_model.encode([query])[0].tolist()
             
             # Search in Qdrant
-            search_results = self.qdrant_client.search(
-                collection_name=self.config['collection_name'],
-                query_vector=query_embedding,
-                limit=limit,
-                score_threshold=score_threshold
-            )
+            with tracer.span('vector_store.query_points', backend=self.config['vector_backend'], limit=limit, filtered=bool(filters)) as span:
+                search_results = self._query_alias(lambda: self.qdrant_client.query_points(
+                    collection_name=self.config['collection_name'],
+                    query=query_embedding,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    query_filter=self.build_filter(filters)
+                ).points)
+                if search_results is None:
+                    return []
+                span.set_attribute('results', len(search_results))
             
             # Format results
-            results = []
-            for result in search_results:
-                results.append({
-                    "score": float(result.score),
-                    "file_name": result.payload["file_name"],
-                    "document_title": result.payload["document_title"],
-                    "chunk_content": result.payload["chunk_content"],
-                    "chunk_index": result.payload["chunk_index"],
-                    "content_length": result.payload["content_length"]
-                })
-            
-            logger.info(f"Found {len(results)} results for query: '{query[:50]}{'...' if len(query) > 50 else ''}'")
+            results = [self._format_result(result) for result in search_results]
+            
+            logger.info(f"Found {len(results)} results for query: '{query[:50]}{'...' if len(query) > 50 else ''}'" + (f" with filters {filters}" if filters else ""))
+            return results
+            
+        except Exception as e:
+            logger.error(f"Search failed: {str(e)}")
+            return []
+    
+    @staticmethod
+    def _format_result(result) -> Dict[str, Any]:
+        return {
+            "score": float(result.score),
+            "file_name": result.payload["file_name"],
+            "document_title": result.payload["document_title"],
+            "chunk_content": result.payload["chunk_content"],
+            "chunk_index": result.payload["chunk_index"],
+            "content_length": result.payload["content_length"]
+        }
+    
+    # Merge ranked lists by reciprocal rank fusion, keeping each point once with its best score
+    @staticmethod
+    def fuse_results(ranked_lists: List[List[Any]]) -> List[Any]:
+        fused = {}
+        for points in ranked_lists:
+            for rank, point in enumerate(points):
+                entry = fused.setdefault(point.id, {"rrf": 0.0, "point": point})
+                entry["rrf"] += 1.0 / (RRF_K + rank + 1)
+                if point.score > entry["point"].score:
+                    entry["point"] = point
+        
+        ordered = sorted(fused.values(), key=lambda entry: (entry["rrf"], entry["point"].score), reverse=True)
+        return [entry["point"] for entry in ordered]
+    
+    # Several sub-queries of one question: one batched encode, one batched query, fused by point id. limit applies
+    # to each sub-query and total_limit (default: limit) to the fused list, so the prompt gets no more context
+    # than a single search would give it.
+    def search_many(self, queries: List[str], limit: int = 5, score_threshold: float = 0.2, filters: List[Optional[Dict[str, Any]]] = None, total_limit: int = None) -> List[Dict[str, Any]]:
+        filters = filters or [None] * len(queries)
+        if len(queries) == 1:
+            return self.search(queries[0], limit, score_threshold, filters=filters[0])
+        
+        try:
+            if not self.is_ready():
+                return []
+            
+            with tracer.span('encode', queries=len(queries)):
+                query_embeddings = self.embedding_model.encode(queries)
+            requests = [
+                QueryRequest(
+                    query=embedding.tolist(),
+                    filter=self.build_filter(query_filters),
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    with_payload=True
+                )
+                for embedding, query_filters in zip(query_embeddings, filters)
+            ]
+            
+            with tracer.span('vector_store.query_batch_points', backend=self.config['vector_backend'], limit=limit, queries=len(queries)):
+                responses = self._query_alias(lambda: self.qdrant_client.query_batch_points(
+                    collection_name=self.config['collection_name'],
+                    requests=requests
+                ))
+            if responses is None:
+                return []
+            
+            fused = self.fuse_results([response.points for response in responses])
+            results = [self._format_result(result) for result in fused[:limit if total_limit is None else total_limit]]
+            logger.info(f"Found {len(fused)} distinct results for {len(queries)} sub-queries, kept {len(results)}")
             return results
             
         except Exception as e:
             logger.error(f"Search failed: {str(e)}")
             return []
 
-def search_documents(query: str, limit: int = 5, score_threshold: float = 0.5, config_path: str = CONFIG_FILE) -> List[Dict[str, Any]]:
+# Building a service loads the embedding model and connects to Qdrant, so one is shared per config
+_search_services: Dict[str, VectorSearchService] = {}
+_search_services_lock = threading.Lock()
+
+def get_search_service(config_path: str = CONFIG_FILE) -> VectorSearchService:
+    with _search_services_lock:
+        service = _search_services.get(config_path)
+        if service is None:
+            service = VectorSearchService(config_path)
+            _search_services[config_path] = service
+        return service
+
+def search_documents(query: str, limit: int = 5, score_threshold: float = 0.5, config_path: str = CONFIG_FILE, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
     try:
-        service = VectorSearchService(config_path)
-        return service.search(query, limit, score_threshold)
+        service = get_search_service(config_path)
+        return service.search(query, limit, score_threshold, filters=filters)
+    except Exception as e:
+        logger.error(f"Search failed: {e}")
+        return []
+
+def search_documents_multi(queries: List[str], limit: int = 5, score_threshold: float = 0.5, config_path: str = CONFIG_FILE, filters: List[Optional[Dict[str, Any]]] = None, total_limit: int = None) -> List[Dict[str, Any]]:
+    try:
+        service = get_search_service(config_path)
+        return service.search_many(queries, limit, score_threshold, filters=filters, total_limit=total_limit)
     except Exception as e:
         logger.error(f"Search failed: {e}")
         return []
 
+def match_faq(question: str, config_path: str = CONFIG_FILE) -> Optional[Dict[str, Any]]:
+    try:
+        return get_search_service(config_path).match_faq(question)
+    except Exception as e:
+        logger.error(f"FAQ match failed: {e}")
+        return None
+
+# Counters of a service this process already built; never loads the model just to report them
+def faq_stats(config_path: str = CONFIG_FILE) -> Dict[str, int]:
+    with _search_services_lock:
+        service = _search_services.get(config_path)
+    return service.faq_stats() if service else {}
+
+def retrieval_fingerprint(config_path: str = CONFIG_FILE) -> str:
+    try:
+        return get_search_service(config_path).retrieval_fingerprint()
+    except Exception as e:
+        logger.error(f"Retrieval fingerprint unavailable: {e}")
+        return ""
+
 def index_documents_standalone(documents_folder: str, overwrite: bool = False, config_path: str = CONFIG_FILE) -> Dict[str, Any]:
     try:
         service = VectorSearchService(config_path)
@@ -0,0 +1,88 @@
+import os
+import gzip
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Dict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Content-addressed cache of extracted document text: one gzip file per (file hash, extractor version).
+# Least recently used entries are evicted once the cache grows past max_bytes.
+class TextCache:
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        # entry path -> size on disk, used for eviction without rescanning the folder
+        self._sizes: Dict[Path, int] = {entry: entry.stat().st_size for entry in self.cache_dir.glob("*.txt.gz")}
+
+    @staticmethod
+    def file_hash(file_path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def key(self, file_path: Path, extractor_version: str) -> str:
+        return hashlib.sha256(f"{self.file_hash(file_path)}:{extractor_version}".encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.txt.gz"
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entry_path(key)
+        try:
+            with gzip.open(entry, 'rt', encoding='utf-8') as f:
+                text = f.read()
+            # Touch so eviction order follows last use, not creation
+            os.utime(entry)
+        except (OSError, EOFError):
+            with self._lock:
+                self.stats["misses"] += 1
+                # Evicted by another process, or a corrupt entry that will be rewritten
+                self._sizes.pop(entry, None)
+            return None
+
+        with self._lock:
+            self.stats["hits"] += 1
+        return text
+
+    def put(self, key: str, text: str):
+        entry = self._entry_path(key)
+        tmp_path = entry.with_suffix(f".tmp{os.getpid()}")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, entry)
+
+        with self._lock:
+            self._sizes[entry] = entry.stat().st_size
+            self.stats["writes"] += 1
+            self._evict()
+
+    # Caller must hold the lock
+    def _evict(self):
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        by_last_use = sorted(self._sizes, key=lambda entry: entry.stat().st_mtime if entry.exists() else 0)
+        for entry in by_last_use:
+            if total <= self.max_bytes:
+                break
+            total -= self._sizes.pop(entry)
+            entry.unlink(missing_ok=True)
+            self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._sizes)
+            stats["bytes"] = sum(self._sizes.values())
+        return stats
@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import math
+import time
+import signal
+import argparse
+import logging
+import subprocess
+from typing import Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Limits on resources every worker shares (Gemini quota, Postgres connections, pipelines in flight), with
+# the app's per-process defaults. Each worker gets its share, so the total stays what was configured.
+SHARED_LIMITS = {
+    'GOOGLE_AI_MAX_CONCURRENCY': '8',
+    'GOOGLE_AI_RPM': None,
+    'DB_MAX_CONNECTIONS': '10',
+    'ADMISSION_MAX_IN_FLIGHT': '32'
+}
+
+# Seconds a worker has to drain write-behind and span queues after SIGTERM before it is killed
+SHUTDOWN_TIMEOUT = 15.0
+# Threads per worker. A websocket connection holds one for as long as it is open, so this also caps
+# a worker's concurrent websocket clients
+WORKER_THREADS = int(os.getenv('WORKER_THREADS', '100'))
+
+def worker_env(index: int, workers: int, port: int, message_queue: Optional[str], split_limits: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(port),
+        'WORKER_ID': str(index),
+        'FLASK_DEBUG': '0'
+    })
+    if message_queue:
+        env['SOCKETIO_MESSAGE_QUEUE'] = message_queue
+    # Files a process appends to and replays from are per worker, so workers never rewrite each other's
+    root, extension = os.path.splitext(env.get('DB_WRITE_BEHIND_SPILL_PATH', './write_behind_spill.jsonl'))
+    env['DB_WRITE_BEHIND_SPILL_PATH'] = f"{root}.{index}{extension}"
+    root, extension = os.path.splitext(env.get('TRACE_FILE', './traces.jsonl'))
+    env['TRACE_FILE'] = f"{root}.{index}{extension}"
+    if split_limits:
+        for key, default in SHARED_LIMITS.items():
+            total = env.get(key) or default
+            if total:
+                env[key] = str(max(1, math.ceil(int(total) / workers)))
+    return env
+
+# Embedded Qdrant locks its folder, so only one process can open it
+def check_vector_backend(config_path: str, workers: int) -> Optional[str]:
+    try:
+        with open(config_path) as f:
+            backend = json.load(f).get('vector_backend', 'qdrant')
+    except (OSError, ValueError):
+        return None
+    if workers > 1 and backend == 'qdrant_local':
+        return "vector_backend 'qdrant_local' can only be opened by one process; use 'qdrant' or 'numpy' with several workers"
+    return None
+
+# Each worker is a single-process gunicorn server with the threaded worker class, which Flask-SocketIO
+# supports in threading mode (websockets through simple-websocket), so the app needs no monkey patching
+def worker_command(host: str, port: int, threads: int) -> List[str]:
+    return [
+        sys.executable, '-m', 'gunicorn',
+        '--workers', '1',
+        '--worker-class', 'gthread',
+        '--threads', str(threads),
+        '--bind', f"{host}:{port}",
+        '--graceful-timeout', str(int(SHUTDOWN_TIMEOUT)),
+        '--chdir', ROOT,
+        'app:app'
+    ]
+
+class WorkerPool:
+    def __init__(self, workers: int, host: str, base_port: int, message_queue: Optional[str], split_limits: bool = True,
+                 threads: int = WORKER_THREADS):
+        self.workers = workers
+        self.host = host
+        self.base_port = base_port
+        self.message_queue = message_queue
+        self.split_limits = split_limits
+        self.threads = threads
+        self.processes: List[Optional[subprocess.Popen]] = [None] * workers
+        self._stopping = False
+
+    def _spawn(self, index: int):
+        port = self.base_port + index
+        env = worker_env(index, self.workers, port, self.message_queue, self.split_limits)
+        self.processes[index] = subprocess.Popen(worker_command(self.host, port, self.threads), env=env)
+        logger.info(f"Started worker {index} (pid {self.processes[index].pid}) on port {port}")
+
+    def start(self):
+        for index in range(self.workers):
+            self._spawn(index)
+
+    # Restarts workers that exit until stop() is called
+    def supervise(self, poll_interval: float = 1.0):
+        while not self._stopping:
+            for index, process in enumerate(self.processes):
+                if process is not None and process.poll() is not None and not self._stopping:
+                    logger.error(f"Worker {index} exited with code {process.returncode}, restarting")
+                    self._spawn(index)
+            time.sleep(poll_interval)
+
+    # gunicorn gives its worker SHUTDOWN_TIMEOUT, the extra seconds are for the gunicorn process itself
+    def stop(self, timeout: float = SHUTDOWN_TIMEOUT + 5):
+        self._stopping = True
+        for process in self.processes:
+            if process is not None and process.poll() is None:
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            try:
+                process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning(f"Worker {index} did not stop in {timeout:.0f}s, killing it")
+                process.kill()
+                process.wait()
+        logger.info("All workers stopped")
+
+# Runs the app as several worker processes on consecutive ports, sharing one Socket.IO message queue.
+# Put a load balancer with sticky sessions in front of them (see the README), since Engine.IO's polling
+# transport sends each connection's requests to the worker that holds it.
+# python workers.py --workers 4 --base-port 5001 --message-queue redis://localhost:6379/0
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the chat app as several worker processes")
+    parser.add_argument("--workers", type=int, default=int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument("--host", default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument("--base-port", type=int, default=5001, help="Worker i listens on base-port + i")
+    parser.add_argument("--message-queue", default=os.getenv('SOCKETIO_MESSAGE_QUEUE'), help="e.g. redis://localhost:6379/0")
+    parser.add_argument("--config", default="config.json", help="Vector service config, checked for a backend workers can share")
+    parser.add_argument("--threads", type=int, default=WORKER_THREADS, help="Threads per worker, which caps its open websocket connections")
+    parser.add_argument("--no-split-limits", action="store_true", help="Give every worker the full Gemini, database and admission limits")
+    args = parser.parse_args(argv)
+
+    if args.workers > 1 and not args.message_queue:
+        logger.error("Several workers need a shared message queue: set --message-queue or SOCKETIO_MESSAGE_QUEUE")
+        return 2
+    problem = check_vector_backend(args.config, args.workers)
+    if problem:
+        logger.error(problem)
+        return 2
+
+    pool = WorkerPool(args.workers, args.host, args.base_port, args.message_queue, split_limits=not args.no_split_limits, threads=args.threads)
+
+    def handle_signal(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    pool.start()
+    try:
+        pool.supervise()
+    except KeyboardInterrupt:
+        logger.info("Stopping workers")
+    finally:
+        pool.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())